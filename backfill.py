@@ -0,0 +1,32 @@
+import argparse
+from datetime import datetime, timedelta
+
+from config.settings import BACKFILL_TARGET_FILE_MB, BACKFILL_ROW_GROUP_ROWS, ROAD_NETWORK_FILE, CAMERA_REGISTRY_FILE
+from models.camera import CameraRegistry
+from services.backfill import run_backfill
+from services.data_generator import corridor_route
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate historical traffic data straight into partitioned Parquet, without Kafka")
+    parser.add_argument("--fleet-size", type=int, default=10000, help="Number of simulated vehicles")
+    parser.add_argument("--start", default=None, help="ISO-8601 start of the simulated period; defaults to --days before now")
+    parser.add_argument("--days", type=float, default=1, help="Simulated days to generate")
+    parser.add_argument("--tick-sec", type=float, default=2, help="Simulated seconds between two records of a vehicle")
+    parser.add_argument("--workers", type=int, default=1, help="Writer processes, each simulating and writing its shard of the fleet")
+    parser.add_argument("--seed", type=int, default=None, help="Root seed of the fleet's random streams")
+    parser.add_argument("--output-dir", default="output/traffic", help="Root of the Parquet dataset (the streaming job's --output-dir)")
+    parser.add_argument("--target-file-mb", type=int, default=BACKFILL_TARGET_FILE_MB, help="Close Parquet files at about this size")
+    parser.add_argument("--row-group-rows", type=int, default=BACKFILL_ROW_GROUP_ROWS, help="Rows per Parquet row group")
+    parser.add_argument("--road-network", default=ROAD_NETWORK_FILE, help="Local .osm extract or GeoJSON road network to drive on")
+    parser.add_argument("--cameras", default=CAMERA_REGISTRY_FILE, help="CSV or GeoJSON file of traffic cameras")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_time = datetime.fromisoformat(args.start) if args.start else datetime.now() - timedelta(days=args.days)
+    route = corridor_route(args.road_network) if args.road_network else None
+    cameras = CameraRegistry.from_file(args.cameras) if args.cameras else None
+    run_backfill(args.fleet_size, start_time, args.days * 86400, args.output_dir, args.workers, args.tick_sec, args.seed,
+                 args.target_file_mb * 1024 * 1024, args.row_group_rows, route, cameras)
@@ -0,0 +1,74 @@
+"""
+Benchmark of the nearest-camera lookup in models/camera.
+
+Looks up a batch of vehicle positions against a random camera registry and checks a sample of the
+answers against a brute-force scan of all cameras. Run from the repository root:
+
+    python -m benchmarks.bench_cameras --cameras 100000 --vehicles 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES
+from models.camera import CameraRegistry
+
+
+def brute_force_nearest(registry, latitude, longitude):
+    x, y = registry._project(latitude, longitude)
+    distance_km = np.hypot(registry.x - x, registry.y - y)
+    distance_km[distance_km > registry.ranges_km] = np.inf
+    camera = int(np.argmin(distance_km))
+    return camera if np.isfinite(distance_km[camera]) else -1
+
+
+def run(cameras, vehicles, range_km, repeat, check_points, seed=0):
+    started = time.perf_counter()
+    registry = CameraRegistry.random(cameras, SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, range_km, seed)
+    build_sec = time.perf_counter() - started
+
+    # Half of the vehicles are placed right next to a camera, so both hits and misses are timed
+    rng = np.random.default_rng(seed + 1)
+    near = rng.integers(0, cameras, vehicles // 2)
+    jitter_deg = range_km / 110.574
+    latitudes = np.concatenate((registry.latitudes[near] + rng.uniform(-jitter_deg, jitter_deg, near.size),
+                                rng.uniform(UNIVERSITY_COORDINATES['latitude'], SEATTLE_COORDINATES['latitude'], vehicles - near.size)))
+    longitudes = np.concatenate((registry.longitudes[near] + rng.uniform(-jitter_deg, jitter_deg, near.size),
+                                 rng.uniform(SEATTLE_COORDINATES['longitude'], UNIVERSITY_COORDINATES['longitude'], vehicles - near.size)))
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        nearest, _ = registry.nearest(latitudes, longitudes)
+        best = min(best, time.perf_counter() - started)
+
+    sample = rng.choice(vehicles, min(check_points, vehicles), replace=False)
+    mismatches = sum(brute_force_nearest(registry, latitudes[i], longitudes[i]) != nearest[i] for i in sample.tolist())
+    return {
+        "build_sec": build_sec,
+        "lookup_ns_per_vehicle": best / vehicles * 1e9,
+        "hit_ratio": float(np.mean(nearest >= 0)),
+        "checked": len(sample),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched nearest-camera lookups")
+    parser.add_argument("--cameras", type=int, default=100_000, help="Cameras in the registry")
+    parser.add_argument("--vehicles", type=int, default=1_000_000, help="Vehicle positions per batched lookup")
+    parser.add_argument("--range-m", type=float, default=50, help="Camera range in metres")
+    parser.add_argument("--repeat", type=int, default=5, help="Keep the best of this many lookups")
+    parser.add_argument("--check-points", type=int, default=2000, help="Lookups verified against a brute-force scan")
+    args = parser.parse_args()
+
+    result = run(args.cameras, args.vehicles, args.range_m / 1000, args.repeat, args.check_points)
+    print(f"{args.cameras} cameras indexed in {result['build_sec'] * 1000:.0f} ms; {args.vehicles} vehicles looked up at "
+          f"{result['lookup_ns_per_vehicle']:.0f} ns/vehicle, {result['hit_ratio']:.1%} in range of a camera")
+    if result["mismatches"]:
+        raise SystemExit(f"{result['mismatches']} of {result['checked']} lookups disagree with the brute-force scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Microbenchmark for the geodesy kernels in utilities/coordinates.
+
+Times the scalar ``math`` functions against their NumPy array versions and checks that both agree.
+Run from the repository root:
+
+    python -m benchmarks.bench_coordinates --points 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utilities import coordinates
+
+# Largest absolute difference tolerated between the scalar and array results. NumPy's SIMD
+# arctan2 and libm's pow() can round the last bit differently, so the two only agree to a few ULP.
+TOLERANCE = 1e-9
+
+
+def make_inputs(points, seed=0):
+    rng = np.random.default_rng(seed)
+    lat1 = rng.uniform(47.0, 48.0, points)
+    lon1 = rng.uniform(-123.0, -117.0, points)
+    lat2 = rng.uniform(46.5, 48.0, points)
+    lon2 = rng.uniform(-123.0, -117.0, points)
+    distance_km = rng.uniform(0, 10, points)
+    bearing_deg = rng.uniform(0, 360, points)
+    speed_kmh = rng.uniform(0, 130, points)
+    elapsed_sec = rng.uniform(1, 3, points)
+    return {
+        "calculate_distance": (coordinates.calculate_distance, coordinates.calculate_distances, (lat1, lon1, lat2, lon2)),
+        "haversine_distance": (coordinates.haversine_distance, coordinates.haversine_distances, (lat1, lon1, lat2, lon2)),
+        "calculate_bearing": (coordinates.calculate_bearing, coordinates.calculate_bearings, (lat1, lon1, lat2, lon2)),
+        "update_position": (coordinates.update_position, coordinates.update_positions, (lat1, lon1, distance_km, bearing_deg)),
+        "incremental_movement": (coordinates.incremental_movement, coordinates.incremental_movements,
+                                 (lat1, lon1, lat2, lon2, speed_kmh, elapsed_sec)),
+    }
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(points, scalar_points, repeat):
+    """
+    Benchmark every kernel and return one result dict per function.
+
+    The scalar versions are timed on the first ``scalar_points`` inputs only (a Python loop over
+    1M points takes seconds per function); their per-point cost does not depend on the count.
+    """
+    results = []
+    for name, (scalar_func, array_func, args) in make_inputs(points).items():
+        array_sec, array_out = best_of(lambda: array_func(*args), repeat)
+
+        scalar_args = [arg[:scalar_points].tolist() for arg in args]
+        scalar_sec, scalar_out = best_of(lambda: [scalar_func(*values) for values in zip(*scalar_args)], 1)
+
+        expected = np.asarray(scalar_out)
+        actual = np.asarray(array_out)
+        actual = actual.T[:scalar_points] if actual.ndim == 2 else actual[:scalar_points]
+        max_error = float(np.max(np.abs(actual - expected)))
+
+        results.append({
+            "function": name,
+            "scalar_ns_per_point": scalar_sec / scalar_points * 1e9,
+            "array_ns_per_point": array_sec / points * 1e9,
+            "speedup": (scalar_sec / scalar_points) / (array_sec / points),
+            "max_abs_error": max_error,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs. array geodesy kernels")
+    parser.add_argument("--points", type=int, default=1_000_000, help="Points per array call")
+    parser.add_argument("--scalar-points", type=int, default=100_000, help="Points timed for the scalar loop")
+    parser.add_argument("--repeat", type=int, default=5, help="Array timings keep the best of this many runs")
+    args = parser.parse_args()
+
+    results = run(args.points, min(args.scalar_points, args.points), args.repeat)
+
+    print(f"{'function':<22} {'scalar ns/pt':>13} {'array ns/pt':>12} {'speedup':>8} {'max abs error':>14}")
+    for result in results:
+        print(f"{result['function']:<22} {result['scalar_ns_per_point']:>13.1f} {result['array_ns_per_point']:>12.1f} "
+              f"{result['speedup']:>7.1f}x {result['max_abs_error']:>14.2e}")
+
+    failed = [result["function"] for result in results if result["max_abs_error"] > TOLERANCE]
+    if failed:
+        raise SystemExit(f"Array versions disagree with the scalar versions: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark suite for the generator pipeline: record generation, geodesy kernels, trajectory sampling, record
+IDs, serialization and end-to-end fleet ticks, all against a NullProducer so no broker is needed.
+
+Every case reports events per second (best of ``--repeat`` runs) and the peak memory it allocated per event
+(one extra run under tracemalloc). Results are written to ``benchmarks/results/<commit>.json``; with ``--baseline``
+they are compared to an earlier run and the suite exits non-zero when a case got slower or allocates
+more than ``--tolerance`` allows. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --baseline benchmarks/results/<older commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, VEHICLE_TOPIC, GPS_TOPIC, WEATHER_TOPIC, EMERGENCY_TOPIC
+from models.fleet import Fleet, uuid_bytes as fleet_uuid_bytes
+from models.incidents import IncidentProcess
+from models.trajectory import KinematicProfile
+from models.vehicle import Vehicle
+from services.data_generator import publish_fleet_tick
+from services.kafka_producer import NullProducer
+from services.serializers import BinarySerializer, JsonSerializer, TOPIC_SCHEMAS
+from utilities import coordinates
+from utilities.clock import create_clock
+from utilities.ids import SnowflakeIds, Uuid7Ids
+from utilities.random_streams import GPS_ID, RandomStreams, counter_bits
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+FLEET_SIZES = [1, 1_000, 100_000]
+TICK_EVENTS = 20_000  # Vehicle ticks timed per fleet size; small fleets run more ticks...
+MAX_TICKS = 2_000  # ...up to this many, since a tick of a tiny fleet is all fixed cost
+
+# Per-event peaks of tiny cases are a few bytes; don't fail on noise of that size
+ALLOC_SLACK_BYTES = 16
+
+
+def measure(func, events, repeat):
+    """
+    Time ``func`` (which handles ``events`` events per call) and trace the memory it allocates.
+
+    Returns:
+        dict: ``events_per_sec`` from the fastest of ``repeat`` calls and ``alloc_bytes_per_event``, the
+        peak of the memory allocated during one more call, divided by ``events``.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, allocated = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"events_per_sec": events / best, "alloc_bytes_per_event": allocated / events}
+
+
+def bench_vehicle_records(records, repeat):
+    """
+    One Vehicle generating all of its per-tick records (telemetry, GPS, camera, weather, emergency).
+
+    The records are kept, so the allocation figure is the size of one tick's records.
+    """
+    clock = create_clock("virtual", None)
+    vehicle = Vehicle("bench-vehicle", SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), clock)
+
+    def generate():
+        generated = []
+        for _ in range(records):
+            data = vehicle.generate_vehicle_data(vehicle.location['latitude'], vehicle.location['longitude'])
+            generated.append((
+                data,
+                vehicle.generate_gps_data(data['vehicle_id'], data['timestamp']),
+                vehicle.generate_traffic_camera_data(data['vehicle_id'], data['timestamp'], data['location'], "bench-cam"),
+                vehicle.generate_weather_data(data['vehicle_id'], data['timestamp'], data['location']),
+                vehicle.generate_emergency_incident_data(data['vehicle_id'], data['timestamp'], data['location']),
+            ))
+        return generated
+
+    return {"vehicle_records": measure(generate, records, repeat)}
+
+
+def bench_coordinates(points, repeat):
+    """
+    The scalar geodesy functions per call, and their array versions per point.
+    """
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(47.0, 48.0, points), rng.uniform(46.5, 48.0, points)
+    lon1, lon2 = rng.uniform(-123.0, -117.0, points), rng.uniform(-123.0, -117.0, points)
+    distance_km, bearing_deg = rng.uniform(0, 10, points), rng.uniform(0, 360, points)
+    kernels = {
+        "calculate_distance": (coordinates.calculate_distance, coordinates.calculate_distances, (lat1, lon1, lat2, lon2)),
+        "calculate_bearing": (coordinates.calculate_bearing, coordinates.calculate_bearings, (lat1, lon1, lat2, lon2)),
+        "update_position": (coordinates.update_position, coordinates.update_positions, (lat1, lon1, distance_km, bearing_deg)),
+    }
+
+    results = {}
+    for name, (scalar_func, array_func, args) in kernels.items():
+        rows = list(zip(*[arg.tolist() for arg in args]))
+        results[f"coordinates.{name}"] = measure(lambda: [scalar_func(*row) for row in rows], points, repeat)
+        results[f"coordinates.{name}[array]"] = measure(lambda: array_func(*args), points, repeat)
+    return results
+
+
+def bench_trajectory(points, repeat):
+    """
+    Kinematic trajectories sampled at random vehicles and times: the cost per sample, however irregular.
+    """
+    rng = np.random.default_rng(0)
+    profile = KinematicProfile(470.0, rng.uniform(10, 40, points), 0.0, stop_km=0.5, dwell_sec=30)
+    indices = rng.integers(0, points, points)
+    timestamps = rng.uniform(0, profile.arrival.max(), points)
+    return {"trajectory.state_at": measure(lambda: profile.state_at(indices, timestamps), points, repeat)}
+
+
+def bench_ids(count, repeat):
+    """
+    Record IDs: one ``uuid.uuid4()`` per record against the bulk generators, ``count`` IDs per call.
+
+    The bulk cases produce raw UUID bytes, as a Fleet keeps them until a record is materialized.
+    """
+    keys = RandomStreams(0).vehicle_keys(np.arange(count))
+    snowflake, uuid7 = SnowflakeIds(), Uuid7Ids()
+    return {
+        "ids.uuid4": measure(lambda: [uuid.uuid4() for _ in range(count)], count, repeat),
+        "ids.random[stream]": measure(lambda: fleet_uuid_bytes(counter_bits(keys, 1, GPS_ID, 2)), count, repeat),
+        "ids.uuid7": measure(lambda: uuid7.uuid_bytes(count), count, repeat),
+        "ids.snowflake": measure(lambda: snowflake.uuid_bytes(count), count, repeat),
+        "ids.snowflake[int64]": measure(lambda: snowflake.next_ids(count), count, repeat),
+    }
+
+
+def bench_serializers(records, repeat):
+    """
+    JSON against the schema-driven binary encoding, for a sample of every topic's records.
+    """
+    clock = create_clock("virtual", None)
+    # Incidents are rare; a huge hazard makes every vehicle open one, so there are emergency records to time
+    fleet = Fleet(records, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "bench", 0, clock.now(),
+                  incidents=IncidentProcess(rate_per_hour=1e9))
+    indices = fleet.step(2)
+    samples = {
+        VEHICLE_TOPIC: list(fleet.vehicle_records(indices)),
+        GPS_TOPIC: list(fleet.gps_records(indices)),
+        WEATHER_TOPIC: list(fleet.weather_records(indices)),
+        EMERGENCY_TOPIC: list(fleet.emergency_incident_records(indices)),
+    }
+
+    results = {}
+    for topic, topic_records in samples.items():
+        for serializer in (JsonSerializer(), BinarySerializer(TOPIC_SCHEMAS[topic])):
+            name = "json" if isinstance(serializer, JsonSerializer) else "binary"
+            result = measure(lambda: [serializer.serialize(record) for record in topic_records], len(topic_records), repeat)
+            result["bytes_per_event"] = sum(len(serializer.serialize(record)) for record in topic_records[:1000]) / min(len(topic_records), 1000)
+            results[f"serialize.{topic}.{name}"] = result
+    return results
+
+
+def bench_fleet_ticks(fleet_sizes, repeat):
+    """
+    End-to-end ticks: advance the fleet, build every topic's records and serialize them into a NullProducer.
+    """
+    results = {}
+    for size in fleet_sizes:
+        clock = create_clock("virtual", None)
+        ticks = max(1, min(MAX_TICKS, TICK_EVENTS // size))
+
+        def run_ticks():
+            producer = NullProducer()
+            fleet = None
+            for _ in range(ticks):
+                # Start a fresh fleet whenever the last one arrived, so every tick moves ``size`` vehicles
+                if fleet is None or not fleet.active_count:
+                    fleet = Fleet(size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "bench", 0, clock.now())
+                clock.sleep(2)
+                publish_fleet_tick(producer, fleet, fleet.step(2))
+            return producer
+
+        results[f"fleet_tick[{size}]"] = measure(run_ticks, ticks * size, repeat)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of ``results`` against ``baseline``: cases that lost more than ``tolerance`` of their
+    throughput or allocate more than ``tolerance`` more per event.
+
+    Returns:
+        list: One message per regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["events_per_sec"] < previous["events_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['events_per_sec']:.0f} events/s, was {previous['events_per_sec']:.0f}")
+        if result["alloc_bytes_per_event"] > previous["alloc_bytes_per_event"] * (1 + tolerance) + ALLOC_SLACK_BYTES:
+            regressions.append(f"{name}: {result['alloc_bytes_per_event']:.0f} B/event allocated, was {previous['alloc_bytes_per_event']:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark record generation, serialization and fleet ticks without a broker")
+    parser.add_argument("--records", type=int, default=20_000, help="Records per generation and serialization case")
+    parser.add_argument("--points", type=int, default=100_000, help="Points per coordinate case")
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=FLEET_SIZES, help="Fleet sizes of the end-to-end tick cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Keep the best of this many timed runs")
+    parser.add_argument("--output", default=None, help="Results file; defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against; regressions fail the run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative loss of throughput / growth of allocations")
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_vehicle_records(args.records, args.repeat))
+    results.update(bench_coordinates(args.points, args.repeat))
+    results.update(bench_trajectory(args.points, args.repeat))
+    results.update(bench_ids(args.records, args.repeat))
+    results.update(bench_serializers(args.records, args.repeat))
+    results.update(bench_fleet_ticks(args.fleet_sizes, args.repeat))
+
+    print(f"{'case':<42} {'events/s':>12} {'alloc B/event':>14}")
+    for name, result in results.items():
+        print(f"{name:<42} {result['events_per_sec']:>12.0f} {result['alloc_bytes_per_event']:>14.0f}")
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump({"commit": commit, "python": platform.python_version(), "machine": platform.machine(), "results": results},
+                  results_file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regressions against {baseline.get('commit', args.baseline)}:\n  " + "\n  ".join(regressions))
+        print(f"No regressions against {baseline.get('commit', args.baseline)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Publishing throughput against a real broker at different transaction sizes.
+
+Each mode publishes the same fleet ticks with its own KafkaProducer: plain, idempotent, then transactional
+with 1, 10, 100... ticks per transaction, and reports vehicle ticks and messages per second (until every
+record is acknowledged) and the time from opening a transaction to its commit. Results are written to
+``benchmarks/results/<commit>-transactions.json``. Needs the broker of KAFKA_BOOTSTRAP_SERVER; run from the
+repository root:
+
+    python -m benchmarks.bench_transactions
+    python -m benchmarks.bench_transactions --fleet-size 1000 --ticks 200 --transaction-ticks 1 10 100
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import uuid
+
+from benchmarks.bench_pipeline import RESULTS_DIR, git_commit
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES
+from models.fleet import Fleet
+from services.data_generator import publish_fleet_tick
+from services.kafka_producer import KafkaProducer
+from utilities.clock import create_clock
+
+
+def run_mode(producer, fleet_size, ticks):
+    """
+    Publish ``ticks`` fleet ticks and wait until all of them are delivered and committed.
+
+    Returns:
+        dict: Vehicle ticks and messages per second, and the producer's transaction figures.
+    """
+    clock = create_clock("virtual", None)
+    fleet = Fleet(fleet_size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "bench", 0, clock.now())
+    started = time.perf_counter()
+    for _ in range(ticks):
+        if not fleet.active_count:
+            fleet = Fleet(fleet_size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "bench", 0, clock.now())
+        clock.sleep(2)
+        publish_fleet_tick(producer, fleet, fleet.step(2))
+        producer.poll()
+    remaining = producer.checkpoint(300)
+    elapsed = time.perf_counter() - started
+
+    committed, committed_records = producer.metrics.transactions[True]
+    return {
+        "events_per_sec": ticks * fleet_size / elapsed,
+        "messages_per_sec": producer.stats.produced / elapsed,
+        "failed": producer.stats.failed + remaining,
+        "transactions": committed,
+        "messages_per_transaction": committed_records / committed if committed else 0,
+        "commit_p50_ms": producer.metrics.commit_latency.quantile(0.5),
+        "commit_p99_ms": producer.metrics.commit_latency.quantile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Kafka publishing throughput per transaction size")
+    parser.add_argument("--fleet-size", type=int, default=1000, help="Vehicles per tick")
+    parser.add_argument("--ticks", type=int, default=100, help="Ticks published per mode")
+    parser.add_argument("--transaction-ticks", type=int, nargs="+", default=[1, 10, 100], help="Ticks per transaction to measure")
+    parser.add_argument("--output", default=None, help="Results file; defaults to benchmarks/results/<commit>-transactions.json")
+    args = parser.parse_args()
+
+    modes = {"plain": {}, "idempotent": {"idempotence": True}}
+    # A fresh transactional.id per run, so no earlier benchmark run is fenced or recovered
+    run_id = uuid.uuid4().hex[:8]
+    for ticks in args.transaction_ticks:
+        modes[f"transactional[{ticks}]"] = {"transactional_id": f"bench-{run_id}-{ticks}", "transaction_ticks": ticks}
+
+    results = {}
+    for name, options in modes.items():
+        producer = KafkaProducer(spill_dir=None, statistics_interval_ms=0, report_interval_sec=float("inf"), **options)
+        results[name] = run_mode(producer, args.fleet_size, args.ticks)
+        producer.close()
+
+    print(f"{'mode':<22} {'events/s':>10} {'msgs/s':>10} {'txns':>6} {'msgs/txn':>9} {'commit p50':>11} {'failed':>7}")
+    for name, result in results.items():
+        print(f"{name:<22} {result['events_per_sec']:>10.0f} {result['messages_per_sec']:>10.0f} {result['transactions']:>6} "
+              f"{result['messages_per_transaction']:>9.0f} {result['commit_p50_ms']:>8g} ms {result['failed']:>7}")
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-transactions.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump({"commit": commit, "python": platform.python_version(), "machine": platform.machine(),
+                   "fleet_size": args.fleet_size, "ticks": args.ticks, "results": results}, results_file, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
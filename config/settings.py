@@ -4,10 +4,98 @@ import os
 SEATTLE_COORDINATES = {"latitude": 47.608013, "longitude": -122.335167}
 UNIVERSITY_COORDINATES = {"latitude": 46.7252, "longitude": -117.1596}
 
+# Simulation Clock
+SIMULATION_CLOCK = os.environ.get('SIMULATION_CLOCK', 'realtime')  # "realtime" or "virtual"
+SIMULATION_SPEEDUP = float(os.environ.get('SIMULATION_SPEEDUP', 1.0))  # Simulated seconds per wall second
+
 # Kafka Configuration
 KAFKA_BOOTSTRAP_SERVER = os.environ.get('KAFKA_BOOTSTRAP_SERVER', 'localhost:9092')
 VEHICLE_TOPIC = os.environ.get('VEHICLE_TOPIC', 'vehicle_data')
+PROFILE_TOPIC = os.environ.get('PROFILE_TOPIC', 'vehicle_profile')  # Log-compacted, keyed by vehicle_id
 GPS_TOPIC = os.environ.get('GPS_TOPIC', 'gps_data')
+GPS_BATCH_TOPIC = os.environ.get('GPS_BATCH_TOPIC', 'gps_batches')  # Delta-encoded micro-batches, see jobs/gps_codec.py
 TRAFFIC_TOPIC = os.environ.get('TRAFFIC_TOPIC', 'traffic_data')
 WEATHER_TOPIC = os.environ.get('WEATHER_TOPIC', 'weather_data')
 EMERGENCY_TOPIC = os.environ.get('EMERGENCY_TOPIC', 'emergency_data')
+
+# Wire format per topic: "json" or "binary" (schema-driven, see services/serializers.py)
+WIRE_FORMAT = os.environ.get('WIRE_FORMAT', 'json')
+TOPIC_WIRE_FORMATS = {
+    VEHICLE_TOPIC: os.environ.get('VEHICLE_TOPIC_FORMAT', WIRE_FORMAT),
+    PROFILE_TOPIC: os.environ.get('PROFILE_TOPIC_FORMAT', WIRE_FORMAT),
+    GPS_TOPIC: os.environ.get('GPS_TOPIC_FORMAT', WIRE_FORMAT),
+    TRAFFIC_TOPIC: os.environ.get('TRAFFIC_TOPIC_FORMAT', WIRE_FORMAT),
+    WEATHER_TOPIC: os.environ.get('WEATHER_TOPIC_FORMAT', WIRE_FORMAT),
+    EMERGENCY_TOPIC: os.environ.get('EMERGENCY_TOPIC_FORMAT', WIRE_FORMAT),
+}
+
+# GPS Micro-Batching: with more than one sample per batch, GPS samples go to GPS_BATCH_TOPIC instead of GPS_TOPIC
+GPS_BATCH_SAMPLES = int(os.environ.get('GPS_BATCH_SAMPLES', 1))  # Samples per vehicle per batch; 1 disables batching
+GPS_BATCH_MAX_MS = int(os.environ.get('GPS_BATCH_MAX_MS', 30000))  # Close a batch once it spans this much simulated time
+
+# Kafka Producer Tuning
+KAFKA_LINGER_MS = int(os.environ.get('KAFKA_LINGER_MS', 20))  # How long librdkafka waits to fill a batch
+KAFKA_BATCH_SIZE = int(os.environ.get('KAFKA_BATCH_SIZE', 262144))  # Max bytes per partition batch
+KAFKA_POLL_INTERVAL = int(os.environ.get('KAFKA_POLL_INTERVAL', 1000))  # Messages produced between poll() calls
+KAFKA_REPORT_INTERVAL_SEC = float(os.environ.get('KAFKA_REPORT_INTERVAL_SEC', 10))  # Seconds between throughput reports
+KAFKA_STATISTICS_INTERVAL_MS = int(os.environ.get('KAFKA_STATISTICS_INTERVAL_MS', 5000))  # librdkafka statistics; 0 disables them
+KAFKA_DEBUG_DELIVERY = os.environ.get('KAFKA_DEBUG_DELIVERY', '0') == '1'  # Print a line per delivered message
+
+# Idempotent and Transactional Publishing
+KAFKA_IDEMPOTENCE = os.environ.get('KAFKA_IDEMPOTENCE', '0') == '1'  # No duplicates or reordering on producer retries
+KAFKA_TRANSACTIONAL_ID = os.environ.get('KAFKA_TRANSACTIONAL_ID')  # Set to publish ticks in transactions; unique per producer
+KAFKA_TRANSACTION_TICKS = int(os.environ.get('KAFKA_TRANSACTION_TICKS', 1))  # Ticks committed together in one transaction
+KAFKA_TRANSACTION_TIMEOUT_SEC = float(os.environ.get('KAFKA_TRANSACTION_TIMEOUT_SEC', 60))  # Broker aborts transactions left open longer
+
+# Backpressure and Disk Spill: see services/spill.py
+KAFKA_QUEUE_MAX_MESSAGES = int(os.environ.get('KAFKA_QUEUE_MAX_MESSAGES', 100000))  # librdkafka queue.buffering.max.messages
+KAFKA_QUEUE_MAX_KBYTES = int(os.environ.get('KAFKA_QUEUE_MAX_KBYTES', 262144))  # librdkafka queue.buffering.max.kbytes
+KAFKA_QUEUE_HIGH_WATERMARK = float(os.environ.get('KAFKA_QUEUE_HIGH_WATERMARK', 0.8))  # Queue fill at which publishing waits for the broker...
+KAFKA_QUEUE_LOW_WATERMARK = float(os.environ.get('KAFKA_QUEUE_LOW_WATERMARK', 0.5))  # ...until the queue is back below this fill
+KAFKA_BACKPRESSURE_TIMEOUT_SEC = float(os.environ.get('KAFKA_BACKPRESSURE_TIMEOUT_SEC', 1.0))  # Longest wait before records spill to disk
+SPILL_DIR = os.environ.get('SPILL_DIR', 'spill')  # Empty disables spilling
+SPILL_SEGMENT_BYTES = int(os.environ.get('SPILL_SEGMENT_BYTES', 64 * 1024 * 1024))  # Roll spill segments at this size
+SPILL_MAX_BYTES = int(os.environ.get('SPILL_MAX_BYTES', 10 * 1024 ** 3))  # Records beyond this much pending spill are dropped
+
+# Record IDs: "random" (UUIDv4), "uuid7" or "snowflake" (time-ordered), see utilities/ids.py
+ID_GENERATOR = os.environ.get('ID_GENERATOR', 'random')
+ID_WORKER_ID = int(os.environ.get('ID_WORKER_ID', 0))  # Worker bits of time-ordered IDs; sharded workers add their index
+
+# Producer Metrics
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))  # Serve Prometheus metrics on this port; 0 disables the endpoint
+
+# Event Log Sink
+EVENT_LOG_DIR = os.environ.get('EVENT_LOG_DIR', 'event_log')
+EVENT_LOG_SEGMENT_BYTES = int(os.environ.get('EVENT_LOG_SEGMENT_BYTES', 256 * 1024 * 1024))  # Roll segments at this size
+EVENT_LOG_INDEX_INTERVAL_BYTES = int(os.environ.get('EVENT_LOG_INDEX_INTERVAL_BYTES', 4096))  # Log bytes between index entries
+
+# Parquet Backfill: see services/backfill.py
+BACKFILL_TARGET_FILE_MB = int(os.environ.get('BACKFILL_TARGET_FILE_MB', 128))  # Roll Parquet files at about this size
+BACKFILL_ROW_GROUP_ROWS = int(os.environ.get('BACKFILL_ROW_GROUP_ROWS', 500000))  # Rows buffered per partition before a row group is written
+
+# Road Network Routing
+ROAD_NETWORK_FILE = os.environ.get('ROAD_NETWORK_FILE')  # Local .osm extract or GeoJSON; unset drives straight lines
+ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE', 1024))  # Routes kept in the LRU cache
+ROUTE_CELL_DEG = float(os.environ.get('ROUTE_CELL_DEG', 0.01))  # Origin/destination grid cell size of the cache key
+
+# Fleet Motion: "random" draws a speed per tick; "kinematic" follows closed-form trajectories, see models/trajectory.py
+FLEET_MOTION = os.environ.get('FLEET_MOTION', 'random')
+TRAJECTORY_ACCELERATION = float(os.environ.get('TRAJECTORY_ACCELERATION', 1.5))  # m/s² when pulling away
+TRAJECTORY_DECELERATION = float(os.environ.get('TRAJECTORY_DECELERATION', 2.5))  # m/s² when braking for a stop
+TRAJECTORY_STOP_KM = float(os.environ.get('TRAJECTORY_STOP_KM', 0))  # Distance between stops along the path; 0 drives through
+TRAJECTORY_DWELL_SEC = float(os.environ.get('TRAJECTORY_DWELL_SEC', 30))  # Time standing at each stop
+
+# Traffic Cameras
+CAMERA_REGISTRY_FILE = os.environ.get('CAMERA_REGISTRY_FILE')  # CSV or GeoJSON of camera positions; unset uses one default camera
+
+# Weather Field
+WEATHER_SEED = int(os.environ.get('WEATHER_SEED', 0))  # Same seed, same weather in every process
+WEATHER_CELL_DEG = float(os.environ.get('WEATHER_CELL_DEG', 0.1))  # Weather grid cell size (~10 km)
+WEATHER_BUCKET_SEC = float(os.environ.get('WEATHER_BUCKET_SEC', 600))  # Conditions change every 10 minutes
+WEATHER_CACHE_CELLS = int(os.environ.get('WEATHER_CACHE_CELLS', 65536))  # (cell, bucket) entries kept in the LRU
+
+# Emergency Incidents: a hazard-rate process per road segment and hour of day, see models/incidents.py
+INCIDENT_RATE_PER_HOUR = float(os.environ.get('INCIDENT_RATE_PER_HOUR', 0.02))  # Incidents per driving vehicle-hour, before scaling
+INCIDENT_SEGMENT_KM = float(os.environ.get('INCIDENT_SEGMENT_KM', 1.0))  # Size of the road segments with their own hazard
+INCIDENT_HOURLY_PROFILE = [float(value) for value in os.environ['INCIDENT_HOURLY_PROFILE'].split(',')] if os.environ.get('INCIDENT_HOURLY_PROFILE') else None  # 24 comma-separated hourly factors
+INCIDENT_SEED = int(os.environ.get('INCIDENT_SEED', 0))  # Places the hot spots; same seed, same hot spots
@@ -0,0 +1,159 @@
+"""
+Wire format of delta-encoded GPS micro-batches.
+
+One message carries up to a few hundred GPS samples of one vehicle: a header with the base timestamp and
+position of the first sample, then every sample as varint deltas to the previous one. The module only
+uses the standard library so the generator, plain consumers and Spark executors (``addPyFile``) can all
+import it as is.
+
+Layout (little-endian):
+
+    header   <BB16sqiiH   schema id, version, batch UUID, base timestamp (us since 1970-01-01),
+                          base latitude and longitude (1e-7 degrees), sample count
+    strings  uint8 length + UTF-8 vehicle_id, uint8 length + UTF-8 vehicle_type
+    samples  varint time delta (ms), zigzag varint latitude and longitude deltas (1e-7 degrees),
+             varint speed (km/h), one byte compass direction index; the first sample has zero deltas
+
+Positions are rounded to 1e-7 degrees (about 1 cm) and deltas are taken between rounded values, so
+decoding never drifts. Timestamps follow the records' naive ISO-8601 strings: seconds from a naive
+1970-01-01, without any time zone conversion.
+"""
+from datetime import datetime, timedelta
+import struct
+import uuid
+
+GPS_BATCH_SCHEMA_ID = 7
+GPS_BATCH_VERSION = 1
+HEADER = struct.Struct("<BB16sqiiH")
+COORDINATE_SCALE = 10_000_000  # Units per degree
+MAX_SAMPLES = 0xFFFF
+
+COMPASS_POINTS = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+EPOCH = datetime(1970, 1, 1)
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(payload, offset):
+    result = 0
+    shift = 0
+    while True:
+        byte = payload[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def _zigzag(value):
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+
+def _unzigzag(value):
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+
+def encode_gps_batch(vehicle_id, vehicle_type, samples, batch_id=None):
+    """
+    Encode one vehicle's samples.
+
+    Args:
+        vehicle_id (str): Vehicle the samples belong to.
+        vehicle_type (str): Vehicle type, as on the GPS records.
+        samples (list): ``(timestamp_sec, latitude, longitude, speed_kmh, direction_index)`` tuples in time order.
+        batch_id (uuid.UUID, optional): Batch identifier for deduplication; random by default.
+
+    Returns:
+        bytes: The encoded batch.
+    """
+    if not 0 < len(samples) <= MAX_SAMPLES:
+        raise ValueError(f"A GPS batch holds 1 to {MAX_SAMPLES} samples, got {len(samples)}")
+
+    base_time, base_lat, base_lon = samples[0][0], samples[0][1], samples[0][2]
+    base_us = round(base_time * 1_000_000)
+    previous_ms = base_us // 1000
+    previous_lat = round(base_lat * COORDINATE_SCALE)
+    previous_lon = round(base_lon * COORDINATE_SCALE)
+
+    out = bytearray(HEADER.pack(GPS_BATCH_SCHEMA_ID, GPS_BATCH_VERSION, (batch_id or uuid.uuid4()).bytes, base_us,
+                                previous_lat, previous_lon, len(samples)))
+    for text in (vehicle_id, vehicle_type):
+        encoded = text.encode('utf-8')
+        out.append(len(encoded))
+        out += encoded
+
+    for timestamp, latitude, longitude, speed, direction in samples:
+        time_ms = round(timestamp * 1_000_000) // 1000
+        lat = round(latitude * COORDINATE_SCALE)
+        lon = round(longitude * COORDINATE_SCALE)
+        _write_varint(out, time_ms - previous_ms)
+        _write_varint(out, _zigzag(lat - previous_lat))
+        _write_varint(out, _zigzag(lon - previous_lon))
+        _write_varint(out, int(speed))
+        out.append(direction)
+        previous_ms, previous_lat, previous_lon = time_ms, lat, lon
+    return bytes(out)
+
+
+def decode_gps_batch_rows(payload):
+    """
+    Decode a batch into its header fields and plain sample tuples, without building records.
+
+    Returns:
+        tuple: ``(batch_id, vehicle_id, vehicle_type, samples)`` where every sample is
+        ``(timestamp_sec, latitude, longitude, speed_kmh, direction_index)``.
+    """
+    payload = bytes(payload)
+    schema_id, version, batch_id, base_us, lat, lon, count = HEADER.unpack_from(payload, 0)
+    if schema_id != GPS_BATCH_SCHEMA_ID or version != GPS_BATCH_VERSION:
+        raise ValueError(f"Payload has schema {schema_id} v{version}, expected a GPS batch v{GPS_BATCH_VERSION}")
+
+    offset = HEADER.size
+    texts = []
+    for _ in range(2):
+        length = payload[offset]
+        texts.append(payload[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+
+    # The first sample keeps the base timestamp's microseconds; deltas are whole milliseconds
+    time_ms, sub_ms_us = divmod(base_us, 1000)
+    samples = []
+    for _ in range(count):
+        delta_ms, offset = _read_varint(payload, offset)
+        delta_lat, offset = _read_varint(payload, offset)
+        delta_lon, offset = _read_varint(payload, offset)
+        speed, offset = _read_varint(payload, offset)
+        direction = payload[offset]
+        offset += 1
+        time_ms += delta_ms
+        lat += _unzigzag(delta_lat)
+        lon += _unzigzag(delta_lon)
+        samples.append(((time_ms * 1000 + sub_ms_us) / 1_000_000, lat / COORDINATE_SCALE, lon / COORDINATE_SCALE, speed, direction))
+    return uuid.UUID(bytes=batch_id), texts[0], texts[1], samples
+
+
+def decode_gps_batch(payload):
+    """
+    Decode a batch into a record: the vehicle fields plus a ``samples`` list of GPS sample dicts with
+    ISO-8601 timestamps, in the shape the processing job parses.
+    """
+    batch_id, vehicle_id, vehicle_type, samples = decode_gps_batch_rows(payload)
+    return {
+        "id": batch_id,
+        "vehicle_id": vehicle_id,
+        "vehicle_type": vehicle_type,
+        "timestamp": (EPOCH + timedelta(seconds=samples[0][0])).isoformat(),
+        "samples": [{
+            "timestamp": (EPOCH + timedelta(seconds=timestamp)).isoformat(),
+            "latitude": latitude,
+            "longitude": longitude,
+            "speed": speed,
+            "direction": COMPASS_POINTS[direction],
+        } for timestamp, latitude, longitude, speed, direction in samples],
+    }
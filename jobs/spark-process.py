@@ -0,0 +1,457 @@
+"""
+Structured Streaming ingestion job: reads the traffic topics, parses them with explicit schemas and
+writes Parquet partitioned by topic, date and hour.
+
+The job is self-contained (docker-compose only mounts this directory into the Spark containers), so topic
+names and the broker address are read from the same environment variables as config/settings.py.
+
+Run locally against a broker:
+
+    spark-submit --master local[*] --packages org.apache.spark:spark-sql-kafka-0-10_2.12:3.5.1 \
+        jobs/spark-process.py --source kafka
+
+or against JSON-lines files written by ``replay.py --target files``:
+
+    spark-submit --master local[*] jobs/spark-process.py --source files --input-dir stream_input
+
+GPS micro-batches (GPS_BATCH_TOPIC) are decoded with gps_codec.py, shipped to the executors with the job,
+and exploded back into one row per sample. Every other topic must be published as JSON (WIRE_FORMAT); the
+job exits at start-up if the environment says otherwise, and binary captures go through ``replay.py --target files``.
+
+With ``--analytics`` the job also maintains the aggregates the dashboards read, under ``--analytics-dir``:
+
+    speed_by_cell     average speed, vehicle and record counts per grid cell and minute
+    vehicle_weather   vehicle telemetry joined with the weather record of the same vehicle and moment
+    incidents         opened incidents per window, emergency type and severity
+
+All three run on event time with a watermark, so their state is dropped once the watermark passes a
+window and stays bounded on multi-day runs. Against captured data, e.g. locally:
+
+    spark-submit --master local[*] jobs/spark-process.py --source files --input-dir stream_input --analytics
+"""
+import argparse
+import json
+import os
+import threading
+
+from pyspark.sql import SparkSession
+from pyspark.sql.functions import (approx_count_distinct, avg, col, count, explode, expr, floor, from_json, hour, lit, to_date,
+                                   to_timestamp, udf, window)
+from pyspark.sql.types import ArrayType, DoubleType, IntegerType, StringType, StructField, StructType
+
+KAFKA_BOOTSTRAP_SERVER = os.environ.get('KAFKA_BOOTSTRAP_SERVER', 'localhost:9092')
+VEHICLE_TOPIC = os.environ.get('VEHICLE_TOPIC', 'vehicle_data')
+PROFILE_TOPIC = os.environ.get('PROFILE_TOPIC', 'vehicle_profile')
+GPS_TOPIC = os.environ.get('GPS_TOPIC', 'gps_data')
+GPS_BATCH_TOPIC = os.environ.get('GPS_BATCH_TOPIC', 'gps_batches')
+TRAFFIC_TOPIC = os.environ.get('TRAFFIC_TOPIC', 'traffic_data')
+WEATHER_TOPIC = os.environ.get('WEATHER_TOPIC', 'weather_data')
+EMERGENCY_TOPIC = os.environ.get('EMERGENCY_TOPIC', 'emergency_data')
+
+# With more than one sample per batch the producer publishes GPS_BATCH_TOPIC instead of GPS_TOPIC, as in config/settings.py
+GPS_BATCH_SAMPLES = int(os.environ.get('GPS_BATCH_SAMPLES', 1))
+
+# Wire formats the producer publishes with, as in config/settings.py; only JSON records are parsed here
+WIRE_FORMAT = os.environ.get('WIRE_FORMAT', 'json')
+TOPIC_WIRE_FORMATS = {
+    topic: os.environ.get(f'{name}_FORMAT', WIRE_FORMAT)
+    for name, topic in [('VEHICLE_TOPIC', VEHICLE_TOPIC), ('PROFILE_TOPIC', PROFILE_TOPIC), ('GPS_TOPIC', GPS_TOPIC),
+                        ('TRAFFIC_TOPIC', TRAFFIC_TOPIC), ('WEATHER_TOPIC', WEATHER_TOPIC), ('EMERGENCY_TOPIC', EMERGENCY_TOPIC)]
+}
+
+LOCATION_SCHEMA = StructType([
+    StructField("latitude", DoubleType(), True),
+    StructField("longitude", DoubleType(), True),
+])
+
+# Explicit schemas of the JSON records published by models/vehicle.py; no schema inference on the stream
+TOPIC_SCHEMAS = {
+    VEHICLE_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("vehicle_id", StringType(), True),
+        StructField("location", LOCATION_SCHEMA, True),
+        StructField("timestamp", StringType(), True),
+        StructField("speed", IntegerType(), True),
+        StructField("direction", StringType(), True),
+        StructField("status", StringType(), True),
+        StructField("fuel_level", IntegerType(), True),
+    ]),
+    # Static attributes, once per vehicle (a compacted topic; the latest record per vehicle_id wins)
+    PROFILE_TOPIC: StructType([
+        StructField("vehicle_id", StringType(), False),
+        StructField("timestamp", StringType(), True),
+        StructField("make", StringType(), True),
+        StructField("model", StringType(), True),
+        StructField("year", IntegerType(), True),
+        StructField("color", StringType(), True),
+        StructField("license_plate", StringType(), True),
+        StructField("vehicle_type", StringType(), True),
+        StructField("fuel_type", StringType(), True),
+    ]),
+    GPS_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("timestamp", StringType(), True),
+        StructField("vehicle_id", StringType(), True),
+        StructField("speed", IntegerType(), True),
+        StructField("direction", StringType(), True),
+        StructField("vehicle_type", StringType(), True),
+    ]),
+    # Delta-encoded GPS micro-batches, in the decoded form of gps_codec.decode_gps_batch
+    GPS_BATCH_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("vehicle_id", StringType(), True),
+        StructField("vehicle_type", StringType(), True),
+        StructField("timestamp", StringType(), True),
+        StructField("samples", ArrayType(StructType([
+            StructField("timestamp", StringType(), True),
+            StructField("latitude", DoubleType(), True),
+            StructField("longitude", DoubleType(), True),
+            StructField("speed", IntegerType(), True),
+            StructField("direction", StringType(), True),
+        ])), True),
+    ]),
+    TRAFFIC_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("timestamp", StringType(), True),
+        StructField("vehicle_id", StringType(), True),
+        StructField("camera_id", StringType(), True),
+        StructField("location", LOCATION_SCHEMA, True),
+        StructField("snapshot", StringType(), True),
+    ]),
+    WEATHER_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("timestamp", StringType(), True),
+        StructField("vehicle_id", StringType(), True),
+        StructField("temperature", IntegerType(), True),
+        StructField("humidity", IntegerType(), True),
+        StructField("wind_speed", IntegerType(), True),
+        StructField("wind_direction", StringType(), True),
+        StructField("location", LOCATION_SCHEMA, True),
+        StructField("weather", StringType(), True),
+        StructField("precipitation", IntegerType(), True),
+        StructField("visibility", IntegerType(), True),
+        StructField("pressure", IntegerType(), True),
+        StructField("cloud_cover", IntegerType(), True),
+        StructField("air_quality_index", IntegerType(), True),
+    ]),
+    EMERGENCY_TOPIC: StructType([
+        StructField("id", StringType(), False),
+        StructField("incident_id", StringType(), True),
+        StructField("timestamp", StringType(), True),
+        StructField("vehicle_id", StringType(), True),
+        StructField("location", LOCATION_SCHEMA, True),
+        StructField("emergency_type", StringType(), True),
+        StructField("description", StringType(), True),
+        StructField("severity", StringType(), True),
+        StructField("status", StringType(), True),
+    ]),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest the traffic topics into partitioned Parquet")
+    parser.add_argument("--master", default=os.environ.get('SPARK_MASTER', 'local[*]'), help="Spark master URL")
+    parser.add_argument("--source", choices=["kafka", "files"], default="kafka", help="Read from Kafka, or from per-topic JSON-lines directories")
+    parser.add_argument("--bootstrap-servers", default=KAFKA_BOOTSTRAP_SERVER, help="Kafka bootstrap servers with --source kafka")
+    parser.add_argument("--starting-offsets", default="latest", help="Kafka startingOffsets with --source kafka")
+    parser.add_argument("--max-offsets-per-trigger", type=int, default=None, help="Cap on records read per micro-batch with --source kafka")
+    parser.add_argument("--input-dir", default="stream_input", help="Directory of <topic>/ JSON-lines files with --source files")
+    parser.add_argument("--max-files-per-trigger", type=int, default=None, help="Cap on files read per micro-batch with --source files")
+    parser.add_argument("--output-dir", default=os.environ.get('OUTPUT_DIR', 'output/traffic'), help="Root of the Parquet output")
+    parser.add_argument("--checkpoint-dir", default=os.environ.get('CHECKPOINT_DIR', 'output/checkpoints'), help="Root of the streaming checkpoints")
+    parser.add_argument("--trigger", default=os.environ.get('TRIGGER_INTERVAL', '10 seconds'), help="Micro-batch trigger interval")
+    parser.add_argument("--report-interval", type=float, default=30, help="Seconds between throughput reports")
+    parser.add_argument("--topics", nargs="+", default=None,
+                        help="Topics to ingest (default: the topic directories under --input-dir with --source files, else every topic "
+                             "the producer publishes to)")
+    parser.add_argument("--analytics", action="store_true", help="Also maintain the windowed aggregates and the vehicle-weather join")
+    parser.add_argument("--analytics-dir", default=os.environ.get('ANALYTICS_DIR', 'output/analytics'), help="Root of the aggregate outputs")
+    parser.add_argument("--watermark", default=os.environ.get('WATERMARK_DELAY', '2 minutes'), help="How late records may arrive before their window is final")
+    parser.add_argument("--cell-deg", type=float, default=0.01, help="Grid cell size of the speed aggregate, in degrees (~1 km)")
+    parser.add_argument("--speed-window", default="1 minute", help="Window of the speed and count aggregate")
+    parser.add_argument("--incident-window", default="5 minutes", help="Window of the incident counts")
+    parser.add_argument("--join-tolerance", default="30 seconds", help="Largest event-time gap between a vehicle record and its weather record")
+    parser.add_argument("--state-store", choices=["rocksdb", "hdfs"], default="rocksdb", help="State store of the stateful queries; RocksDB keeps large state off the JVM heap")
+    parser.add_argument("--metrics-file", default=None, help="Append one JSON line of progress metrics per query and report to this file")
+    args = parser.parse_args()
+    if args.topics is None:
+        args.topics = default_topics(args)
+    return args
+
+
+def default_topics(args):
+    """
+    Topics a run produced: the ``<topic>/`` directories of the files source, or for Kafka every topic but
+    the GPS topic the producer doesn't use (GPS_TOPIC or GPS_BATCH_TOPIC, depending on GPS_BATCH_SAMPLES).
+    """
+    if args.source == "files":
+        return [topic for topic in TOPIC_SCHEMAS if os.path.isdir(os.path.join(args.input_dir, topic))]
+    unused = GPS_TOPIC if GPS_BATCH_SAMPLES > 1 else GPS_BATCH_TOPIC
+    return [topic for topic in TOPIC_SCHEMAS if topic != unused]
+
+
+def build_spark_session(master, state_store="hdfs"):
+    builder = (SparkSession.builder
+               .appName("TrafficDataIngestion")
+               .master(master)
+               .config("spark.sql.session.timeZone", "UTC")
+               # The records are small and arrive continuously; keep shuffles from exploding into tiny tasks
+               .config("spark.sql.shuffle.partitions", os.environ.get('SPARK_SHUFFLE_PARTITIONS', '8')))
+    if state_store == "rocksdb":
+        builder = builder.config("spark.sql.streaming.stateStore.providerClass",
+                                 "org.apache.spark.sql.execution.streaming.state.RocksDBStateStoreProvider")
+    return builder.getOrCreate()
+
+
+@udf(returnType=StringType())
+def decode_gps_batch_json(payload):
+    # Imported on the executor, from the copy added with addPyFile
+    from gps_codec import decode_gps_batch
+    return None if payload is None else json.dumps(decode_gps_batch(payload), default=str)
+
+
+def read_topic(spark, args, topic):
+    """
+    Raw stream of one topic with the record JSON in a string ``value`` column.
+
+    GPS batches arrive from Kafka in their binary encoding and are decoded to the same JSON the files source holds.
+    """
+    if args.source == "kafka":
+        reader = (spark.readStream.format("kafka")
+                  .option("kafka.bootstrap.servers", args.bootstrap_servers)
+                  .option("subscribe", topic)
+                  .option("startingOffsets", args.starting_offsets)
+                  # Skip records of aborted or still open transactions, so transactional ticks arrive whole
+                  .option("kafka.isolation.level", "read_committed")
+                  .option("failOnDataLoss", "false"))
+        if args.max_offsets_per_trigger:
+            reader = reader.option("maxOffsetsPerTrigger", args.max_offsets_per_trigger)
+        if topic == GPS_BATCH_TOPIC:
+            return reader.load().select(decode_gps_batch_json(col("value")).alias("value"))
+        return reader.load().select(col("value").cast("string").alias("value"))
+
+    reader = spark.readStream.format("text")
+    if args.max_files_per_trigger:
+        reader = reader.option("maxFilesPerTrigger", args.max_files_per_trigger)
+    # A topic without records yet (e.g. no incidents) has no directory; the file source needs one to watch
+    path = os.path.join(args.input_dir, topic)
+    os.makedirs(path, exist_ok=True)
+    return reader.load(path)
+
+
+def check_wire_formats(topics):
+    """
+    Refuse to read Kafka topics published in a wire format other than JSON.
+
+    ``from_json`` turns anything else into rows of nulls without an error, so a binary topic would be
+    ingested as silently empty records. GPS batches always use their own codec and are decoded above.
+    """
+    binary = [topic for topic in topics if topic != GPS_BATCH_TOPIC and TOPIC_WIRE_FORMATS.get(topic, WIRE_FORMAT) != "json"]
+    if binary:
+        raise SystemExit(f"Topics {', '.join(binary)} are not published as JSON (WIRE_FORMAT / <TOPIC>_FORMAT); "
+                         f"publish them as JSON or ingest a capture with replay.py --target files and --source files")
+
+
+def parse_topic(raw, topic):
+    """
+    Parse the record JSON with the topic's explicit schema and add the event-time partition columns.
+
+    GPS batches are exploded into one row per sample, so they land in Parquet like per-record GPS data.
+    """
+    parsed = raw.select(from_json(col("value"), TOPIC_SCHEMAS[topic]).alias("data")).select("data.*")
+    if topic == GPS_BATCH_TOPIC:
+        parsed = (parsed.select(col("id").alias("batch_id"), "vehicle_id", "vehicle_type", explode("samples").alias("sample"))
+                  .select("batch_id", "vehicle_id", "vehicle_type", "sample.*"))
+    return (parsed
+            .withColumn("event_time", to_timestamp(col("timestamp")))
+            .withColumn("date", to_date(col("event_time")))
+            .withColumn("hour", hour(col("event_time")))
+            .withColumn("topic", lit(topic)))
+
+
+def write_partitioned(parsed, args, topic):
+    """
+    Start the Parquet sink of one topic.
+
+    Each streaming file sink needs its own path, so every topic writes to ``<output>/topic=<name>``; the
+    output root then reads back as one dataset partitioned by topic, date and hour.
+    """
+    return (parsed.drop("topic").writeStream
+            .format("parquet")
+            .queryName(topic)
+            .option("path", os.path.join(args.output_dir, f"topic={topic}"))
+            .option("checkpointLocation", os.path.join(args.checkpoint_dir, topic))
+            .partitionBy("date", "hour")
+            .outputMode("append")
+            .trigger(processingTime=args.trigger)
+            .start())
+
+
+def speed_by_cell(vehicles, args):
+    """
+    Average speed, distinct vehicles and records per grid cell and minute.
+
+    Cells are ``cell_deg`` squares keyed by their integer (cell_x, cell_y); a window is emitted once the
+    watermark passes its end, and its state is dropped with it.
+    """
+    return (vehicles
+            .withWatermark("event_time", args.watermark)
+            .withColumn("cell_x", floor(col("location.longitude") / args.cell_deg).cast("int"))
+            .withColumn("cell_y", floor(col("location.latitude") / args.cell_deg).cast("int"))
+            .groupBy(window("event_time", args.speed_window), "cell_x", "cell_y")
+            .agg(avg("speed").alias("avg_speed"), approx_count_distinct("vehicle_id").alias("vehicles"), count(lit(1)).alias("records"))
+            .select(col("window.start").alias("window_start"), col("window.end").alias("window_end"), "cell_x", "cell_y",
+                    (col("cell_x") * args.cell_deg).alias("min_longitude"), (col("cell_y") * args.cell_deg).alias("min_latitude"),
+                    "avg_speed", "vehicles", "records"))
+
+
+def vehicle_weather(vehicles, weather, args):
+    """
+    Vehicle telemetry joined with the weather record of the same vehicle within ``join_tolerance``.
+
+    Both sides carry a watermark and the join condition bounds the event-time gap, so Spark can drop
+    buffered rows of either side once no future row could match them.
+    """
+    vehicle_side = (vehicles.withWatermark("event_time", args.watermark)
+                    .select(col("vehicle_id"), col("event_time"), col("location"), col("speed"), col("direction"), col("status"), col("fuel_level")))
+    weather_side = (weather.withWatermark("event_time", args.watermark)
+                    .select(col("vehicle_id").alias("weather_vehicle_id"), col("event_time").alias("weather_time"), "temperature", "humidity",
+                            "wind_speed", "wind_direction", "weather", "precipitation", "visibility", "pressure", "cloud_cover", "air_quality_index"))
+    return (vehicle_side
+            .join(weather_side, expr(f"""
+                weather_vehicle_id = vehicle_id AND
+                weather_time >= event_time - interval {args.join_tolerance} AND
+                weather_time <= event_time + interval {args.join_tolerance}
+            """))
+            .drop("weather_vehicle_id"))
+
+
+def incident_counts(emergencies, args):
+    """
+    Incidents opened per window, emergency type and severity; updates and resolutions are not counted twice.
+    """
+    return (emergencies
+            .withWatermark("event_time", args.watermark)
+            .where(col("status").isNull() | (col("status") == "Open"))
+            .groupBy(window("event_time", args.incident_window), "emergency_type", "severity")
+            .agg(count(lit(1)).alias("incidents"))
+            .select(col("window.start").alias("window_start"), col("window.end").alias("window_end"), "emergency_type", "severity", "incidents"))
+
+
+def write_analytics(frame, args, name, time_column):
+    """
+    Start the Parquet sink of one aggregate under ``<analytics-dir>/<name>``, partitioned by date.
+
+    Append mode only writes windows (and join results) the watermark has finalized, so files are never rewritten.
+    """
+    return (frame.withColumn("date", to_date(col(time_column))).writeStream
+            .format("parquet")
+            .queryName(f"analytics-{name}")
+            .option("path", os.path.join(args.analytics_dir, name))
+            .option("checkpointLocation", os.path.join(args.checkpoint_dir, f"analytics-{name}"))
+            .partitionBy("date")
+            .outputMode("append")
+            .trigger(processingTime=args.trigger)
+            .start())
+
+
+def start_analytics(spark, args):
+    """
+    Start the aggregate queries; each reads its topics itself, next to the raw ingestion queries.
+    """
+    vehicles = parse_topic(read_topic(spark, args, VEHICLE_TOPIC), VEHICLE_TOPIC)
+    weather = parse_topic(read_topic(spark, args, WEATHER_TOPIC), WEATHER_TOPIC)
+    emergencies = parse_topic(read_topic(spark, args, EMERGENCY_TOPIC), EMERGENCY_TOPIC)
+    return [
+        write_analytics(speed_by_cell(vehicles, args), args, "speed_by_cell", "window_start"),
+        write_analytics(vehicle_weather(vehicles, weather, args), args, "vehicle_weather", "event_time"),
+        write_analytics(incident_counts(emergencies, args), args, "incidents", "window_start"),
+    ]
+
+
+def query_metrics(progress):
+    """
+    Batch duration, watermark and state-store figures of one query's last progress report.
+    """
+    state = progress.get("stateOperators") or []
+    durations = progress.get("durationMs") or {}
+    return {
+        "query": progress.get("name"),
+        "batch_id": progress.get("batchId"),
+        "input_rows": progress.get("numInputRows") or 0,
+        "rows_per_sec": progress.get("processedRowsPerSecond") or 0.0,
+        "batch_duration_ms": durations.get("triggerExecution", 0),
+        "add_batch_ms": durations.get("addBatch", 0),
+        "watermark": (progress.get("eventTime") or {}).get("watermark"),
+        "state_rows": sum(operator.get("numRowsTotal", 0) for operator in state),
+        "state_memory_bytes": sum(operator.get("memoryUsedBytes", 0) for operator in state),
+        "state_rows_dropped_by_watermark": sum(operator.get("numRowsDroppedByWatermark", 0) for operator in state),
+    }
+
+
+def count_output_files(output_dir):
+    """
+    Number of Parquet files under a local output root (None for remote paths such as s3a://).
+    """
+    if "://" in output_dir or not os.path.isdir(output_dir):
+        return None
+    return sum(1 for _, _, files in os.walk(output_dir) for name in files if name.endswith(".parquet"))
+
+
+def report_progress(spark, queries, args, stop):
+    """
+    Periodically print ingest throughput (total and per core) and the number of Parquet files written, plus
+    batch duration and state-store size of the stateful queries. With ``--metrics-file`` every query's
+    figures are also appended there as JSON lines.
+    """
+    cores = spark.sparkContext.defaultParallelism
+    while not stop.wait(args.report_interval):
+        total_rate = 0.0
+        total_rows = 0
+        metrics = [query_metrics(query.lastProgress) for query in queries if query.lastProgress]
+        for figures in metrics:
+            total_rate += figures["rows_per_sec"]
+            total_rows += figures["input_rows"]
+        files = count_output_files(args.output_dir)
+        print(f"Ingest: {total_rows} rows in last batches, {total_rate:.0f} rows/s "
+              f"({total_rate / cores:.0f} rows/s per core on {cores} cores), "
+              f"{'n/a' if files is None else files} Parquet files written")
+        for figures in metrics:
+            if figures["state_rows"] or figures["query"].startswith("analytics-"):
+                print(f"  {figures['query']}: batch {figures['batch_duration_ms']} ms, watermark {figures['watermark']}, "
+                      f"state {figures['state_rows']} rows / {figures['state_memory_bytes'] / 1e6:.1f} MB, "
+                      f"{figures['state_rows_dropped_by_watermark']} late rows dropped")
+        if args.metrics_file and metrics:
+            with open(args.metrics_file, "a") as metrics_file:
+                for figures in metrics:
+                    metrics_file.write(json.dumps(figures) + "\n")
+
+
+def main():
+    args = parse_args()
+    if args.source == "kafka":
+        check_wire_formats(list(args.topics) + ([VEHICLE_TOPIC, WEATHER_TOPIC, EMERGENCY_TOPIC] if args.analytics else []))
+    spark = build_spark_session(args.master, args.state_store)
+    spark.sparkContext.setLogLevel("WARN")
+    spark.sparkContext.addPyFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gps_codec.py"))
+
+    queries = [write_partitioned(parse_topic(read_topic(spark, args, topic), topic), args, topic) for topic in args.topics]
+    if args.analytics:
+        queries += start_analytics(spark, args)
+
+    stop = threading.Event()
+    reporter = threading.Thread(target=report_progress, args=(spark, queries, args, stop), daemon=True)
+    reporter.start()
+    try:
+        spark.streams.awaitAnyTermination()
+    except KeyboardInterrupt:
+        print("Ingestion stopped by the user")
+    finally:
+        stop.set()
+        for query in queries:
+            query.stop()
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
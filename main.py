@@ -1,9 +1,88 @@
-from services.data_generator import simulate_journey
+import argparse
 
-if __name__ == "__main__":
+from services.data_generator import corridor_route, simulate_journey, simulate_fleet, simulate_fleet_at_rate
+from services.event_log import EventLogWriter
+from services.kafka_producer import NullProducer, ensure_compacted_topic, get_producer
+from services.rate_scheduler import RateProfile
+from services.sharding import run_sharded
+from services.async_engine import simulate_fleet_async
+from models.camera import CameraRegistry
+from services.producer_metrics import start_metrics_server
+from config.settings import SIMULATION_CLOCK, SIMULATION_SPEEDUP, EVENT_LOG_DIR, ROAD_NETWORK_FILE, CAMERA_REGISTRY_FILE, PROFILE_TOPIC, METRICS_PORT
+from config.settings import KAFKA_TRANSACTIONAL_ID, KAFKA_TRANSACTION_TICKS
+from utilities.clock import create_clock
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate traffic data and publish it to Kafka")
+    parser.add_argument("--vehicle-id", default="vehicle-arsene-212", help="ID of the single simulated vehicle")
+    parser.add_argument("--fleet-size", type=int, default=0, help="Simulate a vectorized fleet of this many vehicles instead of a single one")
+    parser.add_argument("--seed", type=int, default=None, help="Run seed of the vehicles' random streams; the same seed regenerates every vehicle however the fleet is sharded")
+    parser.add_argument("--clock", choices=["realtime", "virtual"], default=SIMULATION_CLOCK, help="Pace ticks in (scaled) real time, or run flat out on a virtual clock")
+    parser.add_argument("--speedup", type=float, default=SIMULATION_SPEEDUP, help="Simulated seconds per wall second with --clock realtime")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many simulated seconds")
+    parser.add_argument("--rate", type=float, default=None, help="Hold this many vehicle ticks per second across the fleet (needs --fleet-size)")
+    parser.add_argument("--rate-profile", default=None, help="Rate shape such as ramp:1000:50000:30,hold:50000:300,burst:100000:10 (needs --fleet-size)")
+    parser.add_argument("--engine", choices=["tick", "async"], default="tick", help="Advance the fleet in lockstep ticks, or run one asyncio task per vehicle with its own cadence")
+    parser.add_argument("--workers", type=int, default=1, help="Shard the fleet across this many generator processes, each with its own producer")
+    parser.add_argument("--sink", choices=["kafka", "log", "null"], default="kafka", help="Publish to Kafka, append to a local segmented event log, or serialize and discard (no broker needed)")
+    parser.add_argument("--log-dir", default=EVENT_LOG_DIR, help="Event log directory with --sink log")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Serve Prometheus producer metrics on this port with --sink kafka (workers use consecutive ports); 0 disables")
+    parser.add_argument("--transactional-id", default=KAFKA_TRANSACTIONAL_ID, help="Publish ticks in Kafka transactions under this id (workers append -worker-<n>)")
+    parser.add_argument("--transaction-ticks", type=int, default=KAFKA_TRANSACTION_TICKS, help="Ticks committed together in one transaction with --transactional-id")
+    parser.add_argument("--road-network", default=ROAD_NETWORK_FILE, help="Local .osm extract or GeoJSON road network; vehicles follow the shortest road route instead of a straight line")
+    parser.add_argument("--cameras", default=CAMERA_REGISTRY_FILE, help="CSV or GeoJSON file of traffic cameras; camera records are only emitted when a vehicle passes one")
+    return parser.parse_args()
+
+
+def rate_profile(args):
+    if args.rate_profile:
+        return RateProfile.from_spec(args.rate_profile)
+    if args.rate:
+        return RateProfile.constant(args.rate, args.duration or float("inf"))
+    return None
+
+
+def run_single_process(args, profile, route, cameras):
+    clock = create_clock(args.clock, args.speedup)
+    if args.sink == "log":
+        producer = EventLogWriter(args.log_dir)
+    elif args.sink == "null":
+        producer = NullProducer()
+    else:
+        producer = get_producer(transactional_id=args.transactional_id, transaction_ticks=args.transaction_ticks)
+        if args.metrics_port:
+            start_metrics_server(producer.metrics, args.metrics_port)
     try:
-        simulate_journey("vehicle-arsene-212")
+        if args.fleet_size > 0 and profile is not None:
+            simulate_fleet_at_rate(args.fleet_size, profile, seed=args.seed, clock=clock, producer=producer, route=route, cameras=cameras)
+        elif args.fleet_size > 0 and args.engine == "async":
+            simulate_fleet_async(args.fleet_size, producer, seed=args.seed, clock=clock, duration_sec=args.duration, route=route, cameras=cameras)
+        elif args.fleet_size > 0:
+            simulate_fleet(args.fleet_size, seed=args.seed, clock=clock, duration_sec=args.duration, producer=producer, route=route, cameras=cameras)
+        else:
+            simulate_journey(args.vehicle_id, clock=clock, duration_sec=args.duration, producer=producer, route=route, cameras=cameras, seed=args.seed)
     except KeyboardInterrupt:
         print("Simulation ended by the user")
     except Exception as e:
         print(f"Unexpected Error Occurred: {e}")
+    finally:
+        # Deliver whatever is still batched before exiting
+        producer.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profile = rate_profile(args)
+    route = corridor_route(args.road_network) if args.road_network else None
+    cameras = CameraRegistry.from_file(args.cameras) if args.cameras else None
+    if args.sink == "kafka":
+        ensure_compacted_topic(PROFILE_TOPIC)
+
+    if args.workers > 1 and args.fleet_size > 0:
+        # Every worker owns its producer and flushes it on Ctrl-C; the coordinator only aggregates
+        run_sharded(args.fleet_size, args.workers, seed=args.seed, clock=args.clock, speedup=args.speedup, duration_sec=args.duration,
+                    profile=profile, sink=args.sink, log_dir=args.log_dir, route=route, cameras=cameras, metrics_port=args.metrics_port,
+                    transactional_id=args.transactional_id, transaction_ticks=args.transaction_ticks)
+    else:
+        run_single_process(args, profile, route, cameras)
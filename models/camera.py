@@ -0,0 +1,148 @@
+import csv
+import json
+import math
+
+import numpy as np
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320  # At the equator; scaled by cos(latitude)
+DEFAULT_RANGE_KM = 0.05  # Cameras without a range see 50 m
+
+# Neighbouring grid cells searched around a point; cells are at least as large as the widest camera range
+NEIGHBOUR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class CameraRegistry:
+    """
+    Traffic cameras with a uniform grid index for batched nearest-camera lookups.
+
+    Positions are projected once onto a local plane (equirectangular around the cameras' mean latitude, well
+    within 1% over a few hundred km) and bucketed into square cells as wide as the largest camera range, so
+    every camera that can see a point sits in the point's cell or one of its 8 neighbours. Cameras are
+    sorted by cell; a lookup is a binary search for each of the 9 cell keys followed by distance checks on
+    the few cameras in those cells, all as array operations over the whole batch of points.
+    """
+
+    def __init__(self, camera_ids, latitudes, longitudes, ranges_km=None):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        if ranges_km is None:
+            ranges_km = np.full(len(self.latitudes), DEFAULT_RANGE_KM)
+        ranges_km = np.asarray(ranges_km, dtype=np.float64)
+
+        self.lon_scale = KM_PER_DEG_LON * math.cos(math.radians(float(self.latitudes.mean()) if len(self.latitudes) else 0.0))
+        self.cell_km = float(ranges_km.max()) if len(ranges_km) else DEFAULT_RANGE_KM
+
+        # Sort everything by cell so the cameras of one cell are contiguous
+        x, y = self._project(self.latitudes, self.longitudes)
+        keys = self._cell_keys(*self._cells(x, y))
+        order = np.argsort(keys, kind="stable")
+        self.camera_ids = [camera_ids[i] for i in order.tolist()]
+        self.latitudes, self.longitudes = self.latitudes[order], self.longitudes[order]
+        self.x, self.y, self.ranges_km = x[order], y[order], ranges_km[order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    def __len__(self):
+        return len(self.camera_ids)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load cameras from a CSV file (camera_id, latitude, longitude and an optional range_m column) or a
+        GeoJSON FeatureCollection of Points with camera_id / range_m properties.
+        """
+        camera_ids, latitudes, longitudes, ranges_km = [], [], [], []
+        if path.endswith((".json", ".geojson")):
+            with open(path) as cameras_file:
+                features = json.load(cameras_file).get("features", [])
+            for feature in features:
+                properties = feature.get("properties") or {}
+                longitude, latitude = feature["geometry"]["coordinates"][:2]
+                camera_ids.append(str(properties.get("camera_id", f"cam-{len(camera_ids)}")))
+                latitudes.append(latitude)
+                longitudes.append(longitude)
+                ranges_km.append(float(properties.get("range_m", DEFAULT_RANGE_KM * 1000)) / 1000)
+        else:
+            with open(path, newline="") as cameras_file:
+                for row in csv.DictReader(cameras_file):
+                    camera_ids.append(row["camera_id"])
+                    latitudes.append(float(row["latitude"]))
+                    longitudes.append(float(row["longitude"]))
+                    ranges_km.append(float(row.get("range_m") or DEFAULT_RANGE_KM * 1000) / 1000)
+        return cls(camera_ids, latitudes, longitudes, ranges_km)
+
+    @classmethod
+    def random(cls, count, start_location, end_location, range_km=DEFAULT_RANGE_KM, seed=None):
+        """
+        ``count`` cameras scattered over the box spanned by two locations (for benchmarks and demos).
+        """
+        rng = np.random.default_rng(seed)
+        latitudes = rng.uniform(min(start_location['latitude'], end_location['latitude']),
+                                max(start_location['latitude'], end_location['latitude']), count)
+        longitudes = rng.uniform(min(start_location['longitude'], end_location['longitude']),
+                                 max(start_location['longitude'], end_location['longitude']), count)
+        return cls([f"cam-{i}" for i in range(count)], latitudes, longitudes, np.full(count, range_km))
+
+    def _project(self, latitudes, longitudes):
+        return np.asarray(longitudes) * self.lon_scale, np.asarray(latitudes) * KM_PER_DEG_LAT
+
+    def _cells(self, x, y):
+        return np.floor(x / self.cell_km).astype(np.int64), np.floor(y / self.cell_km).astype(np.int64)
+
+    @staticmethod
+    def _cell_keys(cell_x, cell_y):
+        # Cell coordinates stay far below 2**31 for any cell wider than a metre
+        return cell_x * (1 << 32) + cell_y
+
+    def nearest(self, latitudes, longitudes):
+        """
+        Nearest camera that has each point in range.
+
+        Args:
+            latitudes (numpy.ndarray): Point latitudes.
+            longitudes (numpy.ndarray): Point longitudes.
+
+        Returns:
+            tuple: Camera indices (-1 where no camera is in range) and distances in km (inf where none is).
+        """
+        x, y = self._project(np.atleast_1d(latitudes), np.atleast_1d(longitudes))
+        nearest = np.full(x.shape, -1, dtype=np.int64)
+        best_km = np.full(x.shape, np.inf)
+        if not len(self):
+            return nearest, best_km
+
+        # Probe in cell key order: binary searches over sorted queries walk the cell table sequentially
+        # instead of missing the cache on every point. A neighbour offset shifts every key by the same
+        # amount, so one sort serves all 9 probes.
+        base_keys = self._cell_keys(*self._cells(x, y))
+        order = np.argsort(base_keys)
+        x, y, base_keys = x[order], y[order], base_keys[order]
+        sorted_nearest = np.full(x.shape, -1, dtype=np.int64)
+        sorted_best_km = np.full(x.shape, np.inf)
+
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            keys = base_keys + self._cell_keys(dx, dy)
+            slots = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+            points = np.flatnonzero(self.cell_keys[slots] == keys)
+            starts = self.cell_starts[slots[points]]
+            counts = self.cell_counts[slots[points]]
+
+            # Walk the cameras of every matched cell in lockstep; most cells hold one or two
+            offset = 0
+            while points.size:
+                cameras = starts + offset
+                distance_km = np.hypot(self.x[cameras] - x[points], self.y[cameras] - y[points])
+                closer = (distance_km <= self.ranges_km[cameras]) & (distance_km < sorted_best_km[points])
+                sorted_nearest[points[closer]] = cameras[closer]
+                sorted_best_km[points[closer]] = distance_km[closer]
+
+                offset += 1
+                remaining = counts > offset
+                points, starts, counts = points[remaining], starts[remaining], counts[remaining]
+
+        nearest[order] = sorted_nearest
+        best_km[order] = sorted_best_km
+        return nearest, best_km
+
+    def camera_id(self, index):
+        return self.camera_ids[index]
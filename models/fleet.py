@@ -0,0 +1,328 @@
+from datetime import datetime
+import uuid
+
+import numpy as np
+
+from config.settings import FLEET_MOTION
+from models.incidents import INCIDENT_DRAWS, IncidentProcess
+from models.vehicle import COMPASS_POINTS, VehicleProfile, VehicleTelemetry
+from models.trajectory import KinematicProfile
+from models.weather import get_weather_field
+from utilities.coordinates import calculate_bearings, calculate_distances, update_positions
+from utilities.ids import create_id_generator
+from utilities.random_streams import (CAMERA_ID, CRUISE, FUEL, GPS_ID, INCIDENT, INCIDENT_ID, SPEED, VEHICLE_ID, WEATHER_ID, RandomStreams, counter_bits,
+                                      counter_uniform)
+from utilities.routing import Route
+
+ARRIVAL_DISTANCE_KM = 0.1  # Assuming 100 meters as "close enough"
+FUEL_PER_KM = 0.05  # Percentage points of tank burned per km
+
+
+def uuid_bytes(words):
+    """
+    Turn ``(count, 2)`` random uint64 words into ``count`` version 4 UUIDs as a (count, 16) uint8 array.
+
+    Keeping UUIDs as raw bytes avoids building ``count`` ``uuid.UUID`` objects up front;
+    they are only converted when a record is materialized.
+    """
+    raw = np.ascontiguousarray(words, dtype=np.uint64).view(np.uint8).reshape(-1, 16)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return raw
+
+
+def compass_direction(heading_deg):
+    """
+    Map headings in degrees to the eight compass point names used in the records.
+    """
+    return np.asarray(np.round(np.asarray(heading_deg) / 45.0), dtype=np.int64) % 8
+
+
+class Fleet:
+    """
+    Struct-of-arrays state for a whole fleet of vehicles.
+
+    Every attribute that changes per tick (position, speed, fuel, heading and timestamp) lives in a
+    NumPy array indexed by vehicle, so advancing the fleet is a handful of array operations no matter
+    how many vehicles it holds. Records in the same shape as ``Vehicle`` produces are only built
+    when the ``*_records`` generators are consumed, i.e. right before they are serialized.
+
+    With a ``route`` (utilities.routing.Route) all vehicles drive the same road corridor: each one only keeps
+    its distance along the route, and positions are looked up on the route's cumulative distances.
+
+    With ``motion="kinematic"`` vehicles follow a closed-form accelerate/cruise/brake trajectory
+    (models.trajectory.KinematicProfile) along the route, or along the straight line to the destination,
+    instead of drawing a speed every tick. A tick then evaluates each vehicle at its new timestamp, so the
+    cost of a sample does not depend on how long ago the previous one was.
+
+    Every random draw belongs to one vehicle: it is counter-based on the vehicle's stream key (see
+    utilities.random_streams), its tick count and the purpose of the draw. ``seed`` is the run's seed (or
+    its RandomStreams) and vehicles are keyed by their global index, so a vehicle behaves the same in a
+    fleet of any size and in any shard of the run.
+
+    Record IDs come from ``id_generator`` (utilities.ids), in one block per topic and tick; without one
+    (ID_GENERATOR "random") they are version 4 UUIDs from the vehicles' streams.
+    """
+
+    def __init__(self, size, start_location, end_location, vehicle_prefix="vehicle", seed=None, start_time=None, first_index=0, route=None, weather=None,
+                 incidents=None, motion=FLEET_MOTION, id_generator=None):
+        self.size = size
+        self.vehicle_prefix = vehicle_prefix
+        # Global index of vehicle 0, so shards of one run get distinct vehicle IDs
+        self.first_index = first_index
+        self.route = route
+        # Weather comes from the shared field, so vehicles close to each other report the same conditions
+        self.weather = weather or get_weather_field()
+        if route is not None:
+            start_location, end_location = route.location_at(0.0), route.location_at(route.length_km)
+        self.start_location = start_location
+        self.end_location = end_location
+        self.streams = seed if isinstance(seed, RandomStreams) else RandomStreams(seed)
+        self.rng = self.streams.shard(first_index)  # For draws that belong to this shard rather than a vehicle
+        self.keys = self.streams.vehicle_keys(first_index + np.arange(size))
+        self.ticks = np.zeros(size, dtype=np.uint64)  # Ticks each vehicle took; the counter of its draws
+        # Emergency incidents come from a hazard-rate process instead of one record per vehicle and tick
+        self.id_generator = id_generator or create_id_generator()
+        self.incidents = incidents or IncidentProcess(rng=self.rng, id_generator=self.id_generator)
+
+        if self.id_generator is None:
+            self.ids = uuid_bytes(counter_bits(self.keys, 0, VEHICLE_ID, 2))
+        else:
+            self.ids = self.id_generator.uuid_bytes(size)
+        self.latitude = np.full(size, start_location['latitude'], dtype=np.float64)
+        self.longitude = np.full(size, start_location['longitude'], dtype=np.float64)
+        self.speed = np.zeros(size, dtype=np.float64)  # km/h
+        self.heading = np.zeros(size, dtype=np.float64)  # degrees
+        self.fuel_level = 10 + 90 * counter_uniform(self.keys, 0, FUEL)[:, 0]  # 0-100%
+        start_time = start_time or datetime.now()
+        self.timestamp = np.full(size, start_time.timestamp(), dtype=np.float64)  # epoch seconds
+        self.elapsed = np.zeros(size, dtype=np.float64)  # Seconds covered by each vehicle's last tick
+        self.active = np.ones(size, dtype=bool)
+        self.route_km = np.zeros(size, dtype=np.float64)  # Distance driven along the route
+        self.camera = np.full(size, -1, dtype=np.int64)  # Camera whose range the vehicle was in on its last tick
+
+        self.trajectory = None
+        if motion == "kinematic":
+            self.path = route or Route([start_location['latitude'], end_location['latitude']], [start_location['longitude'], end_location['longitude']])
+            self.trajectory = KinematicProfile(self.path.length_km, 10 + 30 * counter_uniform(self.keys, 0, CRUISE)[:, 0], self.timestamp)
+        elif motion != "random":
+            raise ValueError(f"Unknown fleet motion: {motion!r}")
+
+    @property
+    def active_count(self):
+        return int(np.count_nonzero(self.active))
+
+    def vehicle_id(self, index):
+        return f"{self.vehicle_prefix}-{self.first_index + index}"
+
+    def uniforms(self, indices, purpose, columns=1):
+        """
+        Uniform draws of the vehicles at ``indices`` for their current tick, one row per vehicle.
+        """
+        return counter_uniform(self.keys[indices], self.ticks[indices], purpose, columns)
+
+    def record_ids(self, indices, purpose):
+        """
+        UUIDs of one topic's records of the vehicles at ``indices`` for their current tick, as raw bytes.
+        """
+        if self.id_generator is not None:
+            return self.id_generator.uuid_bytes(len(indices))
+        return uuid_bytes(counter_bits(self.keys[indices], self.ticks[indices], purpose, 2))
+
+    def step(self, elapsed_sec, indices=None):
+        """
+        Advance every active vehicle (or the active ones among ``indices``) in one batched update.
+
+        Args:
+            elapsed_sec (float | numpy.ndarray): Simulated time covered by this tick, either one value for all
+                vehicles or one per entry of ``indices``.
+            indices (numpy.ndarray, optional): Vehicles to advance; defaults to the whole fleet.
+
+        Returns:
+            numpy.ndarray: Indices of the vehicles that were active during this tick.
+        """
+        if indices is None:
+            moving = np.flatnonzero(self.active)
+        else:
+            still_active = self.active[indices]
+            moving = indices[still_active]
+            if np.ndim(elapsed_sec):
+                elapsed_sec = np.asarray(elapsed_sec)[still_active]
+        if moving.size == 0:
+            return moving
+        self.ticks[moving] += 1
+        if self.trajectory is not None:
+            return self._follow_trajectories(moving, elapsed_sec)
+
+        # Same speed range as Vehicle.generate_vehicle_data, drawn for the whole fleet at once
+        speed = np.floor(10 + 31 * self.uniforms(moving, SPEED)[:, 0])
+        distance_km = speed / 3600 * elapsed_sec
+
+        if self.route is not None:
+            remaining_km = self.route.length_km - self.route_km[moving]
+            distance_km = np.minimum(distance_km, remaining_km)
+            self.route_km[moving] += distance_km
+            self.latitude[moving], self.longitude[moving] = self.route.position_at(self.route_km[moving])
+            heading = self.route.bearing_at(self.route_km[moving])
+        else:
+            lat = self.latitude[moving]
+            lon = self.longitude[moving]
+            end_lat = self.end_location['latitude']
+            end_lon = self.end_location['longitude']
+
+            # Never overshoot the destination
+            heading = calculate_bearings(lat, lon, end_lat, end_lon)
+            remaining_km = calculate_distances(lat, lon, end_lat, end_lon)
+            distance_km = np.minimum(distance_km, remaining_km)
+            self.latitude[moving], self.longitude[moving] = update_positions(lat, lon, distance_km, heading)
+
+        self.heading[moving] = heading
+        self.speed[moving] = speed
+        self.fuel_level[moving] = np.maximum(self.fuel_level[moving] - distance_km * FUEL_PER_KM, 0)
+        self.timestamp[moving] += elapsed_sec
+        self.elapsed[moving] = elapsed_sec
+
+        # Vehicles that reached the destination drop out of the next ticks
+        self.active[moving[remaining_km - distance_km <= ARRIVAL_DISTANCE_KM]] = False
+
+        return moving
+
+    def _follow_trajectories(self, moving, elapsed_sec):
+        timestamps = self.timestamp[moving] + elapsed_sec
+        route_km, speed = self.trajectory.state_at(moving, timestamps)
+        distance_km = route_km - self.route_km[moving]
+        self.route_km[moving] = route_km
+        self.latitude[moving], self.longitude[moving] = self.path.position_at(route_km)
+
+        self.heading[moving] = self.path.bearing_at(route_km)
+        self.speed[moving] = speed
+        self.fuel_level[moving] = np.maximum(self.fuel_level[moving] - distance_km * FUEL_PER_KM, 0)
+        self.timestamp[moving] = timestamps
+        self.elapsed[moving] = elapsed_sec
+
+        self.active[moving[timestamps >= self.trajectory.arrival[moving]]] = False
+        return moving
+
+    def restart(self, indices):
+        """
+        Send vehicles back to the start on a new trip, with a refilled tank; their clocks run on.
+        """
+        self.latitude[indices] = self.start_location['latitude']
+        self.longitude[indices] = self.start_location['longitude']
+        self.route_km[indices] = 0.0
+        self.fuel_level[indices] = 10 + 90 * self.uniforms(indices, FUEL)[:, 0]
+        self.camera[indices] = -1
+        self.active[indices] = True
+        if self.trajectory is not None:
+            self.trajectory.depart(indices, self.timestamp[indices])
+
+    def passing_cameras(self, cameras, indices):
+        """
+        Vehicles among ``indices`` that entered a camera's range since their previous tick.
+
+        Args:
+            cameras (CameraRegistry): Registry to look the vehicles' positions up in.
+            indices (numpy.ndarray): Vehicles that just moved.
+
+        Returns:
+            tuple: The vehicle indices and, for each, the index of the nearest camera in range.
+        """
+        nearest, _ = cameras.nearest(self.latitude[indices], self.longitude[indices])
+        entered = (nearest >= 0) & (nearest != self.camera[indices])
+        self.camera[indices] = nearest
+        return indices[entered], nearest[entered]
+
+    def _columns(self, indices):
+        # Pull the per-vehicle columns out as Python lists once per batch instead of indexing
+        # the arrays element by element inside the record loops
+        latitudes = self.latitude[indices].tolist()
+        longitudes = self.longitude[indices].tolist()
+        locations = [{'latitude': lat, 'longitude': lon} for lat, lon in zip(latitudes, longitudes)]
+        timestamps = [datetime.fromtimestamp(ts).isoformat() for ts in self.timestamp[indices].tolist()]
+        return locations, timestamps
+
+    def vehicle_records(self, indices):
+        locations, timestamps = self._columns(indices)
+        directions = compass_direction(self.heading[indices]).tolist()
+        speeds = self.speed[indices].astype(np.int64).tolist()
+        fuel_levels = self.fuel_level[indices].astype(np.int64).tolist()
+        active = self.active[indices].tolist()
+        for i, index in enumerate(indices.tolist()):
+            yield VehicleTelemetry(
+                uuid.UUID(bytes=self.ids[index].tobytes()),
+                self.vehicle_id(index),
+                locations[i],
+                timestamps[i],
+                speeds[i],
+                COMPASS_POINTS[directions[i]],
+                'Active' if active[i] else 'Arrived',
+                fuel_levels[i],
+            )
+
+    def profile_records(self, indices=None):
+        # Static attributes, published once per vehicle to the compacted profile topic
+        indices = np.arange(self.size) if indices is None else indices
+        _, timestamps = self._columns(indices)
+        for i, index in enumerate(indices.tolist()):
+            yield VehicleProfile(self.vehicle_id(index), timestamps[i], 'Toyota', 'Corolla', 2015, 'Red', 'ABC-123', 'Sedan', 'Gasoline')
+
+    def gps_records(self, indices, vehicle_type="private"):
+        locations, timestamps = self._columns(indices)
+        directions = compass_direction(self.heading[indices]).tolist()
+        speeds = self.speed[indices].astype(np.int64).tolist()
+        record_ids = self.record_ids(indices, GPS_ID)
+        for i, index in enumerate(indices.tolist()):
+            yield {
+                "id": uuid.UUID(bytes=record_ids[i].tobytes()),
+                "timestamp": timestamps[i],
+                "vehicle_id": self.vehicle_id(index),
+                "speed": speeds[i],
+                "direction": COMPASS_POINTS[directions[i]],
+                "vehicle_type": vehicle_type
+            }
+
+    def traffic_camera_records(self, indices, camera_ids):
+        # One camera ID for every vehicle, or one per entry of indices
+        if isinstance(camera_ids, str):
+            camera_ids = [camera_ids] * len(indices)
+        locations, timestamps = self._columns(indices)
+        record_ids = self.record_ids(indices, CAMERA_ID)
+        for i, index in enumerate(indices.tolist()):
+            yield {
+                "id": uuid.UUID(bytes=record_ids[i].tobytes()),
+                "timestamp": timestamps[i],
+                "vehicle_id": self.vehicle_id(index),
+                "camera_id": camera_ids[i],
+                "location": locations[i],
+                "snapshot": 'base64EncodedStringImage'
+            }
+
+    def weather_records(self, indices):
+        # One weather field lookup per distinct cell in the batch, not ten random draws per vehicle
+        locations, timestamps = self._columns(indices)
+        record_ids = self.record_ids(indices, WEATHER_ID)
+        conditions = self.weather.lookup(self.latitude[indices], self.longitude[indices], self.timestamp[indices])
+        for i, index in enumerate(indices.tolist()):
+            weather = conditions[i]
+            yield {
+                "id": uuid.UUID(bytes=record_ids[i].tobytes()),
+                "timestamp": timestamps[i],
+                "vehicle_id": self.vehicle_id(index),
+                "temperature": weather["temperature"],
+                "humidity": weather["humidity"],
+                "wind_speed": weather["wind_speed"],
+                "wind_direction": weather["wind_direction"],
+                "location": locations[i],
+                "weather": weather["weather"],
+                "precipitation": weather["precipitation"],
+                "visibility": weather["visibility"],
+                "pressure": weather["pressure"],
+                "cloud_cover": weather["cloud_cover"],
+                "air_quality_index": weather["air_quality_index"],
+            }
+
+    def emergency_incident_records(self, indices):
+        # Only incident state changes: a handful of records per tick for the whole fleet, not one per vehicle
+        yield from self.incidents.step(lambda i: self.vehicle_id(int(indices[i])), self.latitude[indices], self.longitude[indices],
+                                       self.timestamp[indices], self.elapsed[indices], uniforms=self.uniforms(indices, INCIDENT, INCIDENT_DRAWS),
+                                       id_bits=lambda i: counter_bits(self.keys[indices[i]], self.ticks[indices[i]], INCIDENT_ID, 2))
@@ -0,0 +1,217 @@
+from datetime import datetime
+import math
+import time
+import uuid
+
+import numpy as np
+
+from config.settings import INCIDENT_RATE_PER_HOUR, INCIDENT_SEGMENT_KM, INCIDENT_HOURLY_PROFILE, INCIDENT_SEED
+from models.weather import hash_noise
+from utilities.random_streams import counter_bits
+
+# "None" stays last in the list: it is part of the binary enum of older records, but is never drawn
+EMERGENCY_TYPES = ["Accident", "Fire", "Theft", "Medical", "Other", "None"]
+SEVERITIES = ["Low", "Medium", "High"]
+
+KM_PER_DEG = 111.2
+
+# Relative hazard per hour of the day (local time): rush hour peaks, quiet nights
+DEFAULT_HOURLY_PROFILE = [0.4, 0.3, 0.3, 0.3, 0.4, 0.7, 1.2, 2.0, 2.2, 1.4, 1.0, 1.0,
+                          1.1, 1.1, 1.2, 1.5, 2.0, 2.3, 1.9, 1.3, 1.0, 0.8, 0.6, 0.5]
+
+# Per incident type: share of incidents, mean duration until resolved (minutes), severity weights and
+# the description of each lifecycle state
+INCIDENT_TYPES = {
+    "Accident": (0.55, 45, [0.5, 0.35, 0.15], ("Vehicle involved in an accident", "Responders on scene, lane blocked", "Accident cleared")),
+    "Fire": (0.05, 90, [0.1, 0.4, 0.5], ("Vehicle fire reported", "Fire crews on scene", "Fire extinguished, road reopened")),
+    "Theft": (0.10, 120, [0.6, 0.3, 0.1], ("Vehicle theft reported", "Police investigating", "Theft report closed")),
+    "Medical": (0.15, 30, [0.2, 0.5, 0.3], ("Medical emergency in vehicle", "Paramedics on scene", "Patient transported")),
+    "Other": (0.15, 20, [0.7, 0.25, 0.05], ("Roadside incident reported", "Road crew on scene", "Incident resolved")),
+}
+
+OPEN, UPDATED, RESOLVED = "Open", "Updated", "Resolved"
+
+# Uniform draws per vehicle tick: whether an incident opens, then its type, severity, duration, update time
+# and the severity change at the update
+INCIDENT_DRAWS = 6
+
+
+class Incident:
+    """
+    One incident's lifecycle state: where it happened, what it is and when its next state changes are due.
+    """
+
+    __slots__ = ("incident_id", "vehicle_id", "location", "emergency_type", "severity", "update_at", "resolve_at", "updated", "severity_change",
+                 "id_bits")
+
+    def __init__(self, incident_id, vehicle_id, location, emergency_type, severity, update_at, resolve_at, severity_change=0, id_bits=None):
+        self.incident_id = incident_id
+        self.vehicle_id = vehicle_id
+        self.location = location
+        self.emergency_type = emergency_type
+        self.severity = severity
+        self.update_at = update_at
+        self.resolve_at = resolve_at
+        self.updated = False
+        self.severity_change = severity_change  # Applied when responders reassess, at update_at
+        self.id_bits = id_bits  # Stream words the incident's IDs derive from, if it came from a vehicle stream
+
+
+class IncidentProcess:
+    """
+    Emergency incidents as a non-homogeneous Poisson process over vehicles, road segments and time of day.
+
+    Every driving vehicle is exposed to a hazard of ``rate_per_hour`` incidents per hour, scaled by the
+    hourly profile (local time) and by a fixed factor of the road segment it is on: segments are
+    ``segment_km`` grid cells whose factor is a hashed, exponentially distributed draw, so a few hot spots
+    see most of the incidents and the same seed puts them in the same places in every process. A vehicle
+    that drove ``dt`` seconds opens an incident with probability ``1 - exp(-hazard * dt)``.
+
+    An incident emits a record only when its state changes: ``Open`` when it happens, one ``Updated``
+    (responders on scene, possibly a new severity) partway through, and ``Resolved`` after a duration drawn
+    from its type's mean. The incident_id ties the three records together.
+    """
+
+    def __init__(self, rate_per_hour=INCIDENT_RATE_PER_HOUR, segment_km=INCIDENT_SEGMENT_KM, hourly_profile=None, seed=INCIDENT_SEED, rng=None,
+                 id_generator=None):
+        self.rate_per_sec = rate_per_hour / 3600
+        self.segment_deg = segment_km / KM_PER_DEG
+        self.hourly_profile = np.asarray(hourly_profile or INCIDENT_HOURLY_PROFILE or DEFAULT_HOURLY_PROFILE, dtype=np.float64)
+        if self.hourly_profile.shape != (24,):
+            raise ValueError(f"The hourly incident profile needs 24 values, got {self.hourly_profile.size}")
+        self.seed = seed
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.id_generator = id_generator  # Time-ordered IDs (utilities.ids); None draws version 4 UUIDs from rng
+        self.open = {}  # incident_id -> Incident
+        self.opened = 0
+        self.resolved = 0
+
+        names = list(INCIDENT_TYPES)
+        shares = np.array([INCIDENT_TYPES[name][0] for name in names])
+        self._type_names = names
+        self._type_cumulative = np.cumsum(shares / shares.sum())
+        self._severity_cumulative = {name: np.cumsum(INCIDENT_TYPES[name][2]) for name in names}
+
+    def hazard(self, latitudes, longitudes, timestamps):
+        """
+        Incidents per second for vehicles at the given positions and epoch-second timestamps.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        # Local hour of day, interpolated between the profile's hourly values
+        local_hours = ((timestamps + _utc_offset_sec(timestamps)) / 3600) % 24
+        hour = np.floor(local_hours).astype(np.int64)
+        weight = local_hours - hour
+        profile = self.hourly_profile[hour] * (1 - weight) + self.hourly_profile[(hour + 1) % 24] * weight
+
+        cell_y = np.floor(np.asarray(latitudes) / self.segment_deg).astype(np.int64)
+        # Longitude cells narrow with the cosine of their row's latitude, so segments stay roughly square
+        cell_x = np.floor(np.asarray(longitudes) * np.cos(np.radians((cell_y + 0.5) * self.segment_deg)) / self.segment_deg).astype(np.int64)
+        segment = -np.log1p(-hash_noise(self.seed, cell_x, cell_y, 0, 7))  # Exponential with mean 1
+        return self.rate_per_sec * profile * segment
+
+    def step(self, vehicle_id, latitudes, longitudes, timestamps, exposure_sec, now=None, uniforms=None, id_bits=None):
+        """
+        Draw new incidents for one batch of vehicle ticks and advance the open ones to ``now``.
+
+        Args:
+            vehicle_id (callable): Vehicle ID of the i-th tick; only called for the ticks that open an incident.
+            latitudes (numpy.ndarray): Vehicle latitudes.
+            longitudes (numpy.ndarray): Vehicle longitudes.
+            timestamps (numpy.ndarray): Epoch-second timestamps of the ticks.
+            exposure_sec (numpy.ndarray): Seconds each vehicle drove since its previous tick.
+            now (float, optional): Current epoch-second time for updates and resolutions; defaults to the
+                latest tick timestamp.
+            uniforms (numpy.ndarray, optional): ``(ticks, INCIDENT_DRAWS)`` uniform draws to decide with, e.g. from
+                each vehicle's own stream; defaults to draws from the process's generator.
+            id_bits (callable, optional): Two random uint64 words of the i-th tick, e.g. from the vehicle's own
+                stream; only called for the ticks that open an incident. The incident_id and the IDs of the
+                incident's records are derived from them, so they don't depend on the process either.
+                Ignored when an ``id_generator`` is set; without either, IDs are drawn from the process's generator.
+
+        Returns:
+            list: Emergency incident records of the state changes, in time order.
+        """
+        timestamps = np.atleast_1d(np.asarray(timestamps, dtype=np.float64))
+        records = self.advance(now if now is not None else (float(timestamps.max()) if timestamps.size else None))
+        if not timestamps.size:
+            return records
+
+        if uniforms is None:
+            uniforms = self.rng.random((timestamps.size, INCIDENT_DRAWS))
+        probability = -np.expm1(-self.hazard(latitudes, longitudes, timestamps) * np.asarray(exposure_sec, dtype=np.float64))
+        hits = np.flatnonzero(uniforms[:, 0] < probability)
+        if hits.size:
+            latitudes, longitudes = np.atleast_1d(latitudes), np.atleast_1d(longitudes)
+            for i in hits.tolist():
+                records.append(self._open(vehicle_id(i), {'latitude': float(latitudes[i]), 'longitude': float(longitudes[i])}, float(timestamps[i]),
+                                          uniforms[i, 1:].tolist(), id_bits(i) if id_bits is not None else None))
+        return records
+
+    def _open(self, vehicle_id, location, timestamp, draws, id_bits=None):
+        # Inverse-CDF sampling from the tick's uniform draws, so the outcome only depends on those draws
+        type_draw, severity_draw, duration_draw, update_draw, change_draw = draws
+        emergency_type = self._type_names[min(int(np.searchsorted(self._type_cumulative, type_draw, side="right")), len(self._type_names) - 1)]
+        mean_minutes = INCIDENT_TYPES[emergency_type][1]
+        severity = min(int(np.searchsorted(self._severity_cumulative[emergency_type], severity_draw, side="right")), len(SEVERITIES) - 1)
+        duration_sec = -mean_minutes * 60 * math.log1p(-duration_draw) + 60
+        # Stream-derived IDs stand in for random ones only; a configured id_generator keeps its time-ordered IDs
+        incident_id = _stream_uuid(id_bits) if id_bits is not None and self.id_generator is None else self._new_id()
+        incident = Incident(incident_id, vehicle_id, location, emergency_type, severity,
+                            timestamp + duration_sec * (0.1 + 0.4 * update_draw), timestamp + duration_sec, min(int(change_draw * 3), 2) - 1, id_bits)
+        self.open[incident.incident_id] = incident
+        self.opened += 1
+        return self._record(incident, OPEN, timestamp)
+
+    def advance(self, now):
+        """
+        Emit the updates and resolutions due by ``now`` (epoch seconds).
+        """
+        if now is None or not self.open:
+            return []
+        changes = []
+        for incident in list(self.open.values()):
+            if not incident.updated and incident.update_at <= now:
+                incident.updated = True
+                # Responders reassess: severity moves by at most one step
+                incident.severity = int(np.clip(incident.severity + incident.severity_change, 0, len(SEVERITIES) - 1))
+                changes.append((incident.update_at, self._record(incident, UPDATED, incident.update_at)))
+            if incident.resolve_at <= now:
+                del self.open[incident.incident_id]
+                self.resolved += 1
+                changes.append((incident.resolve_at, self._record(incident, RESOLVED, incident.resolve_at)))
+        changes.sort(key=lambda change: change[0])
+        return [record for _, record in changes]
+
+    def _new_id(self, incident=None, status=None):
+        if self.id_generator is not None:
+            return uuid.UUID(bytes=self.id_generator.uuid_bytes(1)[0].tobytes())
+        if incident is not None and incident.id_bits is not None:
+            # One ID per lifecycle state, hashed from the incident's stream words
+            return _stream_uuid(counter_bits(incident.id_bits[0], incident.id_bits[1], 1 + [OPEN, UPDATED, RESOLVED].index(status), 2))
+        return uuid.UUID(bytes=self.rng.bytes(16), version=4)
+
+    def _record(self, incident, status, timestamp):
+        descriptions = INCIDENT_TYPES[incident.emergency_type][3]
+        return {
+            "id": self._new_id(incident, status),
+            "incident_id": incident.incident_id,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "vehicle_id": incident.vehicle_id,
+            "location": incident.location,
+            "emergency_type": incident.emergency_type,
+            "description": descriptions[[OPEN, UPDATED, RESOLVED].index(status)],
+            "severity": SEVERITIES[incident.severity],
+            "status": status,
+        }
+
+
+def _stream_uuid(words):
+    # Version 4 UUID from two random uint64 words, byte for byte like the fleet's record IDs
+    return uuid.UUID(bytes=np.asarray(words, dtype=np.uint64).tobytes(), version=4)
+
+
+def _utc_offset_sec(timestamps):
+    # One offset for the batch: a tick never spans a DST switch in any way that matters here
+    if not timestamps.size:
+        return 0
+    return time.localtime(float(timestamps.flat[0])).tm_gmtoff
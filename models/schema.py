@@ -0,0 +1,69 @@
+class RecordSchema:
+    """
+    Field order and wire types of one record type.
+
+    Fields are ``(name, type)`` tuples, or ``(name, "enum", choices)`` for string fields that only take
+    a fixed set of values. Supported types:
+
+    - ``uuid``: 16 raw bytes
+    - ``str``: UTF-8, length-prefixed
+    - ``enum``: one byte indexing ``choices``
+    - ``timestamp``: ISO-8601 string on the record, int64 microseconds since the epoch on the wire
+    - ``location``: ``{"latitude", "longitude"}`` dict, two float64s on the wire
+    - ``i16`` / ``i32`` / ``i64``: signed integers
+    - ``f32`` / ``f64``: floats
+
+    ``key`` names the field used as the Kafka message key (a ``uuid`` or ``str`` field).
+    """
+
+    def __init__(self, name, schema_id, fields, version=1, key="id"):
+        self.name = name
+        self.schema_id = schema_id
+        self.version = version
+        self.key = key
+        self.fields = [field if len(field) == 3 else (field[0], field[1], None) for field in fields]
+
+    @property
+    def field_names(self):
+        return [name for name, _, _ in self.fields]
+
+    def __repr__(self):
+        return f"RecordSchema({self.name!r}, id={self.schema_id}, v{self.version}, {len(self.fields)} fields)"
+
+
+class Record:
+    """
+    Base of the compact record types built by ``record_type``: one slot per schema field, no per-instance dict.
+
+    Records support ``record[name]`` and ``record.get(name)`` like the dicts they replace, and
+    ``for_json()`` for simplejson's ``for_json=True`` encoding.
+    """
+
+    __slots__ = ()
+    schema = None
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def for_json(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+
+def record_type(class_name, schema):
+    """
+    Build a ``Record`` subclass whose slots are the fields of ``schema``, in schema order.
+    """
+    return type(class_name, (Record,), {"__slots__": tuple(schema.field_names), "schema": schema})
@@ -0,0 +1,123 @@
+import numpy as np
+
+from config.settings import TRAJECTORY_ACCELERATION, TRAJECTORY_DECELERATION, TRAJECTORY_STOP_KM, TRAJECTORY_DWELL_SEC
+
+
+def leg_phases(leg_m, cruise_ms, acceleration, deceleration):
+    """
+    Accelerate / cruise / decelerate phases of driving ``leg_m`` metres from standstill to standstill.
+
+    A leg too short to reach the cruise speed becomes a triangle: the vehicle peaks at the speed from which
+    it can still brake in time and never cruises.
+
+    Returns:
+        tuple: Arrays of the peak speed (m/s), the acceleration, cruise and deceleration durations (s) and
+        the distance covered while accelerating (m).
+    """
+    leg_m = np.asarray(leg_m, dtype=np.float64)
+    peak = np.minimum(cruise_ms, np.sqrt(2 * leg_m * acceleration * deceleration / (acceleration + deceleration)))
+    accelerate_sec = peak / acceleration
+    decelerate_sec = peak / deceleration
+    accelerate_m = peak ** 2 / (2 * acceleration)
+    cruise_m = np.maximum(leg_m - accelerate_m - peak ** 2 / (2 * deceleration), 0.0)
+    cruise_sec = np.divide(cruise_m, peak, out=np.zeros_like(cruise_m), where=peak > 0)
+    return peak, accelerate_sec, cruise_sec, decelerate_sec, accelerate_m
+
+
+class KinematicProfile:
+    """
+    Closed-form motion of a fleet along a path of ``length_km``, evaluated at any timestamp.
+
+    The path is cut into legs at a stop every ``stop_km`` (lights, junctions); the last leg takes the rest.
+    On every leg a vehicle accelerates at ``acceleration`` m/s² to its cruise speed, cruises and brakes at
+    ``deceleration`` m/s² to a halt, then waits ``dwell_sec`` before the next leg. All full legs have the same
+    length, so for a vehicle they all take the same time, and the leg a timestamp falls into is one division
+    away: position and speed at any time cost a fixed handful of array operations per sample, however far
+    apart or irregular the samples are. Nothing is integrated, so nothing drifts.
+
+    Per-vehicle state is the cruise speed, the departure time and the phase durations of a full and of the
+    last leg; ``depart`` sends vehicles off again.
+    """
+
+    def __init__(self, length_km, cruise_kmh, departure, acceleration=TRAJECTORY_ACCELERATION, deceleration=TRAJECTORY_DECELERATION,
+                 stop_km=TRAJECTORY_STOP_KM, dwell_sec=TRAJECTORY_DWELL_SEC):
+        self.length_km = float(length_km)
+        self.acceleration = acceleration
+        self.deceleration = deceleration
+        self.dwell_sec = dwell_sec
+        self.cruise_ms = np.asarray(cruise_kmh, dtype=np.float64) / 3.6
+        self.departure = np.array(np.broadcast_to(departure, self.cruise_ms.shape), dtype=np.float64)  # epoch seconds
+
+        if stop_km and 0 < stop_km < self.length_km:
+            self.full_legs = int(self.length_km // stop_km)
+            self.leg_km = float(stop_km)
+            self.last_leg_km = self.length_km - self.full_legs * stop_km
+            if self.last_leg_km < 1e-9:
+                # The path ends on a stop: the last leg is a full one
+                self.full_legs -= 1
+                self.last_leg_km = self.leg_km
+        else:
+            self.full_legs, self.leg_km, self.last_leg_km = 0, 0.0, self.length_km
+
+        self.full = leg_phases(self.leg_km * 1000, self.cruise_ms, acceleration, deceleration)
+        self.last = leg_phases(self.last_leg_km * 1000, self.cruise_ms, acceleration, deceleration)
+        # Time from one leg's start to the next's: driving plus the dwell at the stop
+        self.period = (self.full[1] + self.full[2] + self.full[3] + dwell_sec) if self.full_legs else np.zeros_like(self.cruise_ms)
+        self.last_leg_sec = self.last[1] + self.last[2] + self.last[3]
+
+    @property
+    def trip_sec(self):
+        """
+        Seconds from departure to arrival, per vehicle.
+        """
+        return self.full_legs * self.period + self.last_leg_sec
+
+    @property
+    def arrival(self):
+        return self.departure + self.trip_sec
+
+    def depart(self, indices, departure):
+        """
+        Start the trip of the vehicles at ``indices`` over, leaving at ``departure`` (epoch seconds).
+        """
+        self.departure[indices] = departure
+
+    def state_at(self, indices, timestamps):
+        """
+        Distance along the path and speed of the vehicles at ``indices`` at ``timestamps``.
+
+        Args:
+            indices (numpy.ndarray): Vehicles to evaluate; may repeat, to sample one vehicle at many times.
+            timestamps (float | numpy.ndarray): Epoch seconds, one for all or one per entry of ``indices``.
+                Times before departure give the start, times after arrival the end of the path.
+
+        Returns:
+            tuple: Arrays of the distance driven (km) and the speed (km/h).
+        """
+        elapsed = np.maximum(np.asarray(timestamps, dtype=np.float64) - self.departure[indices], 0.0)
+        if self.full_legs:
+            period = self.period[indices]
+            leg = np.minimum(np.floor(elapsed / period), self.full_legs)
+            elapsed = elapsed - leg * period
+            on_last = leg >= self.full_legs
+            peak, accelerate_sec, cruise_sec, decelerate_sec, accelerate_m = (
+                np.where(on_last, last[indices], full[indices]) for last, full in zip(self.last, self.full))
+            leg_m = np.where(on_last, self.last_leg_km, self.leg_km) * 1000
+            start_m = leg * self.leg_km * 1000
+        else:
+            peak, accelerate_sec, cruise_sec, decelerate_sec, accelerate_m = (phase[indices] for phase in self.last)
+            leg_m = self.last_leg_km * 1000
+            start_m = 0.0
+
+        # Time into the leg, clamped to its driving time: past it the vehicle stands at the stop
+        braking_at = accelerate_sec + cruise_sec
+        leg_sec = braking_at + decelerate_sec
+        elapsed = np.minimum(elapsed, leg_sec)
+        to_go = leg_sec - elapsed
+        accelerating = elapsed < accelerate_sec
+        braking = elapsed > braking_at
+
+        distance_m = np.where(accelerating, 0.5 * self.acceleration * elapsed ** 2,
+                              np.where(braking, leg_m - 0.5 * self.deceleration * to_go ** 2, accelerate_m + peak * (elapsed - accelerate_sec)))
+        speed_ms = np.where(accelerating, self.acceleration * elapsed, np.where(braking, self.deceleration * to_go, peak))
+        return (start_m + distance_m) / 1000, speed_ms * 3.6
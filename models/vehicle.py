@@ -1,72 +1,152 @@
-from datetime import datetime, timedelta
-import random
 import uuid
 
-from utilities.coordinates import generate_random_movement
+import numpy as np
 
-random.seed(42)
+from models.schema import RecordSchema, record_type
+from utilities.clock import SimulationClock
+from utilities.coordinates import COMPASS_POINTS, generate_random_movement
+from models.weather import WEATHER_CONDITIONS, get_weather_field
+from models.incidents import EMERGENCY_TYPES, SEVERITIES, IncidentProcess
+from utilities.ids import create_id_generator
+
+# Wire schemas of the record types, used by the compact binary serializer (services/serializers.py)
+
+# Per-tick vehicle telemetry: only the fields that change. The static attributes moved to the profile
+# topic in version 2.
+VEHICLE_SCHEMA = RecordSchema("vehicle", 1, [
+    ("id", "uuid"),
+    ("vehicle_id", "str"),
+    ("location", "location"),
+    ("timestamp", "timestamp"),
+    ("speed", "i16"),
+    ("direction", "enum", COMPASS_POINTS),
+    ("status", "str"),
+    ("fuel_level", "i16"),
+], version=2)
+
+# Static vehicle attributes, published once per vehicle to a log-compacted topic keyed by vehicle_id
+VEHICLE_PROFILE_SCHEMA = RecordSchema("vehicle_profile", 6, [
+    ("vehicle_id", "str"),
+    ("timestamp", "timestamp"),
+    ("make", "str"),
+    ("model", "str"),
+    ("year", "i16"),
+    ("color", "str"),
+    ("license_plate", "str"),
+    ("vehicle_type", "str"),
+    ("fuel_type", "str"),
+], key="vehicle_id")
+
+GPS_SCHEMA = RecordSchema("gps", 2, [
+    ("id", "uuid"),
+    ("timestamp", "timestamp"),
+    ("vehicle_id", "str"),
+    ("speed", "i16"),
+    ("direction", "enum", COMPASS_POINTS),
+    ("vehicle_type", "str"),
+])
+
+TRAFFIC_CAMERA_SCHEMA = RecordSchema("traffic_camera", 3, [
+    ("id", "uuid"),
+    ("timestamp", "timestamp"),
+    ("vehicle_id", "str"),
+    ("camera_id", "str"),
+    ("location", "location"),
+    ("snapshot", "str"),
+])
+
+WEATHER_SCHEMA = RecordSchema("weather", 4, [
+    ("id", "uuid"),
+    ("timestamp", "timestamp"),
+    ("vehicle_id", "str"),
+    ("temperature", "i16"),
+    ("humidity", "i16"),
+    ("wind_speed", "i16"),
+    ("wind_direction", "enum", COMPASS_POINTS),
+    ("location", "location"),
+    ("weather", "enum", WEATHER_CONDITIONS),
+    ("precipitation", "i16"),
+    ("visibility", "i16"),
+    ("pressure", "i16"),
+    ("cloud_cover", "i16"),
+    ("air_quality_index", "i16"),
+])
+
+EMERGENCY_INCIDENT_SCHEMA = RecordSchema("emergency_incident", 5, [
+    ("id", "uuid"),
+    ("incident_id", "uuid"),
+    ("timestamp", "timestamp"),
+    ("vehicle_id", "str"),
+    ("location", "location"),
+    ("emergency_type", "enum", EMERGENCY_TYPES),
+    ("description", "str"),
+    ("severity", "enum", SEVERITIES),
+    ("status", "str"),
+])
+
+VehicleTelemetry = record_type("VehicleTelemetry", VEHICLE_SCHEMA)
+VehicleProfile = record_type("VehicleProfile", VEHICLE_PROFILE_SCHEMA)
 
 class Vehicle:
-    def __init__(self, vehicle_id, start_location, end_location):
-        self.id = uuid.uuid4()
+    def __init__(self, vehicle_id, start_location, end_location, clock=None, route=None, rng=None, id_generator=None):
+        # The vehicle's own random stream (e.g. RandomStreams.vehicle_generator); unseeded by default
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Record IDs: time-ordered ones from utilities.ids, or version 4 UUIDs from the vehicle's stream
+        self.id_generator = id_generator or create_id_generator(rng=self.rng)
+        self.id = self.new_id()
         self.vehicle_id = vehicle_id
         self.location = start_location
-        self.start_time = datetime.now()
+        # Timestamps come from the (possibly virtual) simulation clock, never from datetime.now()
+        self.clock = clock or SimulationClock()
+        self.start_time = self.clock.now()
         self.end_location = end_location
+        # Optional road route (utilities.routing.Route); without one the vehicle drives in a straight line
+        self.route = route
+        self.route_distance_km = 0.0
+        # Incidents happen now and then rather than on every tick; see models/incidents.py
+        self.incidents = IncidentProcess(rng=self.rng, id_generator=self.id_generator)
+        self.last_incident_check = self.clock.timestamp()
 
     def generate_vehicle_data(self, current_latitude, current_longitude):
-        # Use the generate_random_movement function to get new latitude and longitude
-        new_lat, new_lon = generate_random_movement(current_latitude, current_longitude, self.end_location['latitude'], self.end_location['longitude'], 2, 10)
+        if self.route is not None:
+            # Advance along the road: a lookup on the route's cumulative distances, no per-tick trigonometry
+            self.route_distance_km = min(self.route_distance_km + self.rng.uniform(2, 10), self.route.length_km)
+            new_lat, new_lon = self.route.position_at(self.route_distance_km)
+            new_lat, new_lon = float(new_lat), float(new_lon)
+        else:
+            # Use the generate_random_movement function to get new latitude and longitude
+            new_lat, new_lon = generate_random_movement(current_latitude, current_longitude, self.end_location['latitude'], self.end_location['longitude'], 2, 10, self.rng)
 
         # Move toward the university
-        self.location['latitude'] += new_lat
-        self.location['longitude'] += new_lon
+        self.location['latitude'] = new_lat
+        self.location['longitude'] = new_lon
 
         # Simulate Actual Vehicle Trip
         self.timestamp = self.get_current_time().isoformat()
-        self.speed = random.randint(10, 40) # km/h
+        self.speed = int(self.rng.integers(10, 41)) # km/h
         self.direction = 'North-East'
-        self.make = 'Toyota'
-        self.model = 'Corolla'
-        self.year = 2015
-        self.color = 'Red'
-        self.license_plate = 'ABC-123'
-        self.vehicle_type = 'Sedan'
         self.status = 'Active'
-        self.fuel_type = 'Gasoline'
-        self.fuel_level = random.randint(10, 100)
+        self.fuel_level = int(self.rng.integers(10, 101))
 
-        return {
-            'id': self.id,
-            'vehicle_id': self.vehicle_id,
-            'location': self.location,
-            'timestamp': self.timestamp,
-            'speed': self.speed,
-            'direction': self.direction,
-            'make': self.make,
-            'model': self.model,
-            'year': self.year,
-            'color': self.color,
-            'license_plate': self.license_plate,
-            'vehicle_type': self.vehicle_type,
-            'status': self.status,
-            'fuel_type': self.fuel_type,
-            'fuel_level': self.fuel_level
-        }
+        return VehicleTelemetry(self.id, self.vehicle_id, self.location, self.timestamp, self.speed, self.direction, self.status, self.fuel_level)
+
+    def generate_profile_data(self):
+        # Static attributes, sent once per vehicle rather than on every tick
+        return VehicleProfile(self.vehicle_id, self.get_current_time().isoformat(), 'Toyota', 'Corolla', 2015, 'Red', 'ABC-123', 'Sedan', 'Gasoline')
 
     def generate_gps_data(self, vehicle_id, timestamp, vehicle_type="private"):
         return {
-            "id": uuid.uuid4(),
+            "id": self.new_id(),
             "timestamp": timestamp,
             "vehicle_id": vehicle_id,
-            "speed": random.randint(0, 40),
+            "speed": int(self.rng.integers(0, 41)),
             "direction": "North-East",
             "vehicle_type": vehicle_type
         }
     
     def generate_traffic_camera_data(self, vehicle_id, timestamp, location, camera_id):
         return {
-            "id": uuid.uuid4(),
+            "id": self.new_id(),
             "timestamp": timestamp,
             "vehicle_id": vehicle_id,
             "camera_id": camera_id,
@@ -75,35 +155,36 @@ class Vehicle:
         }
 
     def generate_weather_data(self, vehicle_id, timestamp, location):
+        # Conditions come from the shared weather field (models/weather.py): same cell, same weather
+        weather = get_weather_field().conditions_at(location['latitude'], location['longitude'], self.clock.timestamp())
         return {
-            "id": uuid.uuid4(),
+            "id": self.new_id(),
             "timestamp": self.get_current_time().isoformat(), # timestamp,
             "vehicle_id": vehicle_id, # "vehicle-arsene-212"
-            "temperature": random.randint(-10, 44), # -10 to 44 degree celsius
-            "humidity": random.randint(10, 100), # 0-100%
-            "wind_speed": random.randint(0, 40), # km/h
-            "wind_direction": random.choice(["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]), # "North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"
+            "temperature": weather["temperature"], # -10 to 44 degree celsius
+            "humidity": weather["humidity"], # 10-100%
+            "wind_speed": weather["wind_speed"], # km/h
+            "wind_direction": weather["wind_direction"], # "North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"
             "location": location, # "latitude": "47.6062", "longitude": "122.3321"
-            "weather": random.choice(["Sunny", "Rainy", "Snowy", "Cloudy"]), # "Sunny", "Rainy", "Snowy", "Cloudy"
-            "precipitation": random.randint(0, 100), # 0-100%
-            "visibility": random.randint(0, 20), # km 
-            "pressure": random.randint(1000, 1030), # hPa
-            "cloud_cover": random.randint(0, 100), # 0-100%
-            "air_quality_index": random.randint(0, 500), # AQL > 300 is hazardous
+            "weather": weather["weather"], # "Sunny", "Rainy", "Snowy", "Cloudy"
+            "precipitation": weather["precipitation"], # 0-100%
+            "visibility": weather["visibility"], # km
+            "pressure": weather["pressure"], # hPa
+            "cloud_cover": weather["cloud_cover"], # 0-100%
+            "air_quality_index": weather["air_quality_index"], # AQL > 300 is hazardous
         }
     
     def generate_emergency_incident_data(self, vehicle_id, timestamp, location):
-        return {
-            "id": uuid.uuid4(),
-            "incident_id": uuid.uuid4(),
-            "timestamp": timestamp,
-            "vehicle_id": vehicle_id,
-            "location": location, # "latitude": "47.6062", "longitude": "122.3321"
-            "emergency_type": random.choice(["Accident", "Fire", "Theft", "Medical", "Other", "None"]),
-            "description": "Vehicle involved in an accident",
-            "severity": random.choice(["Low", "Medium", "High"]),
-            "status": "Active"
-        }
-    
+        # Only incident state changes (open / updated / resolved) produce records, so this is usually empty
+        now = self.clock.timestamp()
+        exposure_sec = now - self.last_incident_check
+        self.last_incident_check = now
+        return self.incidents.step(lambda _: vehicle_id, location['latitude'], location['longitude'], now, exposure_sec)
+
+    def new_id(self):
+        if self.id_generator is not None:
+            return uuid.UUID(bytes=self.id_generator.uuid_bytes(1)[0].tobytes())
+        return uuid.UUID(bytes=self.rng.bytes(16), version=4)
+
     def get_current_time(self):
-        return self.start_time + timedelta(seconds=random.randint(25, 60))
+        return self.clock.now()
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+import math
+
+import numpy as np
+
+from config.settings import WEATHER_SEED, WEATHER_CELL_DEG, WEATHER_BUCKET_SEC, WEATHER_CACHE_CELLS
+from utilities.coordinates import COMPASS_POINTS
+from utilities.random_streams import GOLDEN_GAMMA, mix64
+
+DAY_SEC = 86400
+FRONT_PERIOD_SEC = 3 * DAY_SEC  # Large weather systems passing through
+SHOWER_PERIOD_SEC = 11 * 3600  # Shorter-lived local variation
+
+# Order is the binary wire encoding of the "weather" enum (models/vehicle.py)
+WEATHER_CONDITIONS = ["Sunny", "Rainy", "Snowy", "Cloudy"]
+WEATHER_FIELDS = ["temperature", "humidity", "wind_speed", "wind_direction", "weather", "precipitation", "visibility",
+                  "pressure", "cloud_cover", "air_quality_index"]
+
+
+def hash_noise(seed, cell_x, cell_y, bucket, salt):
+    """
+    Uniform [0, 1) noise that is a pure function of its inputs (arrays of equal length).
+
+    (seed, cell, bucket) are hashed with the SplitMix64 mixer, so there is no RNG per cell.
+    """
+    with np.errstate(over="ignore"):
+        h = np.uint64(seed) * GOLDEN_GAMMA + np.uint64(salt)
+        for part in (cell_x, cell_y, bucket):
+            h = mix64((h ^ np.asarray(part).astype(np.uint64)) * GOLDEN_GAMMA)
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class WeatherField:
+    """
+    Shared weather over space and time, evaluated once per grid cell and time bucket.
+
+    Conditions are a deterministic function of the seed, the ``cell_deg`` cell and the ``bucket_sec`` time
+    bucket: two slow waves ("fronts") drift across the map and drive cloud cover, rain, wind and pressure,
+    temperature follows the latitude and the time of day, and a small hashed jitter keeps cells apart. So
+    weather evolves smoothly, vehicles in the same cell see the same conditions, and separate processes
+    with the same seed agree without talking to each other.
+
+    Evaluated cells are kept in an LRU of ``max_cells`` (cell, bucket) entries; cold cells and past
+    buckets are evicted. A batch of vehicles costs one sort plus one evaluation per distinct cell it misses.
+    """
+
+    def __init__(self, cell_deg=WEATHER_CELL_DEG, bucket_sec=WEATHER_BUCKET_SEC, max_cells=WEATHER_CACHE_CELLS, seed=WEATHER_SEED):
+        self.cell_deg = cell_deg
+        self.bucket_sec = bucket_sec
+        self.max_cells = max_cells
+        self.seed = seed
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # Direction (radians of phase per degree) and starting phase of the two fronts
+        phases = hash_noise(seed, np.arange(6), 0, 0, 1)
+        self._front_wave = (phases[0] * 4 - 2, phases[1] * 4 - 2, phases[2] * 2 * math.pi)
+        self._shower_wave = (phases[3] * 20 - 10, phases[4] * 20 - 10, phases[5] * 2 * math.pi)
+
+    def _keys(self, latitudes, longitudes, timestamps):
+        cell_x = np.floor(np.asarray(longitudes) / self.cell_deg).astype(np.int64)
+        cell_y = np.floor(np.asarray(latitudes) / self.cell_deg).astype(np.int64)
+        bucket = np.floor(np.asarray(timestamps) / self.bucket_sec).astype(np.int64)
+        return cell_x, cell_y, bucket
+
+    def lookup(self, latitudes, longitudes, timestamps):
+        """
+        Weather conditions for a batch of positions at epoch-second timestamps.
+
+        Returns:
+            list: One conditions dict per point; points in the same cell and bucket share the same dict,
+            which must not be modified.
+        """
+        keys = np.stack(self._keys(np.atleast_1d(latitudes), np.atleast_1d(longitudes), np.atleast_1d(timestamps)), axis=1)
+        if not len(keys):
+            return []
+        unique_keys, inverse = _unique_rows(keys)
+
+        conditions = [None] * len(unique_keys)
+        missing = []
+        for i, key in enumerate(map(tuple, unique_keys.tolist())):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                self.cache.move_to_end(key)
+                conditions[i] = cached
+        self.hits += len(unique_keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            computed = self._evaluate(*unique_keys[missing].T)
+            for i, values in zip(missing, computed):
+                conditions[i] = self.cache[tuple(unique_keys[i].tolist())] = values
+            while len(self.cache) > self.max_cells:
+                self.cache.popitem(last=False)
+
+        return [conditions[i] for i in inverse.ravel().tolist()]
+
+    def lookup_columns(self, latitudes, longitudes, timestamps):
+        """
+        Weather conditions for a batch of points as one array per field, for columnar consumers.
+
+        Every distinct (cell, bucket) of the batch is evaluated once, bypassing the LRU: batches large enough
+        to want columns revisit few cells. ``wind_direction`` holds indices into COMPASS_POINTS and
+        ``weather`` indices into WEATHER_CONDITIONS.
+
+        Returns:
+            dict: Field name -> numpy.ndarray with one entry per point.
+        """
+        keys = np.stack(self._keys(np.atleast_1d(latitudes), np.atleast_1d(longitudes), np.atleast_1d(timestamps)), axis=1)
+        if not len(keys):
+            return {name: np.empty(0, dtype=np.int64) for name in WEATHER_FIELDS}
+        unique_keys, inverse = _unique_rows(keys)
+        columns = self._evaluate_columns(*unique_keys.T)
+        inverse = inverse.ravel()
+        return {name: values[inverse] for name, values in columns.items()}
+
+    def conditions_at(self, latitude, longitude, timestamp):
+        """
+        Weather conditions at one position and epoch-second timestamp.
+        """
+        return self.lookup(latitude, longitude, timestamp)[0]
+
+    def _evaluate(self, cell_x, cell_y, bucket):
+        columns = self._evaluate_columns(cell_x, cell_y, bucket)
+        rows = zip(*(columns[name].tolist() for name in WEATHER_FIELDS))
+        return [{
+            "temperature": temp,
+            "humidity": hum,
+            "wind_speed": wind,
+            "wind_direction": COMPASS_POINTS[direction],
+            "weather": WEATHER_CONDITIONS[condition],
+            "precipitation": precip,
+            "visibility": vis,
+            "pressure": pres,
+            "cloud_cover": cloud,
+            "air_quality_index": aqi,
+        } for temp, hum, wind, direction, condition, precip, vis, pres, cloud, aqi in rows]
+
+    def _evaluate_columns(self, cell_x, cell_y, bucket):
+        # Cell centres and bucket midpoints
+        latitude = (cell_y + 0.5) * self.cell_deg
+        longitude = (cell_x + 0.5) * self.cell_deg
+        t = (bucket + 0.5) * self.bucket_sec
+
+        def wave(period_sec, lat_k, lon_k, phase):
+            return np.sin(2 * math.pi * t / period_sec - lat_k * latitude - lon_k * longitude + phase)
+
+        # Storminess in [-1, 1]: negative is clear high pressure, positive is wet low pressure
+        storm = 0.65 * wave(FRONT_PERIOD_SEC, *self._front_wave) + 0.35 * wave(SHOWER_PERIOD_SEC, *self._shower_wave)
+        jitter = [hash_noise(self.seed, cell_x, cell_y, bucket, salt) - 0.5 for salt in range(2, 6)]
+        # Warmest mid-afternoon local solar time
+        solar_hour = (t / 3600 + longitude / 15) % 24
+        diurnal = np.cos(2 * math.pi * (solar_hour - 15) / 24)
+
+        temperature = np.clip(14 - 1.5 * (latitude - 47) + 8 * diurnal - 4 * storm + 3 * jitter[0], -10, 44)
+        cloud_cover = np.clip(50 + 55 * storm + 10 * jitter[1], 0, 100)
+        precipitation = np.clip((storm - 0.3) / 0.7 * 100 + 10 * jitter[1], 0, 100)
+        humidity = np.clip(60 + 35 * storm + 10 * jitter[2], 10, 100)
+        wind_speed = np.clip(6 + 30 * np.abs(storm) + 6 * jitter[3], 0, 40)
+        pressure = np.clip(1015 - 15 * storm, 1000, 1030)
+        visibility = np.clip(20 - 12 * np.maximum(storm, 0) - precipitation / 10, 0, 20)
+        air_quality_index = np.clip(120 - 2.5 * wind_speed - 0.6 * precipitation + 40 * jitter[0], 0, 500)
+        # Wind blows along the front, veering with its strength
+        wind_heading = (np.degrees(math.atan2(self._front_wave[1], self._front_wave[0])) + 60 * storm + 360) % 360
+        wind_direction = np.round(wind_heading / 45).astype(np.int64) % 8
+
+        return {
+            "temperature": temperature.astype(np.int64),
+            "humidity": humidity.astype(np.int64),
+            "wind_speed": wind_speed.astype(np.int64),
+            "wind_direction": wind_direction,
+            "weather": _conditions(temperature.astype(np.int64), precipitation.astype(np.int64), cloud_cover.astype(np.int64)),
+            "precipitation": precipitation.astype(np.int64),
+            "visibility": visibility.astype(np.int64),
+            "pressure": pressure.astype(np.int64),
+            "cloud_cover": cloud_cover.astype(np.int64),
+            "air_quality_index": air_quality_index.astype(np.int64),
+        }
+
+
+def _conditions(temperature, precipitation, cloud_cover):
+    # Indices into WEATHER_CONDITIONS: snow or rain when it precipitates, otherwise cloudy or sunny
+    return np.where(precipitation > 0, np.where(temperature <= 0, 2, 1), np.where(cloud_cover >= 60, 3, 0))
+
+
+def _unique_rows(keys):
+    """
+    Distinct (cell_x, cell_y, bucket) rows of ``keys`` and, per row of ``keys``, the index of its distinct row.
+    """
+    # Pack (cell_x, cell_y, bucket) relative to the batch into one int64: a plain integer sort is an
+    # order of magnitude faster than a row-wise unique
+    low = keys.min(axis=0)
+    spans = (keys.max(axis=0) - low + 1).tolist()
+    if spans[0] * spans[1] * spans[2] < 1 << 62:
+        relative = keys - low
+        packed = (relative[:, 0] * spans[1] + relative[:, 1]) * spans[2] + relative[:, 2]
+        _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+        return keys[first], inverse
+    return np.unique(keys, axis=0, return_inverse=True)
+
+
+_shared_field = None
+
+
+def get_weather_field():
+    """
+    Return the process-wide weather field, creating it on first use.
+
+    Every process builds it from the same settings, so all of them report the same weather.
+    """
+    global _shared_field
+    if _shared_field is None:
+        _shared_field = WeatherField()
+    return _shared_field
@@ -0,0 +1,38 @@
+import argparse
+from datetime import datetime
+
+from config.settings import EVENT_LOG_DIR
+from services.event_log import log_topics
+from services.kafka_producer import get_producer
+from services.replay import replay_to_producer, replay_to_files
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a captured event log to Kafka or into the processing job's file source")
+    parser.add_argument("--log-dir", default=EVENT_LOG_DIR, help="Directory written with main.py --sink log")
+    parser.add_argument("--topics", nargs="+", default=None, help="Topics to replay (default: every topic in the log)")
+    parser.add_argument("--target", choices=["kafka", "files"], default="kafka", help="Re-publish to Kafka, or write JSON-lines files for the processing job")
+    parser.add_argument("--output-dir", default="stream_input", help="Output directory with --target files")
+    parser.add_argument("--records-per-file", type=int, default=100000, help="Records per output file with --target files")
+    parser.add_argument("--rate", type=float, default=0, help="Records per second (0 = as fast as possible)")
+    parser.add_argument("--tick-records", type=int, default=10000, help="Records per producer tick with --target kafka; a transactional producer commits every KAFKA_TRANSACTION_TICKS ticks")
+    parser.add_argument("--start", default=None, help="Only replay records at or after this ISO-8601 event time")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    topics = args.topics or log_topics(args.log_dir)
+    start_timestamp_ms = int(datetime.fromisoformat(args.start).timestamp() * 1000) if args.start else None
+    try:
+        if args.target == "kafka":
+            producer = get_producer()
+            try:
+                count = replay_to_producer(args.log_dir, topics, producer, args.rate, start_timestamp_ms, args.tick_records)
+            finally:
+                producer.close()
+        else:
+            count = replay_to_files(args.log_dir, topics, args.output_dir, args.records_per_file, args.rate, start_timestamp_ms)
+        print(f"Replayed {count} records")
+    except KeyboardInterrupt:
+        print("Replay ended by the user")
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES
+from models.fleet import Fleet
+from services.data_generator import publish_fleet_profiles, publish_fleet_tick
+from services.gps_batching import create_gps_batcher
+from utilities.random_streams import CADENCE, counter_uniform
+
+
+class AsyncProducer:
+    """
+    Thin asyncio adapter over KafkaProducer (or any sink with the same interface).
+
+    Producing never blocks the event loop: before a batch is published, ``wait_for_capacity`` yields until
+    librdkafka's local queue is below ``max_queued`` messages (the producer's high watermark by default), and
+    a background task serves delivery callbacks with ``poll(0)`` every ``poll_interval`` seconds. The wait
+    ends after ``max_wait_sec`` or as soon as the producer spills to disk: an unreachable broker must not
+    stall the simulation, the producer's spill takes the records instead.
+    """
+
+    def __init__(self, producer, max_queued=None, poll_interval=0.05, max_wait_sec=None):
+        self.producer = producer
+        self.max_queued = max_queued or getattr(producer, "high_watermark", 50000)
+        self.poll_interval = poll_interval
+        self.max_wait_sec = getattr(producer, "backpressure_timeout_sec", 1.0) if max_wait_sec is None else max_wait_sec
+        self._poller = None
+
+    def start(self):
+        self._poller = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while True:
+            self.producer.poll(0)
+            await asyncio.sleep(self.poll_interval)
+
+    async def wait_for_capacity(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_sec
+        while self.producer.queued() >= self.max_queued and not getattr(self.producer, "spilling", False) and loop.time() < deadline:
+            self.producer.poll(0)
+            await asyncio.sleep(self.poll_interval)
+
+    async def publish(self, topic, data, topic_identifier):
+        await self.wait_for_capacity()
+        self.producer.publish(topic, data, topic_identifier)
+
+    async def flush(self, timeout=30):
+        if self._poller is not None:
+            self._poller.cancel()
+        # flush() blocks; keep it off the event loop thread
+        return await asyncio.get_running_loop().run_in_executor(None, self.producer.checkpoint, timeout)
+
+
+class AsyncFleetEngine:
+    """
+    asyncio simulation loop where every vehicle is a lightweight task with its own randomized cadence.
+
+    A vehicle task only sleeps and marks its vehicle as due; its state lives in a Fleet's arrays. A single
+    flusher task advances all vehicles that came due in the last ``batch_interval`` to the current simulated
+    time and publishes them, so independently timed vehicles still share batched array updates and memory
+    stays bounded by the fleet size (no thread or Vehicle object per vehicle).
+
+    Simulated time runs ``speedup`` times faster than the event loop's clock.
+    """
+
+    def __init__(self, fleet, producer, speedup=1.0, min_interval=1.0, max_interval=3.0, batch_interval=0.01, seed=None, cameras=None):
+        if speedup is None or speedup <= 0:
+            raise ValueError("The asyncio engine runs on wall-clock timers and needs a positive speedup")
+        self.fleet = fleet
+        self.producer = producer
+        self.speedup = speedup
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.batch_interval = batch_interval
+        self.cameras = cameras
+        self.gps_batcher = create_gps_batcher(producer.producer, fleet.id_generator)
+        self.rng = random.Random(seed)  # Per-tick jitter only; it already depends on the event loop's timing
+        # Base cadence and starting phase of every vehicle, from its own stream
+        cadence = counter_uniform(fleet.keys, 0, CADENCE, 2)
+        self.intervals = (min_interval + (max_interval - min_interval) * cadence[:, 0]).tolist()
+        self.phases = cadence[:, 1].tolist()
+        self._due = []
+        self._stopping = False
+        self._sim_start = fleet.timestamp[0] if fleet.size else time.time()
+        self._loop_start = None
+        self.ticks = 0
+
+    def sim_now(self):
+        return self._sim_start + (asyncio.get_running_loop().time() - self._loop_start) * self.speedup
+
+    async def _vehicle(self, index):
+        # Each vehicle has its own base cadence, jittered on every tick; start at a random phase
+        interval = self.intervals[index]
+        await asyncio.sleep(self.phases[index] * interval / self.speedup)
+        while not self._stopping and self.fleet.active[index]:
+            self._due.append(index)
+            await asyncio.sleep(interval * self.rng.uniform(0.8, 1.2) / self.speedup)
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            if not self._due:
+                continue
+            indices = np.unique(np.fromiter(self._due, dtype=np.int64, count=len(self._due)))
+            self._due.clear()
+
+            indices = self.fleet.step(self.sim_now() - self.fleet.timestamp[indices], indices)
+            await self.producer.wait_for_capacity()
+            publish_fleet_tick(self.producer.producer, self.fleet, indices, self.cameras, self.gps_batcher)
+            self.ticks += len(indices)
+
+    async def run(self, duration_sec=None, report_interval_sec=10):
+        """
+        Run until every vehicle arrived, or for ``duration_sec`` simulated seconds.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop_start = loop.time()
+        self.producer.start()
+        publish_fleet_profiles(self.producer.producer, self.fleet)
+        flusher = loop.create_task(self._flusher())
+        vehicles = [loop.create_task(self._vehicle(index)) for index in range(self.fleet.size)]
+        print(f"Started {len(vehicles)} vehicle tasks")
+
+        deadline = None if duration_sec is None else self._loop_start + duration_sec / self.speedup
+        last_ticks, last_report = 0, self._loop_start
+        try:
+            while self.fleet.active_count and (deadline is None or loop.time() < deadline):
+                await asyncio.sleep(report_interval_sec if deadline is None else min(report_interval_sec, deadline - loop.time()))
+                now = loop.time()
+                print(f"Async engine: {self.ticks} vehicle ticks ({(self.ticks - last_ticks) / max(now - last_report, 1e-9):.0f} ticks/s), "
+                      f"{self.fleet.active_count} vehicles driving, {len(self._due)} due")
+                last_ticks, last_report = self.ticks, now
+        finally:
+            self._stopping = True
+            for task in vehicles:
+                task.cancel()
+            flusher.cancel()
+            await asyncio.gather(*vehicles, flusher, return_exceptions=True)
+            if self.gps_batcher is not None:
+                self.gps_batcher.flush()
+            await self.producer.flush()
+
+
+def simulate_fleet_async(fleet_size, producer, vehicle_prefix="vehicle", seed=None, clock=None, duration_sec=None,
+                         min_interval=1.0, max_interval=3.0, route=None, cameras=None):
+    """
+    Simulates a fleet with one asyncio task per vehicle, each ticking on its own randomized cadence.
+
+    Args:
+        fleet_size (int): Number of vehicles to simulate.
+        producer (KafkaProducer | EventLogWriter): Sink for the records; flushed when the run ends.
+        vehicle_prefix (str): Prefix for the generated vehicle IDs ("<prefix>-<index>").
+        seed (int, optional): Seed for the fleet's and the cadences' random generators.
+        clock (SimulationClock, optional): Provides the start time and speed-up; must not be virtual.
+        duration_sec (float, optional): Stop after this many simulated seconds.
+        min_interval (float): Shortest base tick interval of a vehicle, in simulated seconds.
+        max_interval (float): Longest base tick interval of a vehicle, in simulated seconds.
+        route (Route, optional): Road route shared by the whole fleet; defaults to a straight line.
+        cameras (CameraRegistry, optional): Emit traffic camera records only for vehicles passing a camera.
+
+    Returns:
+        None
+    """
+    start_time = clock.now() if clock else None
+    speedup = clock.speedup if clock else 1.0
+    fleet = Fleet(fleet_size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), vehicle_prefix, seed, start_time, route=route)
+    engine = AsyncFleetEngine(fleet, AsyncProducer(producer), speedup, min_interval, max_interval, seed=seed, cameras=cameras)
+    asyncio.run(engine.run(duration_sec))
@@ -0,0 +1,384 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import multiprocessing
+import os
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.settings import (SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, VEHICLE_TOPIC, PROFILE_TOPIC, GPS_TOPIC, TRAFFIC_TOPIC,
+                             WEATHER_TOPIC, EMERGENCY_TOPIC, BACKFILL_TARGET_FILE_MB, BACKFILL_ROW_GROUP_ROWS, ID_GENERATOR, ID_WORKER_ID)
+from models.fleet import Fleet, compass_direction
+from models.weather import WEATHER_CONDITIONS
+from services.data_generator import DEFAULT_CAMERA_ID
+from services.sharding import shard_ranges
+from utilities.coordinates import COMPASS_POINTS
+from utilities.ids import create_id_generator
+from utilities.random_streams import CAMERA_ID, GPS_ID, WEATHER_ID
+
+HOUR_US = 3600 * 1_000_000
+
+# Low-cardinality strings are dictionary-encoded in memory; Parquet stores them as plain string columns
+LABEL = pa.dictionary(pa.int32(), pa.string())
+LOCATION = pa.struct([("latitude", pa.float64()), ("longitude", pa.float64())])
+EVENT_TIME = pa.field("event_time", pa.timestamp("us", tz="UTC"))
+
+# The columns the streaming job (jobs/spark-process.py) writes per topic: the record fields, then event_time.
+# date and hour are partition directories, not columns
+TOPIC_SCHEMAS = {
+    VEHICLE_TOPIC: pa.schema([("id", pa.string()), ("vehicle_id", pa.string()), ("location", LOCATION), ("timestamp", LABEL),
+                              ("speed", pa.int32()), ("direction", LABEL), ("status", LABEL), ("fuel_level", pa.int32()), EVENT_TIME]),
+    PROFILE_TOPIC: pa.schema([("vehicle_id", pa.string()), ("timestamp", LABEL), ("make", LABEL), ("model", LABEL),
+                              ("year", pa.int32()), ("color", LABEL), ("license_plate", LABEL), ("vehicle_type", LABEL),
+                              ("fuel_type", LABEL), EVENT_TIME]),
+    GPS_TOPIC: pa.schema([("id", pa.string()), ("timestamp", LABEL), ("vehicle_id", pa.string()), ("speed", pa.int32()),
+                          ("direction", LABEL), ("vehicle_type", LABEL), EVENT_TIME]),
+    TRAFFIC_TOPIC: pa.schema([("id", pa.string()), ("timestamp", LABEL), ("vehicle_id", pa.string()), ("camera_id", LABEL),
+                              ("location", LOCATION), ("snapshot", LABEL), EVENT_TIME]),
+    WEATHER_TOPIC: pa.schema([("id", pa.string()), ("timestamp", LABEL), ("vehicle_id", pa.string()), ("temperature", pa.int32()),
+                              ("humidity", pa.int32()), ("wind_speed", pa.int32()), ("wind_direction", LABEL), ("location", LOCATION),
+                              ("weather", LABEL), ("precipitation", pa.int32()), ("visibility", pa.int32()), ("pressure", pa.int32()),
+                              ("cloud_cover", pa.int32()), ("air_quality_index", pa.int32()), EVENT_TIME]),
+    EMERGENCY_TOPIC: pa.schema([("id", pa.string()), ("incident_id", pa.string()), ("timestamp", LABEL), ("vehicle_id", pa.string()),
+                                ("location", LOCATION), ("emergency_type", LABEL), ("description", pa.string()), ("severity", LABEL),
+                                ("status", LABEL), EVENT_TIME]),
+}
+TOPICS = list(TOPIC_SCHEMAS)
+
+# Two hex digits per byte value, so a UUID's 32 digits are one table lookup of its 16 bytes
+_HEX_PAIRS = np.frombuffer("".join(f"{value:02x}" for value in range(256)).encode(), dtype=np.uint16)
+# (start, end) of the digit groups in the 36-character UUID string, and of their digits among the 32
+_UUID_GROUPS = [((0, 8), (0, 8)), ((9, 13), (8, 12)), ((14, 18), (12, 16)), ((19, 23), (16, 20)), ((24, 36), (20, 32))]
+
+
+def uuid_strings(raw):
+    """
+    Canonical UUID strings of a (count, 16) uint8 array, as a pyarrow string array built without Python objects.
+    """
+    count = len(raw)
+    digits = _HEX_PAIRS[raw].view(np.uint8)
+    text = np.full((count, 36), ord("-"), dtype=np.uint8)
+    for (text_start, text_end), (digit_start, digit_end) in _UUID_GROUPS:
+        text[:, text_start:text_end] = digits[:, digit_start:digit_end]
+    offsets = np.arange(0, 36 * count + 1, 36, dtype=np.int32)
+    return pa.Array.from_buffers(pa.string(), count, [None, pa.py_buffer(offsets), pa.py_buffer(text)])
+
+
+def labels(codes, names):
+    """
+    Dictionary-encoded string column of ``codes`` (indices into ``names``).
+    """
+    return pa.DictionaryArray.from_arrays(pa.array(np.asarray(codes, dtype=np.int32)), pa.array(names, pa.string()))
+
+
+def constant_label(value, count):
+    return labels(np.zeros(count, dtype=np.int32), [value])
+
+
+def local_wall_clock_us(timestamps):
+    """
+    Local wall-clock time of epoch-second timestamps, in microseconds.
+
+    The records carry naive local ISO timestamps (``datetime.fromtimestamp``) and the streaming job parses
+    them in a UTC session, so its event_time, date and hour are this wall-clock time read as UTC.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    hours, inverse = np.unique(np.floor(timestamps / 3600), return_inverse=True)
+    # One UTC offset lookup per distinct hour of the batch, so DST switches land in the right hour
+    offsets = np.array([time.localtime(hour * 3600).tm_gmtoff for hour in hours.tolist()], dtype=np.float64)
+    return np.round((timestamps + offsets[inverse]) * 1_000_000).astype(np.int64)
+
+
+def iso_strings(wall_clock_us):
+    """
+    ISO-8601 strings of the wall-clock times, like ``datetime.isoformat`` (seconds unless there is a fraction).
+
+    The vehicles of a tick share a handful of timestamps, so only the distinct ones are formatted.
+    """
+    distinct, inverse = np.unique(wall_clock_us, return_inverse=True)
+    unit = "us" if np.any(distinct % 1_000_000) else "s"
+    return labels(inverse, np.datetime_as_string(distinct.astype("datetime64[us]"), unit=unit).tolist())
+
+
+class FleetColumns:
+    """
+    Columnar counterpart of the Fleet ``*_records`` generators: one pyarrow table per topic and tick.
+
+    The values follow the same rules as the record generators (same speeds, directions, weather field and
+    incident process), but every column is built with array operations, so no dict or UUID object is
+    created per row. Per-vehicle strings (vehicle IDs and telemetry IDs) are built once and gathered.
+    """
+
+    def __init__(self, fleet, cameras=None):
+        self.fleet = fleet
+        self.cameras = cameras
+        self.vehicle_ids = pa.array([fleet.vehicle_id(index) for index in range(fleet.size)], pa.string())
+        self.telemetry_ids = uuid_strings(fleet.ids)
+        self.camera_names = None if cameras is None else pa.array(cameras.camera_ids, pa.string())
+
+    def _common(self, indices):
+        wall_clock_us = local_wall_clock_us(self.fleet.timestamp[indices])
+        event_time = pa.array(wall_clock_us, EVENT_TIME.type)
+        return wall_clock_us, iso_strings(wall_clock_us), event_time, self.vehicle_ids.take(pa.array(indices))
+
+    def _location(self, indices):
+        return pa.StructArray.from_arrays([pa.array(self.fleet.latitude[indices]), pa.array(self.fleet.longitude[indices])],
+                                          fields=list(LOCATION))
+
+    def tick_tables(self, indices):
+        """
+        Tables of the vehicles that moved on this tick, keyed by topic, each with the wall-clock times (µs)
+        of its rows for partitioning.
+        """
+        fleet = self.fleet
+        count = len(indices)
+        wall_clock_us, timestamps, event_time, vehicle_ids = self._common(indices)
+        location = self._location(indices)
+        speeds = pa.array(fleet.speed[indices].astype(np.int32))
+        directions = labels(compass_direction(fleet.heading[indices]), COMPASS_POINTS)
+
+        tables = {
+            VEHICLE_TOPIC: pa.Table.from_arrays([
+                self.telemetry_ids.take(pa.array(indices)), vehicle_ids, location, timestamps, speeds, directions,
+                labels(np.where(fleet.active[indices], 0, 1), ["Active", "Arrived"]),
+                pa.array(fleet.fuel_level[indices].astype(np.int32)), event_time], schema=TOPIC_SCHEMAS[VEHICLE_TOPIC]),
+            GPS_TOPIC: pa.Table.from_arrays([
+                uuid_strings(fleet.record_ids(indices, GPS_ID)), timestamps, vehicle_ids, speeds, directions,
+                constant_label("private", count), event_time], schema=TOPIC_SCHEMAS[GPS_TOPIC]),
+        }
+
+        if self.cameras is None:
+            camera_rows = np.arange(count)
+            camera_ids = constant_label(DEFAULT_CAMERA_ID, count)
+        else:
+            camera_indices, nearest = fleet.passing_cameras(self.cameras, indices)
+            camera_rows = np.flatnonzero(np.isin(indices, camera_indices))
+            camera_ids = pa.DictionaryArray.from_arrays(pa.array(nearest.astype(np.int32)), self.camera_names)
+        rows = pa.array(camera_rows)
+        tables[TRAFFIC_TOPIC] = pa.Table.from_arrays([
+            uuid_strings(fleet.record_ids(indices[camera_rows], CAMERA_ID)), timestamps.take(rows), vehicle_ids.take(rows), camera_ids,
+            location.take(rows), constant_label("base64EncodedStringImage", len(camera_rows)), event_time.take(rows)],
+            schema=TOPIC_SCHEMAS[TRAFFIC_TOPIC])
+
+        weather = fleet.weather.lookup_columns(fleet.latitude[indices], fleet.longitude[indices], fleet.timestamp[indices])
+        tables[WEATHER_TOPIC] = pa.Table.from_arrays([
+            uuid_strings(fleet.record_ids(indices, WEATHER_ID)), timestamps, vehicle_ids,
+            pa.array(weather["temperature"].astype(np.int32)), pa.array(weather["humidity"].astype(np.int32)),
+            pa.array(weather["wind_speed"].astype(np.int32)), labels(weather["wind_direction"], COMPASS_POINTS), location,
+            labels(weather["weather"], WEATHER_CONDITIONS), pa.array(weather["precipitation"].astype(np.int32)),
+            pa.array(weather["visibility"].astype(np.int32)), pa.array(weather["pressure"].astype(np.int32)),
+            pa.array(weather["cloud_cover"].astype(np.int32)), pa.array(weather["air_quality_index"].astype(np.int32)), event_time],
+            schema=TOPIC_SCHEMAS[WEATHER_TOPIC])
+
+        result = {topic: (table, wall_clock_us if topic != TRAFFIC_TOPIC else wall_clock_us[camera_rows]) for topic, table in tables.items()}
+        emergency = self.emergency_table(indices)
+        if emergency is not None:
+            result[EMERGENCY_TOPIC] = emergency
+        return result
+
+    def emergency_table(self, indices):
+        # Incidents are rare state changes: a handful of records per tick, built as rows
+        records = list(self.fleet.emergency_incident_records(indices))
+        if not records:
+            return None
+        epoch_seconds = [datetime.fromisoformat(record["timestamp"]).timestamp() for record in records]
+        wall_clock_us = local_wall_clock_us(epoch_seconds)
+        rows = [dict(record, id=str(record["id"]), incident_id=str(record["incident_id"])) for record in records]
+        table = pa.Table.from_pylist(rows, schema=TOPIC_SCHEMAS[EMERGENCY_TOPIC].remove(len(TOPIC_SCHEMAS[EMERGENCY_TOPIC]) - 1))
+        return table.append_column(EVENT_TIME, pa.array(wall_clock_us, EVENT_TIME.type)), wall_clock_us
+
+    def profile_table(self):
+        """
+        The static profile of every vehicle, written once per backfill like the compacted profile topic.
+        """
+        indices = np.arange(self.fleet.size)
+        count = len(indices)
+        wall_clock_us, timestamps, event_time, vehicle_ids = self._common(indices)
+        table = pa.Table.from_arrays([
+            vehicle_ids, timestamps, constant_label("Toyota", count), constant_label("Corolla", count), pa.array(np.full(count, 2015, np.int32)),
+            constant_label("Red", count), constant_label("ABC-123", count), constant_label("Sedan", count), constant_label("Gasoline", count),
+            event_time], schema=TOPIC_SCHEMAS[PROFILE_TOPIC])
+        return table, wall_clock_us
+
+
+class PartitionedParquetWriter:
+    """
+    Parquet files of one topic under ``<root>/topic=<topic>/date=<YYYY-MM-DD>/hour=<H>/``, the layout the
+    streaming job writes.
+
+    Rows are buffered per partition and written in row groups of ``row_group_rows``; a file is closed and
+    the next one started once it reaches ``target_file_bytes``. Files are written under a hidden name
+    and renamed when complete, so Spark, Glue and Athena never read a partial file. Partitions more than
+    an hour behind the newest row are closed, which keeps a handful of files open per topic.
+    """
+
+    def __init__(self, root, topic, file_prefix, target_file_bytes=BACKFILL_TARGET_FILE_MB * 1024 * 1024,
+                 row_group_rows=BACKFILL_ROW_GROUP_ROWS, compression="snappy"):
+        self.directory = os.path.join(root, f"topic={topic}")
+        self.schema = TOPIC_SCHEMAS[topic]
+        self.file_prefix = file_prefix
+        self.target_file_bytes = target_file_bytes
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.buffers = {}  # Partition hour -> [tables, rows]
+        self.files = {}  # Partition hour -> (ParquetWriter, OSFile, temporary path, final path)
+        self.sequence = 0
+        self.rows = 0
+        self.files_written = 0
+        self.bytes_written = 0
+
+    def write(self, table, wall_clock_us):
+        """
+        Add rows to their date/hour partitions.
+
+        Args:
+            table (pyarrow.Table): Rows in the topic's schema.
+            wall_clock_us (numpy.ndarray): Local wall-clock time (µs) of every row, see local_wall_clock_us.
+        """
+        if not len(table):
+            return
+        partition_hours = wall_clock_us // HOUR_US
+        first, last = int(partition_hours.min()), int(partition_hours.max())
+        for hour in range(first, last + 1):
+            rows = table if first == last else table.filter(pa.array(partition_hours == hour))
+            if len(rows):
+                self._buffer(hour, rows)
+        for hour in [hour for hour in self.buffers if hour < last - 1]:
+            self._close_partition(hour)
+
+    def _buffer(self, hour, table):
+        buffered = self.buffers.get(hour)
+        if buffered is None:
+            buffered = self.buffers[hour] = [[], 0]
+        buffered[0].append(table)
+        buffered[1] += len(table)
+        self.rows += len(table)
+        if buffered[1] >= self.row_group_rows:
+            self._flush(hour)
+
+    def _flush(self, hour):
+        tables, rows = self.buffers.get(hour, ([], 0))
+        if not rows:
+            return
+        self.buffers[hour] = [[], 0]
+        if hour not in self.files:
+            self.files[hour] = self._open_file(hour)
+        writer, sink, _, _ = self.files[hour]
+        writer.write_table(pa.concat_tables(tables), row_group_size=self.row_group_rows)
+        if sink.tell() >= self.target_file_bytes:
+            self._close_file(hour)
+
+    def _open_file(self, hour):
+        started = datetime.fromtimestamp(hour * 3600, timezone.utc)
+        directory = os.path.join(self.directory, f"date={started.date().isoformat()}", f"hour={started.hour}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"{self.file_prefix}-{self.sequence:05d}.{self.compression}.parquet"
+        self.sequence += 1
+        temporary_path = os.path.join(directory, f".{name}.inprogress")
+        sink = pa.OSFile(temporary_path, "wb")
+        writer = pq.ParquetWriter(sink, self.schema, compression=self.compression)
+        return writer, sink, temporary_path, os.path.join(directory, name)
+
+    def _close_file(self, hour):
+        writer, sink, temporary_path, path = self.files.pop(hour)
+        writer.close()
+        self.bytes_written += sink.tell()
+        sink.close()
+        os.replace(temporary_path, path)
+        self.files_written += 1
+
+    def _close_partition(self, hour):
+        self._flush(hour)
+        self.buffers.pop(hour, None)
+        if hour in self.files:
+            self._close_file(hour)
+
+    def close(self):
+        for hour in sorted(set(self.buffers) | set(self.files)):
+            self._close_partition(hour)
+
+
+def backfill_shard(size, start_time, duration_sec, output_dir, tick_sec=2.0, seed=None, first_index=0, worker_index=0,
+                   target_file_bytes=BACKFILL_TARGET_FILE_MB * 1024 * 1024, row_group_rows=BACKFILL_ROW_GROUP_ROWS,
+                   route=None, cameras=None, run_id=None):
+    """
+    Simulate one shard of the fleet over ``duration_sec`` from ``start_time`` and write every topic to Parquet.
+
+    Vehicles that arrive start a new trip from the origin, so the row rate holds for any duration.
+
+    Returns:
+        dict: rows, files and bytes written.
+    """
+    fleet = Fleet(size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", seed, start_time, first_index, route,
+                  id_generator=create_id_generator(ID_GENERATOR, ID_WORKER_ID + worker_index))
+    columns = FleetColumns(fleet, cameras)
+    file_prefix = f"part-{worker_index:05d}-{run_id or uuid.uuid4().hex[:12]}"
+    writers = {topic: PartitionedParquetWriter(output_dir, topic, file_prefix, target_file_bytes, row_group_rows) for topic in TOPICS}
+
+    writers[PROFILE_TOPIC].write(*columns.profile_table())
+    for _ in range(int(duration_sec // tick_sec)):
+        arrived = np.flatnonzero(~fleet.active)
+        if arrived.size:
+            fleet.restart(arrived)
+        for topic, (table, wall_clock_us) in columns.tick_tables(fleet.step(tick_sec)).items():
+            writers[topic].write(table, wall_clock_us)
+
+    for writer in writers.values():
+        writer.close()
+    return {
+        "rows": sum(writer.rows for writer in writers.values()),
+        "files": sum(writer.files_written for writer in writers.values()),
+        "bytes": sum(writer.bytes_written for writer in writers.values()),
+    }
+
+
+def run_backfill(fleet_size, start_time, duration_sec, output_dir, workers=1, tick_sec=2.0, seed=None,
+                 target_file_bytes=BACKFILL_TARGET_FILE_MB * 1024 * 1024, row_group_rows=BACKFILL_ROW_GROUP_ROWS, route=None, cameras=None):
+    """
+    Generate historical traffic data straight into the data lake layout, with one writer process per shard.
+
+    Each worker simulates a contiguous range of vehicles and writes its own files. Workers never coordinate,
+    so throughput scales with cores until the disk is the limit. Vehicles draw from their own streams of the
+    run seed (utilities.random_streams), so the data does not depend on ``workers``.
+
+    Args:
+        fleet_size (int): Total number of vehicles.
+        start_time (datetime): Simulated start of the backfill.
+        duration_sec (float): Simulated seconds to generate.
+        output_dir (str): Root of the Parquet dataset, e.g. the streaming job's output directory.
+        workers (int): Number of writer processes.
+        tick_sec (float): Simulated seconds between two records of a vehicle.
+        seed (int, optional): Run seed; a fresh one is drawn (and printed) when unset.
+        target_file_bytes (int): Close Parquet files at about this size.
+        row_group_rows (int): Rows per Parquet row group.
+        route (Route, optional): Road route shared by the fleet; defaults to a straight line.
+        cameras (CameraRegistry, optional): Emit traffic camera rows only for vehicles passing a camera.
+
+    Returns:
+        dict: Totals (rows, files, bytes, elapsed_sec).
+    """
+    shards = shard_ranges(fleet_size, workers)
+    run_seed = np.random.SeedSequence(seed).entropy
+    run_id = uuid.uuid4().hex[:12]
+    print(f"Backfilling {fleet_size} vehicles over {duration_sec / 86400:.1f} days from {start_time.isoformat()} "
+          f"with {len(shards)} workers into {output_dir} (run seed {run_seed})")
+
+    started = time.monotonic()
+    totals = {"rows": 0, "files": 0, "bytes": 0}
+    # Spawn rather than fork, as for the generator workers
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(backfill_shard, size, start_time, duration_sec, output_dir, tick_sec, run_seed, first_index,
+                               index, target_file_bytes, row_group_rows, route, cameras, run_id)
+                   for index, (first_index, size) in enumerate(shards)]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    totals["elapsed_sec"] = elapsed
+    print(f"Backfill wrote {totals['rows']} rows in {totals['files']} files ({totals['bytes'] / 1e9:.2f} GB) in {elapsed:.1f}s: "
+          f"{totals['rows'] / elapsed:.0f} rows/s, {totals['bytes'] / elapsed / 1e6:.1f} MB/s")
+    return totals
@@ -1,47 +1,83 @@
-import random
-import time
+import numpy as np
+
 from models.vehicle import Vehicle
-from utilities.coordinates import calculate_distance, calculate_increment
-from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, VEHICLE_TOPIC, GPS_TOPIC, TRAFFIC_TOPIC, WEATHER_TOPIC, EMERGENCY_TOPIC
-from services.kafka_producer import KafkaProducer
+from models.fleet import Fleet
+from utilities.coordinates import COMPASS_POINTS, calculate_distance
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, VEHICLE_TOPIC, PROFILE_TOPIC, GPS_TOPIC, TRAFFIC_TOPIC, WEATHER_TOPIC, EMERGENCY_TOPIC, SIMULATION_CLOCK, SIMULATION_SPEEDUP, ROUTE_CACHE_SIZE, ROUTE_CELL_DEG
+from services.gps_batching import create_gps_batcher
+from services.kafka_producer import get_producer
+from services.rate_scheduler import RateScheduler
+from utilities.clock import create_clock
+from utilities.random_streams import RandomStreams
+from utilities.routing import RouteCache, load_road_graph
+
+DEFAULT_CAMERA_ID = "Nikkon-cam123"  # Camera of every tick when no camera registry is configured
 
-def simulate_journey(vehicle_id):
+def simulate_journey(vehicle_id, clock=None, duration_sec=None, producer=None, route=None, cameras=None, seed=None):
     """
     Simulates the journey of a vehicle by generating and sending data to Kafka topics.
 
     Args:
         vehicle_id (str): The ID of the vehicle.
+        clock (SimulationClock, optional): Clock driving the ticks and timestamps; defaults to the
+            SIMULATION_CLOCK / SIMULATION_SPEEDUP settings.
+        duration_sec (float, optional): Stop after this many simulated seconds.
+        producer (KafkaProducer | EventLogWriter, optional): Sink for the records; defaults to the shared producer.
+        route (Route, optional): Road route to follow (see utilities.routing); defaults to a straight line.
+        cameras (CameraRegistry, optional): Emit traffic camera records only when the vehicle passes one of
+            these cameras; without a registry every tick is seen by the default camera.
+        seed (int, optional): Run seed; the vehicle draws from its stream of it (see utilities.random_streams).
 
     Returns:
         None
     """
+    clock = clock or create_clock(SIMULATION_CLOCK, SIMULATION_SPEEDUP)
+    rng = RandomStreams(seed).vehicle_generator(0)
+
+    # One long-lived producer for the whole journey; messages are batched and flushed at the end
+    producer = producer or get_producer()
+
+    # Initialize vehicle; it keeps its position between ticks. A route runs between the road nodes closest to
+    # Seattle and the university
+    origin, destination = corridor_endpoints(route)
+    vehicle = Vehicle(vehicle_id, origin, destination, clock, route, rng)
+    last_camera = -1
+    gps_batcher = create_gps_batcher(producer, vehicle.id_generator)
+
+    # Static attributes go out once, to the compacted profile topic
+    producer.publish(PROFILE_TOPIC, vehicle.generate_profile_data(), 'PROFILE_TOPIC')
+
     while True:
-        # Initialize Kafka producer and vehicle
-        producer = KafkaProducer()
-        vehicle = Vehicle(vehicle_id, SEATTLE_COORDINATES.copy(), SEATTLE_COORDINATES.copy())
-        latitude_increment, longitude_increment = calculate_increment(SEATTLE_COORDINATES, UNIVERSITY_COORDINATES)
-        
         print(f"Vehicle Coordinates:  {vehicle.location}")
 
         # Generate vehicle data
-        vehicle_data = vehicle.generate_vehicle_data(latitude_increment, longitude_increment)
+        vehicle_data = vehicle.generate_vehicle_data(vehicle.location['latitude'], vehicle.location['longitude'])
 
         # Generate GPS data
         gps_data = vehicle.generate_gps_data(vehicle_data['vehicle_id'], vehicle_data['timestamp'])
 
-        # Generate traffic camera data
-        traffic_camera_data = vehicle.generate_traffic_camera_data(vehicle_data['vehicle_id'], vehicle_data['timestamp'], vehicle_data['location'], "Nikkon-cam123")
+        # Generate traffic camera data, if a camera sees the vehicle
+        if cameras is None:
+            camera_id = DEFAULT_CAMERA_ID
+        else:
+            nearest, _ = cameras.nearest(vehicle.location['latitude'], vehicle.location['longitude'])
+            camera = int(nearest[0])
+            camera_id = cameras.camera_id(camera) if camera >= 0 and camera != last_camera else None
+            last_camera = camera
+        traffic_camera_data = None
+        if camera_id is not None:
+            traffic_camera_data = vehicle.generate_traffic_camera_data(vehicle_data['vehicle_id'], vehicle_data['timestamp'], vehicle_data['location'], camera_id)
 
         # Generate weather data
-        weather_data = vehicle.generate_weather_data(vehicle_data['location'], vehicle_data['timestamp'], vehicle_data['location'])
+        weather_data = vehicle.generate_weather_data(vehicle_data['vehicle_id'], vehicle_data['timestamp'], vehicle_data['location'])
 
-        # Generate emergency data
+        # Generate emergency data: records of incident state changes, usually none
         emergency_data = vehicle.generate_emergency_incident_data(vehicle_data['vehicle_id'], vehicle_data['timestamp'], vehicle_data['location'])
 
         vehicle_lat = vehicle_data['location']['latitude']
         vehicle_lon = vehicle_data['location']['longitude']
-        university_lat = UNIVERSITY_COORDINATES['latitude']
-        university_lon = UNIVERSITY_COORDINATES['longitude']
+        university_lat = destination['latitude']
+        university_lon = destination['longitude']
 
         
 
@@ -52,16 +88,211 @@ def simulate_journey(vehicle_id):
         # Check if the vehicle has reached the destination
         if distance_km <= 0.1:  # Assuming 100 meters as "close enough"
             print("Vehicle has reached the destination. Simulation ended...")
+            if gps_batcher is not None:
+                gps_batcher.flush()
+            producer.checkpoint()
             break
 
 
         # Send data to Kafka topics
         producer.publish(VEHICLE_TOPIC, vehicle_data, 'VEHICLE_TOPIC')
-        producer.publish(GPS_TOPIC, gps_data, 'GPS_TOPIC')
-        producer.publish(TRAFFIC_TOPIC, traffic_camera_data, 'TRAFFIC_TOPIC')
+        if gps_batcher is None:
+            producer.publish(GPS_TOPIC, gps_data, 'GPS_TOPIC')
+        else:
+            gps_batcher.add(vehicle_id, clock.timestamp(), vehicle_lat, vehicle_lon, vehicle_data['speed'],
+                            COMPASS_POINTS.index(vehicle_data['direction']))
+        if traffic_camera_data is not None:
+            producer.publish(TRAFFIC_TOPIC, traffic_camera_data, 'TRAFFIC_TOPIC')
         producer.publish(WEATHER_TOPIC, weather_data, 'WEATHER_TOPIC')
-        producer.publish(EMERGENCY_TOPIC, emergency_data, 'EMERGENCY_TOPIC')
+        for record in emergency_data:
+            producer.publish(EMERGENCY_TOPIC, record, 'EMERGENCY_TOPIC')
+        producer.end_tick()
         
+        # Serve delivery callbacks for the messages batched so far
+        producer.poll()
         print("Data sent to Kafka")
 
-        time.sleep(random.randint(1, 3)) # Sleep for a random number of seconds between 1 and 3
\ No newline at end of file
+        if duration_sec is not None and clock.elapsed_sec >= duration_sec:
+            print(f"Simulated {clock.elapsed_sec:.0f}s of traffic. Simulation ended...")
+            if gps_batcher is not None:
+                gps_batcher.flush()
+            producer.checkpoint()
+            break
+
+        clock.sleep(int(rng.integers(1, 4))) # Advance the clock by a random number of seconds between 1 and 3
+
+
+def corridor_route(road_network_file):
+    """
+    Road route of the Seattle - university corridor on a local road network (.osm extract or GeoJSON).
+    """
+    cache = RouteCache(load_road_graph(road_network_file), ROUTE_CELL_DEG, ROUTE_CACHE_SIZE)
+    route = cache.route(SEATTLE_COORDINATES, UNIVERSITY_COORDINATES)
+    if route is None:
+        raise ValueError(f"No route from Seattle to the university in {road_network_file}")
+    print(f"Route: {route.length_km:.1f} km over {len(route.latitudes)} road nodes")
+    return route
+
+
+def corridor_endpoints(route=None):
+    """
+    Start and end location of the Seattle - university corridor, snapped to the route when there is one.
+    """
+    if route is None:
+        return SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy()
+    return route.location_at(0.0), route.location_at(route.length_km)
+
+
+def simulate_fleet(fleet_size, vehicle_prefix="vehicle", seed=None, clock=None, duration_sec=None, producer=None, first_index=0, route=None, cameras=None,
+                   id_generator=None):
+    """
+    Simulates a whole fleet of vehicles driving to the university in lockstep ticks.
+
+    The fleet is held as NumPy arrays and advanced in one batched step per tick; records are
+    only built while they are being published.
+
+    Args:
+        fleet_size (int): Number of vehicles to simulate.
+        vehicle_prefix (str): Prefix for the generated vehicle IDs ("<prefix>-<index>").
+        seed (int, optional): Run seed of the vehicles' random streams (see utilities.random_streams).
+        clock (SimulationClock, optional): Clock pacing the ticks; defaults to the SIMULATION_CLOCK /
+            SIMULATION_SPEEDUP settings.
+        duration_sec (float, optional): Stop after this many simulated seconds.
+        producer (KafkaProducer | EventLogWriter, optional): Sink for the records; defaults to the shared producer.
+        first_index (int): Global index of the first vehicle, when this fleet is one shard of a larger run.
+        route (Route, optional): Road route shared by the whole fleet; defaults to a straight line.
+        cameras (CameraRegistry, optional): Emit traffic camera records only for vehicles passing a camera.
+        id_generator (TimeOrderedIds, optional): Record ID generator; defaults to the ID_GENERATOR setting.
+
+    Returns:
+        None
+    """
+    clock = clock or create_clock(SIMULATION_CLOCK, SIMULATION_SPEEDUP)
+    producer = producer or get_producer()
+    fleet = Fleet(fleet_size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), vehicle_prefix, seed, clock.now(), first_index, route,
+                  id_generator=id_generator)
+    publish_fleet_profiles(producer, fleet)
+    gps_batcher = create_gps_batcher(producer, fleet.id_generator)
+    tick = 0
+
+    while fleet.active_count:
+        if duration_sec is not None and clock.elapsed_sec >= duration_sec:
+            print(f"Simulated {clock.elapsed_sec:.0f}s of traffic. Simulation ended...")
+            break
+
+        # Let the clock reach the end of the tick first, so record timestamps never run ahead of it
+        # Simulated seconds covered by this tick, drawn from the run's schedule so every shard ticks alike
+        elapsed_sec = 1 + int(3 * fleet.streams.schedule_uniform(tick))
+        tick += 1
+        clock.sleep(elapsed_sec)
+        indices = fleet.step(elapsed_sec)
+
+        publish_fleet_tick(producer, fleet, indices, cameras, gps_batcher)
+        producer.poll()
+        print(f"Fleet tick: {len(indices)} vehicles published, {fleet.active_count} still driving")
+    else:
+        print("All vehicles have reached the destination. Simulation ended...")
+
+    if gps_batcher is not None:
+        gps_batcher.flush()
+    producer.checkpoint()
+
+
+def publish_fleet_profiles(producer, fleet):
+    """
+    Publish the static profile of every fleet vehicle to the compacted profile topic, once per run.
+    """
+    for record in fleet.profile_records():
+        producer.publish(PROFILE_TOPIC, record, 'PROFILE_TOPIC')
+    producer.poll()
+
+
+def publish_fleet_tick(producer, fleet, indices, cameras=None, gps_batcher=None):
+    """
+    Publish the records of the given fleet vehicles to the five topics.
+
+    With a camera registry, traffic camera records are only published for the vehicles that entered a
+    camera's range on this tick, naming the nearest camera. With a GpsBatcher, GPS samples are collected
+    into per-vehicle micro-batches instead of being published one record per tick. The tick ends with
+    ``producer.end_tick()``, which commits it in transactional mode.
+    """
+    if cameras is None:
+        camera_indices, camera_ids = indices, DEFAULT_CAMERA_ID
+    else:
+        camera_indices, nearest = fleet.passing_cameras(cameras, indices)
+        camera_ids = [cameras.camera_id(camera) for camera in nearest.tolist()]
+
+    for record in fleet.vehicle_records(indices):
+        producer.publish(VEHICLE_TOPIC, record, 'VEHICLE_TOPIC')
+    if gps_batcher is None:
+        for record in fleet.gps_records(indices):
+            producer.publish(GPS_TOPIC, record, 'GPS_TOPIC')
+    else:
+        gps_batcher.add_fleet(fleet, indices)
+    for record in fleet.traffic_camera_records(camera_indices, camera_ids):
+        producer.publish(TRAFFIC_TOPIC, record, 'TRAFFIC_TOPIC')
+    for record in fleet.weather_records(indices):
+        producer.publish(WEATHER_TOPIC, record, 'WEATHER_TOPIC')
+    for record in fleet.emergency_incident_records(indices):
+        producer.publish(EMERGENCY_TOPIC, record, 'EMERGENCY_TOPIC')
+    producer.end_tick()
+
+
+def simulate_fleet_at_rate(fleet_size, profile, vehicle_prefix="vehicle", seed=None, clock=None, producer=None, first_index=0, route=None, cameras=None,
+                           id_generator=None):
+    """
+    Simulates a fleet whose emission rate follows a RateProfile instead of fixed ticks.
+
+    An event is one vehicle tick, i.e. one record on each of the five topics. Whenever the scheduler says
+    events are due, that many vehicles are advanced (round robin over the active fleet) to the current clock
+    time and published.
+
+    Args:
+        fleet_size (int): Number of vehicles to simulate.
+        profile (RateProfile): Target vehicle ticks per second over time.
+        vehicle_prefix (str): Prefix for the generated vehicle IDs ("<prefix>-<index>").
+        seed (int, optional): Run seed of the vehicles' random streams (see utilities.random_streams).
+        clock (SimulationClock, optional): Clock the profile is followed on.
+        producer (KafkaProducer | EventLogWriter, optional): Sink for the records; defaults to the shared producer.
+        first_index (int): Global index of the first vehicle, when this fleet is one shard of a larger run.
+        route (Route, optional): Road route shared by the whole fleet; defaults to a straight line.
+        cameras (CameraRegistry, optional): Emit traffic camera records only for vehicles passing a camera.
+        id_generator (TimeOrderedIds, optional): Record ID generator; defaults to the ID_GENERATOR setting.
+
+    Returns:
+        None
+    """
+    clock = clock or create_clock(SIMULATION_CLOCK, SIMULATION_SPEEDUP)
+    producer = producer or get_producer()
+    fleet = Fleet(fleet_size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), vehicle_prefix, seed, clock.now(), first_index, route,
+                  id_generator=id_generator)
+    publish_fleet_profiles(producer, fleet)
+    gps_batcher = create_gps_batcher(producer, fleet.id_generator)
+    cursor = 0
+
+    scheduler = RateScheduler(profile, clock)
+    for _, due in scheduler:
+        while due > 0:
+            active = np.flatnonzero(fleet.active)
+            if active.size == 0:
+                print("All vehicles have reached the destination. Simulation ended...")
+                print(scheduler.report())
+                if gps_batcher is not None:
+                    gps_batcher.flush()
+                producer.checkpoint()
+                return
+
+            # At most one tick per vehicle per batch; larger batches wrap around the fleet in chunks
+            count = min(due, active.size)
+            indices = active[(cursor + np.arange(count)) % active.size]
+            cursor = (cursor + count) % active.size
+            due -= count
+
+            indices = fleet.step(clock.timestamp() - fleet.timestamp[indices], indices)
+            publish_fleet_tick(producer, fleet, indices, cameras, gps_batcher)
+            scheduler.record_produced(len(indices))
+        producer.poll()
+
+    if gps_batcher is not None:
+        gps_batcher.flush()
+    producer.checkpoint()
@@ -0,0 +1,283 @@
+from bisect import bisect_right
+from datetime import datetime
+import heapq
+import mmap
+import os
+import struct
+import time
+
+from config.settings import EVENT_LOG_SEGMENT_BYTES, EVENT_LOG_INDEX_INTERVAL_BYTES
+from services.kafka_producer import ThroughputStats
+from services.serializers import get_serializer
+
+# Record frame: length of the rest of the frame, event timestamp (ms), key length, then key and value bytes
+FRAME_HEADER = struct.Struct("<IqH")
+# Sparse index entry: offset relative to the segment's base offset, byte position in the segment, timestamp (ms)
+INDEX_ENTRY = struct.Struct("<IIq")
+
+LOG_SUFFIX = ".log"
+INDEX_SUFFIX = ".index"
+
+
+def segment_name(base_offset):
+    return f"{base_offset:020d}"
+
+
+class EventLogWriter:
+    """
+    Broker-less sink that appends every topic's serialized records to segmented, append-only log files.
+
+    Each topic gets its own directory of segments named after the offset of their first record. A segment
+    holds length-prefixed frames and rolls over once it reaches ``segment_bytes``; next to it, a sparse
+    ``.index`` file gets an (offset, position, timestamp) entry every ``index_interval_bytes``. Values are
+    serialized exactly as KafkaProducer would send them, so a replay is byte-for-byte identical.
+
+    It exposes the same publish/poll/checkpoint/close interface as KafkaProducer and can stand in for it.
+    """
+
+    def __init__(self, directory, segment_bytes=EVENT_LOG_SEGMENT_BYTES, index_interval_bytes=EVENT_LOG_INDEX_INTERVAL_BYTES,
+                 serializers=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval_bytes = index_interval_bytes
+        self.serializers = dict(serializers or {})
+        self.segments = {}  # Topic name -> _SegmentWriter for its active segment
+        self.stats = ThroughputStats()
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, topic, data, topic_identifier=None):
+        serializer = self.serializers.get(topic)
+        if serializer is None:
+            serializer = self.serializers[topic] = get_serializer(topic)
+
+        timestamp = data.get('timestamp')
+        timestamp_ms = int(datetime.fromisoformat(timestamp).timestamp() * 1000) if timestamp else int(time.time() * 1000)
+        self.append(topic, serializer.key(data), serializer.serialize(data), timestamp_ms)
+
+    def append(self, topic, key_bytes, value_bytes, timestamp_ms):
+        """
+        Append one already serialized record to a topic's log.
+        """
+        segment = self.segments.get(topic)
+        if segment is None:
+            segment = self.segments[topic] = self._open_segment(topic)
+        elif segment.size >= self.segment_bytes:
+            segment.close()
+            segment = self.segments[topic] = _SegmentWriter(self._topic_directory(topic), segment.next_offset, self.index_interval_bytes)
+
+        segment.append(key_bytes, value_bytes, timestamp_ms)
+        self.stats.record_produced(len(value_bytes))
+
+    def _topic_directory(self, topic):
+        path = os.path.join(self.directory, topic)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _open_segment(self, topic):
+        # Continue after the last record of an existing log instead of overwriting it
+        path = self._topic_directory(topic)
+        segments = list_segments(path)
+        next_offset = 0
+        if segments:
+            last = EventLogSegment(path, segments[-1])
+            next_offset = last.base_offset + last.count()
+            last.close()
+        return _SegmentWriter(path, next_offset, self.index_interval_bytes)
+
+    def poll(self, timeout=0):
+        pass
+
+    def end_tick(self):
+        pass
+
+    def queued(self):
+        return 0
+
+    def checkpoint(self, timeout=None):
+        for segment in self.segments.values():
+            segment.flush()
+        return 0
+
+    def close(self, timeout=None):
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+        print(self.stats.summary().replace("Producer throughput", "Event log throughput"))
+        return 0
+
+
+class _SegmentWriter:
+    def __init__(self, directory, base_offset, index_interval_bytes):
+        self.base_offset = base_offset
+        self.next_offset = base_offset
+        self.index_interval_bytes = index_interval_bytes
+        self.log = open(os.path.join(directory, segment_name(base_offset) + LOG_SUFFIX), "ab")
+        self.index = open(os.path.join(directory, segment_name(base_offset) + INDEX_SUFFIX), "ab")
+        self.size = self.log.tell()
+        self._bytes_since_index = self.index_interval_bytes  # Index the first record of the segment
+
+    def append(self, key_bytes, value_bytes, timestamp_ms):
+        if self._bytes_since_index >= self.index_interval_bytes:
+            self.index.write(INDEX_ENTRY.pack(self.next_offset - self.base_offset, self.size, timestamp_ms))
+            self._bytes_since_index = 0
+
+        frame_length = FRAME_HEADER.size - 4 + len(key_bytes) + len(value_bytes)
+        self.log.write(FRAME_HEADER.pack(frame_length, timestamp_ms, len(key_bytes)))
+        self.log.write(key_bytes)
+        self.log.write(value_bytes)
+
+        self.size += 4 + frame_length
+        self._bytes_since_index += 4 + frame_length
+        self.next_offset += 1
+
+    def flush(self):
+        self.log.flush()
+        self.index.flush()
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+
+def list_segments(topic_directory):
+    """
+    Base offsets of a topic's segments, in order.
+    """
+    return sorted(int(name[:-len(LOG_SUFFIX)]) for name in os.listdir(topic_directory) if name.endswith(LOG_SUFFIX))
+
+
+class EventLogSegment:
+    """
+    Read-only, memory-mapped view of one segment and its sparse index.
+    """
+
+    def __init__(self, topic_directory, base_offset):
+        self.base_offset = base_offset
+        self._file = open(os.path.join(topic_directory, segment_name(base_offset) + LOG_SUFFIX), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        index_path = os.path.join(topic_directory, segment_name(base_offset) + INDEX_SUFFIX)
+        with open(index_path, "rb") as index_file:
+            raw = index_file.read()
+        entries = [INDEX_ENTRY.unpack_from(raw, position) for position in range(0, len(raw) - len(raw) % INDEX_ENTRY.size, INDEX_ENTRY.size)]
+        self.index_offsets = [base_offset + relative for relative, _, _ in entries]
+        self.index_positions = [position for _, position, _ in entries]
+        self.index_timestamps = [timestamp for _, _, timestamp in entries]
+
+    def seek_offset(self, offset):
+        """
+        Byte position and offset of the last indexed record at or before ``offset``.
+        """
+        entry = bisect_right(self.index_offsets, offset) - 1
+        if entry < 0:
+            return 0, self.base_offset
+        return self.index_positions[entry], self.index_offsets[entry]
+
+    def seek_timestamp(self, timestamp_ms):
+        """
+        Byte position and offset to scan from for the first record at or after ``timestamp_ms``.
+
+        Timestamps are not strictly ordered across vehicles, so this starts one index entry before the first
+        entry that reaches the timestamp.
+        """
+        for entry, indexed_timestamp in enumerate(self.index_timestamps):
+            if indexed_timestamp >= timestamp_ms:
+                entry = max(entry - 1, 0)
+                return self.index_positions[entry], self.index_offsets[entry]
+        if not self.index_positions:
+            return 0, self.base_offset
+        return self.index_positions[-1], self.index_offsets[-1]
+
+    def records(self, position=0, offset=None):
+        """
+        Yield (offset, timestamp_ms, key, value) from ``position`` to the end of the segment.
+
+        Keys and values are memoryviews into the mapped file; copy them if they must outlive the segment.
+        """
+        offset = self.base_offset if offset is None else offset
+        data = self.data
+        view = memoryview(data)
+        end = len(data)
+        while position + FRAME_HEADER.size <= end:
+            frame_length, timestamp_ms, key_length = FRAME_HEADER.unpack_from(data, position)
+            frame_end = position + 4 + frame_length
+            if frame_end > end:
+                break  # Torn write at the tail of the segment
+            key_start = position + FRAME_HEADER.size
+            value_start = key_start + key_length
+            yield offset, timestamp_ms, view[key_start:value_start], view[value_start:frame_end]
+            position = frame_end
+            offset += 1
+
+    def count(self):
+        """
+        Number of complete records in the segment (scans only the tail after the last index entry).
+        """
+        position, next_offset = (self.index_positions[-1], self.index_offsets[-1]) if self.index_positions else (0, self.base_offset)
+        for offset, _, _, _ in self.records(position, next_offset):
+            next_offset = offset + 1
+        return next_offset - self.base_offset
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except BufferError:
+                pass  # A caller still holds a view into the map; it is unmapped once that is released
+        self._file.close()
+
+
+class EventLogReader:
+    """
+    Sequential reader over every segment of one topic.
+    """
+
+    def __init__(self, directory, topic):
+        self.topic = topic
+        self.topic_directory = os.path.join(directory, topic)
+        self.base_offsets = list_segments(self.topic_directory) if os.path.isdir(self.topic_directory) else []
+
+    def records(self, start_offset=0, start_timestamp_ms=None):
+        """
+        Yield (offset, timestamp_ms, key, value) for every record from ``start_offset`` on, or from the
+        first record at or after ``start_timestamp_ms`` when given.
+        """
+        first = max(bisect_right(self.base_offsets, start_offset) - 1, 0)
+        for base_offset in self.base_offsets[first:]:
+            segment = EventLogSegment(self.topic_directory, base_offset)
+            try:
+                if start_timestamp_ms is not None:
+                    position, offset = segment.seek_timestamp(start_timestamp_ms)
+                else:
+                    position, offset = segment.seek_offset(start_offset)
+                for record in segment.records(position, offset):
+                    if record[0] < start_offset or (start_timestamp_ms is not None and record[1] < start_timestamp_ms):
+                        continue
+                    yield record
+            finally:
+                segment.close()
+
+
+def log_topics(directory):
+    """
+    Topics with records in the event log at ``directory``, i.e. its topic subdirectories, sorted by name.
+    """
+    if not os.path.isdir(directory):
+        return []
+    paths = {name: os.path.join(directory, name) for name in os.listdir(directory)}
+    return sorted(name for name, path in paths.items() if os.path.isdir(path) and list_segments(path))
+
+
+def merged_records(directory, topics, start_timestamp_ms=None):
+    """
+    Yield (topic, offset, timestamp_ms, key, value) for several topics, merged by timestamp.
+
+    Keys and values are copied to bytes, since records of different segments are interleaved.
+    """
+    def topic_records(topic):
+        for offset, timestamp_ms, key, value in EventLogReader(directory, topic).records(start_timestamp_ms=start_timestamp_ms):
+            yield timestamp_ms, topic, offset, bytes(key), bytes(value)
+
+    for timestamp_ms, topic, offset, key, value in heapq.merge(*(topic_records(topic) for topic in topics)):
+        yield topic, offset, timestamp_ms, key, value
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import uuid
+
+from config.settings import GPS_BATCH_TOPIC, GPS_BATCH_SAMPLES, GPS_BATCH_MAX_MS
+from jobs.gps_codec import EPOCH, MAX_SAMPLES
+from models.fleet import compass_direction, uuid_bytes
+from utilities.random_streams import GPS_BATCH_ID, counter_bits
+
+
+class GpsBatcher:
+    """
+    Accumulates GPS samples per vehicle and publishes them as delta-encoded micro-batches.
+
+    A vehicle's batch is published to GPS_BATCH_TOPIC once it holds ``max_samples`` samples or spans
+    ``max_ms`` of simulated time, whichever comes first. The span is checked when a sample arrives, so a
+    vehicle that stops ticking keeps its partial batch until ``flush()``; call it before checkpointing.
+
+    Batch IDs come from ``id_generator`` (time-ordered IDs) when one is set; otherwise batches of fleet
+    vehicles get IDs from the vehicle's stream at the tick of their first sample, so seeded runs repeat
+    them, and other batches random ones.
+    """
+
+    def __init__(self, producer, max_samples=GPS_BATCH_SAMPLES, max_ms=GPS_BATCH_MAX_MS, vehicle_type="private", id_generator=None):
+        if not 1 < max_samples <= MAX_SAMPLES:
+            raise ValueError(f"GPS batches need 2 to {MAX_SAMPLES} samples, got {max_samples}")
+        self.producer = producer
+        self.max_samples = max_samples
+        self.max_sec = max_ms / 1000
+        self.vehicle_type = vehicle_type
+        self.id_generator = id_generator
+        self.pending = {}  # vehicle_id -> samples of its open batch
+        self.id_sources = {}  # vehicle_id -> (stream key, tick) of its open batch's first sample
+        self.samples = 0
+        self.batches = 0
+
+    def add(self, vehicle_id, timestamp, latitude, longitude, speed, direction, id_source=None):
+        """
+        Add one sample; ``timestamp`` is in epoch seconds and ``direction`` a COMPASS_POINTS index.
+        ``id_source`` is the vehicle's (stream key, tick) for the ID of a batch this sample opens.
+        """
+        # Same naive wall-clock convention as the records' ISO timestamps
+        sample = ((datetime.fromtimestamp(timestamp) - EPOCH).total_seconds(), latitude, longitude, speed, direction)
+        samples = self.pending.get(vehicle_id)
+        if samples is not None and sample[0] - samples[0][0] >= self.max_sec:
+            self._publish(vehicle_id, self.pending.pop(vehicle_id))
+            samples = None
+        if samples is None:
+            samples = self.pending[vehicle_id] = []
+            self.id_sources[vehicle_id] = id_source
+        samples.append(sample)
+        self.samples += 1
+        if len(samples) >= self.max_samples:
+            self._publish(vehicle_id, self.pending.pop(vehicle_id))
+
+    def add_fleet(self, fleet, indices):
+        """
+        Add the current sample of every given fleet vehicle.
+        """
+        columns = zip(indices.tolist(), fleet.timestamp[indices].tolist(), fleet.latitude[indices].tolist(),
+                      fleet.longitude[indices].tolist(), fleet.speed[indices].astype(int).tolist(),
+                      compass_direction(fleet.heading[indices]).tolist(), fleet.keys[indices].tolist(), fleet.ticks[indices].tolist())
+        for index, timestamp, latitude, longitude, speed, direction, key, tick in columns:
+            self.add(fleet.vehicle_id(index), timestamp, latitude, longitude, speed, direction, (key, tick))
+
+    def _batch_id(self, id_source):
+        if self.id_generator is not None:
+            return uuid.UUID(bytes=self.id_generator.uuid_bytes(1)[0].tobytes())
+        if id_source is not None:
+            return uuid.UUID(bytes=uuid_bytes(counter_bits(*id_source, GPS_BATCH_ID, 2))[0].tobytes())
+        return None  # The codec draws a random one
+
+    def _publish(self, vehicle_id, samples):
+        record = {
+            "id": self._batch_id(self.id_sources.pop(vehicle_id, None)),
+            "vehicle_id": vehicle_id,
+            "vehicle_type": self.vehicle_type,
+            "timestamp": (EPOCH + timedelta(seconds=samples[0][0])).isoformat(),
+            "samples": samples,
+        }
+        self.producer.publish(GPS_BATCH_TOPIC, record, 'GPS_BATCH_TOPIC')
+        self.batches += 1
+
+    def flush(self):
+        """
+        Publish every open batch.
+        """
+        for vehicle_id, samples in self.pending.items():
+            self._publish(vehicle_id, samples)
+        self.pending.clear()
+
+
+def create_gps_batcher(producer, id_generator=None):
+    """
+    A GpsBatcher on ``producer`` when GPS_BATCH_SAMPLES enables micro-batching, else None.
+    """
+    return GpsBatcher(producer, id_generator=id_generator) if GPS_BATCH_SAMPLES > 1 else None
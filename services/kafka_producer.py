@@ -1,43 +1,510 @@
-import uuid
-from confluent_kafka import SerializingProducer
-from config.settings import KAFKA_BOOTSTRAP_SERVER
-import simplejson as json
+import os
+import time
+from confluent_kafka import TIMESTAMP_NOT_AVAILABLE, KafkaError, KafkaException, Producer
+from confluent_kafka.admin import AdminClient, NewTopic
+from config.settings import KAFKA_BOOTSTRAP_SERVER, KAFKA_LINGER_MS, KAFKA_BATCH_SIZE, KAFKA_POLL_INTERVAL, KAFKA_REPORT_INTERVAL_SEC, KAFKA_STATISTICS_INTERVAL_MS, KAFKA_DEBUG_DELIVERY
+from config.settings import KAFKA_QUEUE_MAX_MESSAGES, KAFKA_QUEUE_MAX_KBYTES, KAFKA_QUEUE_HIGH_WATERMARK, KAFKA_QUEUE_LOW_WATERMARK, KAFKA_BACKPRESSURE_TIMEOUT_SEC, SPILL_DIR
+from config.settings import KAFKA_IDEMPOTENCE, KAFKA_TRANSACTIONAL_ID, KAFKA_TRANSACTION_TICKS, KAFKA_TRANSACTION_TIMEOUT_SEC
+from services.producer_metrics import ProducerMetrics
+from services.serializers import get_serializer
+
+# Delivery errors after which a record is spilled for a retry, besides the ones librdkafka flags as retriable
+SPILLED_ERRORS = {KafkaError._MSG_TIMED_OUT, KafkaError._PURGE_QUEUE, KafkaError._TRANSPORT, KafkaError._ALL_BROKERS_DOWN}
+# First and longest pause between retries of a transaction commit that failed with a retriable error
+COMMIT_BACKOFF_SEC = 0.1
+COMMIT_MAX_BACKOFF_SEC = 5.0
 
 class KafkaProducer:
-    def __init__(self):
+    """
+    Asynchronous, batching wrapper around the confluent-kafka producer.
+
+    ``publish`` only enqueues the message: librdkafka batches it in the background (``linger.ms`` /
+    ``batch.size``) and delivery callbacks are served by a ``poll(0)`` every ``poll_interval`` messages.
+    Blocking ``flush()`` calls are reserved for ``checkpoint()`` and ``close()``.
+
+    Each topic is serialized with the wire format chosen in ``TOPIC_WIRE_FORMATS`` unless a serializer is
+    passed in ``serializers`` (topic name -> serializer).
+
+    ``metrics`` (services.producer_metrics) collects per-topic counts, delivery latencies, errors and
+    librdkafka's statistics; the periodic report prints its summary line. Per-message delivery lines are
+    only printed with ``debug_delivery``.
+
+    Memory stays bounded when the broker is slow or down. librdkafka's queue is capped at
+    ``queue_max_messages`` / ``queue_max_kbytes``; once it is ``high_watermark`` full, publishing blocks (the
+    generator slows down to the broker's pace) until delivery reports bring it below ``low_watermark``. If
+    that takes longer than ``backpressure_timeout_sec``, the broker is treated as unavailable: records go to
+    a SpillQueue in ``spill_dir`` instead, and so does every later record until the spill is drained, so
+    records of a topic keep their order. ``poll`` drains the spill back into librdkafka whenever the queue
+    is below the low watermark again, and records that fail delivery with a retriable error are spilled
+    rather than lost. Without a ``spill_dir``, publishing keeps waiting on a full queue.
+
+    With ``idempotence`` the broker discards duplicates from producer retries and keeps each partition in
+    produce order. With a ``transactional_id`` every ``transaction_ticks`` ticks (see ``end_tick``) are
+    committed as one transaction, so consumers reading ``read_committed`` see a tick's records on all
+    topics or none of them, never a partial tick. Larger transactions spread the commit round trip over
+    more records. A transaction that has to be aborted is produced once more from the records it kept. The
+    disk spill is not used in this mode: a record spilled outside its transaction would break the atomicity.
+    """
+
+    def __init__(self, linger_ms=KAFKA_LINGER_MS, batch_size=KAFKA_BATCH_SIZE, poll_interval=KAFKA_POLL_INTERVAL,
+                 report_interval_sec=KAFKA_REPORT_INTERVAL_SEC, serializers=None, statistics_interval_ms=KAFKA_STATISTICS_INTERVAL_MS,
+                 debug_delivery=KAFKA_DEBUG_DELIVERY, queue_max_messages=KAFKA_QUEUE_MAX_MESSAGES, queue_max_kbytes=KAFKA_QUEUE_MAX_KBYTES,
+                 high_watermark=KAFKA_QUEUE_HIGH_WATERMARK, low_watermark=KAFKA_QUEUE_LOW_WATERMARK,
+                 backpressure_timeout_sec=KAFKA_BACKPRESSURE_TIMEOUT_SEC, spill_dir=SPILL_DIR, idempotence=KAFKA_IDEMPOTENCE,
+                 transactional_id=KAFKA_TRANSACTIONAL_ID, transaction_ticks=KAFKA_TRANSACTION_TICKS,
+                 transaction_timeout_sec=KAFKA_TRANSACTION_TIMEOUT_SEC):
+        self.linger_ms = linger_ms
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.report_interval_sec = report_interval_sec
+        self.statistics_interval_ms = statistics_interval_ms
+        self.debug_delivery = debug_delivery
+        self.queue_max_messages = queue_max_messages
+        self.queue_max_kbytes = queue_max_kbytes
+        self.high_watermark = max(1, int(queue_max_messages * high_watermark))
+        self.low_watermark = min(int(queue_max_messages * low_watermark), self.high_watermark - 1)
+        self.backpressure_timeout_sec = backpressure_timeout_sec
+        self.idempotence = idempotence or bool(transactional_id)
+        self.transactional_id = transactional_id
+        self.transaction_ticks = max(1, transaction_ticks)
+        self.transaction_timeout_sec = transaction_timeout_sec
+        self.metrics = ProducerMetrics()
         self.producer = self._create_producer()
+        self.serializers = dict(serializers or {})
+        self.spill = self._create_spill(spill_dir) if spill_dir and not transactional_id else None
+
+        # Open transaction: records produced in it (kept to produce them again after an abort) and ticks ended
+        self._transactions_ready = False
+        self._transaction_records = None
+        self._transaction_ticks = 0
+        self._complete_records = 0  # Records of the open transaction that belong to ended ticks
+        self._transaction_started = 0.0
+
+        # Topic name -> identifier used in the delivery reports, so no closure is built per message
+        self.topic_identifiers = {}
+        self.stats = ThroughputStats()
+        self._since_poll = 0
+        self._last_report = time.monotonic()
 
     def _create_producer(self):
         producer_conf = {
             'bootstrap.servers': KAFKA_BOOTSTRAP_SERVER,
+            'linger.ms': self.linger_ms,
+            'batch.size': self.batch_size,
+            'queue.buffering.max.messages': self.queue_max_messages,
+            'queue.buffering.max.kbytes': self.queue_max_kbytes,
+            'enable.idempotence': self.idempotence,
             # 'key.serializer': 'org.apache.kafka.common.serialization.StringSerializer',
             # 'value.serializer': 'org.apache.kafka.common.serialization.StringSerializer'
         }
-        return SerializingProducer(producer_conf)
+        if self.transactional_id:
+            producer_conf['transactional.id'] = self.transactional_id
+            producer_conf['transaction.timeout.ms'] = int(self.transaction_timeout_sec * 1000)
+        if self.statistics_interval_ms:
+            # Served from poll(), like the delivery reports
+            producer_conf['statistics.interval.ms'] = self.statistics_interval_ms
+            producer_conf['stats_cb'] = self.metrics.on_stats
+        return Producer(producer_conf)
+
+    def _create_spill(self, spill_dir):
+        # Imported here: the event log the spill is written in imports this module
+        from services.spill import SpillQueue
+        os.makedirs(spill_dir, exist_ok=True)
+        spill = SpillQueue(spill_dir)
+        self.metrics.set_spill_backlog(spill.pending_messages, spill.pending_bytes)
+        return spill
 
     def publish(self, topic, data, topic_identifier):
-        # Convert the UUID key to a string and encode it to bytes
-        key_bytes = str(data['id']).encode('utf-8')
+        serializer = self.serializers.get(topic)
+        if serializer is None:
+            serializer = self.serializers[topic] = get_serializer(topic)
 
-        # Serialize the data to a JSON string and encode it to bytes
         # Use the bytes-like objects for key and value
-        value_bytes = json.dumps(data, default=self.json_serializer).encode('utf-8')
-        
-        # self.producer.produce(topic=topic, key=key_bytes, value=value_bytes, on_delivery=self.delivery_report)
-        # Adjust the produce call to include the topic_identifier in the callback lambda
-        self.producer.produce(topic=topic, key=key_bytes, value=value_bytes, on_delivery=lambda err, msg: self.delivery_report(err, msg, topic_identifier))
-        self.producer.flush()
+        key_bytes = serializer.key(data)
+        value_bytes = serializer.serialize(data)
+
+        self.topic_identifiers[topic] = topic_identifier
+        self._produce(topic, key_bytes, value_bytes)
+
+    def publish_raw(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        """
+        Produce an already serialized record, e.g. one replayed from the event log with its logged
+        ``timestamp_ms`` as Kafka timestamp (the produce time when None).
+        """
+        self._produce(topic, key_bytes, value_bytes, timestamp_ms)
+
+    def _produce(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        self.stats.record_produced(len(value_bytes))
+        self.metrics.record_produced(topic, len(value_bytes))
+        self._since_poll += 1
+
+        if self.transactional_id:
+            self._produce_in_transaction(topic, key_bytes, value_bytes, timestamp_ms)
+        elif self.spilling:
+            # Behind records that are already spilled: queue up after them to keep the topic's order
+            self._spill(topic, key_bytes, value_bytes, timestamp_ms)
+        elif len(self.producer) >= self.high_watermark and not self._wait_for_capacity():
+            self._spill(topic, key_bytes, value_bytes, timestamp_ms)
+        else:
+            while True:
+                try:
+                    self.producer.produce(topic=topic, key=key_bytes, value=value_bytes, timestamp=timestamp_ms or 0, on_delivery=self.delivery_report)
+                    break
+                except BufferError:
+                    # Local queue is full (queue.buffering.max.kbytes): make room or spill. The queue can fill up
+                    # again before the retry, so retry until the record is in the queue or in the spill
+                    self.producer.poll(0.05)
+                    if not self._wait_for_capacity():
+                        self._spill(topic, key_bytes, value_bytes, timestamp_ms)
+                        break
+
+        if self._since_poll >= self.poll_interval:
+            self.poll()
+
+    def _produce_in_transaction(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        if self._transaction_records is None:
+            self._begin_transaction()
+        if len(self.producer) >= self.high_watermark:
+            self._wait_for_capacity()
+        # Transactions have no spill: wait for room, but give up with an error once the transaction would time out
+        deadline = time.monotonic() + self.transaction_timeout_sec
+        while True:
+            try:
+                self.producer.produce(topic=topic, key=key_bytes, value=value_bytes, timestamp=timestamp_ms or 0, on_delivery=self.delivery_report)
+                break
+            except BufferError:
+                if time.monotonic() >= deadline:
+                    raise BufferError(f"Producer queue still full after {self.transaction_timeout_sec:.0f}s, "
+                                      f"the open transaction of {len(self._transaction_records)} records can't take more")
+                self.producer.poll(0.05)
+                self._wait_for_capacity()
+        self._transaction_records.append((topic, key_bytes, value_bytes, timestamp_ms))
+
+    def _begin_transaction(self):
+        if not self._transactions_ready:
+            # Fences off older producers with the same transactional.id and aborts what they left open
+            self.producer.init_transactions(self.transaction_timeout_sec)
+            self._transactions_ready = True
+        self.producer.begin_transaction()
+        self._transaction_records = []
+        self._transaction_ticks = 0
+        self._complete_records = 0
+        self._transaction_started = time.monotonic()
+
+    def end_tick(self):
+        """
+        Mark the end of a tick: its records are complete, and every ``transaction_ticks`` ticks the open
+        transaction is committed. Does nothing without a ``transactional_id``.
+        """
+        if self._transaction_records is None:
+            return
+        self._transaction_ticks += 1
+        self._complete_records = len(self._transaction_records)
+        if self._transaction_ticks >= self.transaction_ticks:
+            self.commit_transaction()
+
+    def commit_transaction(self, retry=True):
+        """
+        Commit the open transaction, if any.
+
+        librdkafka flushes the transaction's records first. A commit that fails with a retriable error is
+        retried with an exponential backoff until ``transaction_timeout_sec`` has passed; one that needs an
+        abort, or is still failing then, is aborted and, with ``retry``, its records are produced in a new
+        transaction and committed again. Fatal errors (e.g. another producer took over the
+        transactional.id) are raised.
+        """
+        records = self._transaction_records
+        if records is None:
+            return
+        deadline = time.monotonic() + self.transaction_timeout_sec
+        backoff_sec = COMMIT_BACKOFF_SEC
+        while True:
+            try:
+                self.producer.commit_transaction(self.transaction_timeout_sec)
+                break
+            except KafkaException as e:
+                error = e.args[0]
+                if error.retriable() and time.monotonic() + backoff_sec < deadline:
+                    time.sleep(backoff_sec)
+                    backoff_sec = min(backoff_sec * 2, COMMIT_MAX_BACKOFF_SEC)
+                    continue
+                if not error.retriable() and not error.txn_requires_abort():
+                    raise
+                print(f"Transaction of {len(records)} records aborted: {error}")
+                self.producer.abort_transaction(self.transaction_timeout_sec)
+                self._transaction_records = None
+                self.metrics.record_transaction(len(records), time.monotonic() - self._transaction_started, committed=False)
+                if not retry:
+                    raise
+                for record in records:
+                    self._produce_in_transaction(*record)
+                self.commit_transaction(retry=False)
+                return
+        self._transaction_records = None
+        self.metrics.record_transaction(len(records), time.monotonic() - self._transaction_started, committed=True)
+
+    def _discard_unfinished_tick(self):
+        """
+        Abort the open transaction and produce only its ended ticks again, dropping the records of a tick
+        that was interrupted halfway.
+        """
+        records = self._transaction_records
+        if records is None or len(records) == self._complete_records:
+            return
+        complete = records[:self._complete_records]
+        self.producer.abort_transaction(self.transaction_timeout_sec)
+        self._transaction_records = None
+        print(f"Dropped {len(records) - len(complete)} records of an unfinished tick")
+        for record in complete:
+            self._produce_in_transaction(*record)
+        if self._transaction_records is not None:
+            self._complete_records = len(self._transaction_records)
+
+    def _wait_for_capacity(self):
+        """
+        Backpressure: serve delivery reports until the queue is below the low watermark.
+
+        Returns:
+            bool: False if the queue did not get there within ``backpressure_timeout_sec`` and a spill is
+            available to take the record instead; without a spill this waits as long as it takes.
+        """
+        started = time.monotonic()
+        while len(self.producer) > self.low_watermark:
+            waited = time.monotonic() - started
+            if self.spill is not None and waited >= self.backpressure_timeout_sec:
+                self.metrics.record_backpressure(waited)
+                print(f"Producer queue stuck at {len(self.producer)} messages for {waited:.1f}s, spilling to {self.spill.directory}")
+                return False
+            self.producer.poll(0.05)
+        self.metrics.record_backpressure(time.monotonic() - started)
+        return True
+
+    def _spill(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        if self.spill.append(topic, key_bytes, value_bytes, timestamp_ms):
+            self.metrics.record_spilled(topic, len(value_bytes))
+        else:
+            self.metrics.record_spill_dropped(topic)
+        self.metrics.set_spill_backlog(self.spill.pending_messages, self.spill.pending_bytes)
+
+    def _drain_spill(self):
+        """
+        Move spilled records back into librdkafka's queue, up to the high watermark.
+        """
+        room = self.high_watermark - len(self.producer)
+        if room <= 0:
+            return 0
+
+        def produce(topic, key_bytes, value_bytes, timestamp_ms):
+            # Keep the time the record was first produced as its Kafka timestamp
+            self.producer.produce(topic=topic, key=key_bytes, value=value_bytes, timestamp=timestamp_ms, on_delivery=self.delivery_report)
+            self.metrics.record_drained(topic)
+
+        drained = self.spill.drain(produce, room)
+        self.metrics.set_spill_backlog(self.spill.pending_messages, self.spill.pending_bytes)
+        if not self.spill.pending:
+            print("Spill drained, producing directly again")
+        return drained
+
+    def poll(self, timeout=0):
+        """
+        Serve pending delivery callbacks without blocking, drain spilled records once the queue has room
+        again, and print the throughput report when due.
+        """
+        self._since_poll = 0
+        self.producer.poll(timeout)
+        if self.spill is not None and self.spill.pending and len(self.producer) < self.low_watermark:
+            self._drain_spill()
+
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval_sec:
+            self._last_report = now
+            self.report_throughput()
+
+    def queued(self):
+        """
+        Messages waiting in librdkafka's local queue (not yet delivered).
+        """
+        return len(self.producer)
 
+    @property
+    def spilling(self):
+        """
+        True while records go to the disk spill instead of librdkafka.
+        """
+        return self.spill is not None and bool(self.spill.pending)
 
+    def checkpoint(self, timeout=30):
+        """
+        Block until every message produced so far has been delivered (or failed), draining the spill into
+        the queue as it empties.
 
-    def json_serializer(self, data):
-        if isinstance(data, uuid.UUID):
-            return str(data)
-        raise TypeError(f"Object of Type {data.__class__.__name__} is not serializable")
-    
-    def delivery_report(self, err, msg, topic_identifier):
+        Returns:
+            int: Number of messages still queued or spilled when the timeout expired.
+        """
+        # A checkpoint ends the open transaction, however many ticks it holds
+        self.commit_transaction()
+        deadline = time.monotonic() + timeout
+        while self.spill is not None and self.spill.pending and time.monotonic() < deadline:
+            self.producer.poll(0.1)
+            if len(self.producer) < self.low_watermark:
+                self._drain_spill()
+        remaining = self.producer.flush(max(deadline - time.monotonic(), 0))
+        if self.spill is not None:
+            remaining += self.spill.pending_messages
+        if remaining:
+            print(f"Checkpoint timed out with {remaining} messages still queued or spilled")
+        return remaining
+
+    def close(self, timeout=30):
+        # Closing mid-tick (e.g. on Ctrl-C) must not commit part of a tick
+        self._discard_unfinished_tick()
+        remaining = self.checkpoint(timeout)
+        if self.spill is not None:
+            if remaining:
+                # Records still waiting for the broker come back purged through the delivery reports and are
+                # spilled; those already sent may still be acknowledged, or be produced twice
+                self.producer.purge(in_queue=True, in_flight=False)
+                self.producer.poll(0)
+            if self.spill.pending:
+                print(f"{self.spill.pending_messages} spilled messages are kept in {self.spill.directory} for the next run")
+            self.spill.close()
+        self.report_throughput()
+        return remaining
+
+    def report_throughput(self):
+        print(self.stats.summary())
+        print(self.metrics.summary())
+
+    def delivery_report(self, err, msg):
         if err is not None:
+            self.metrics.record_failed(msg.topic(), err.name())
+            if self.spill is not None and (err.retriable() or err.code() in SPILLED_ERRORS):
+                # The broker may come back: spill the record to retry it then, instead of losing it
+                timestamp_type, timestamp_ms = msg.timestamp()
+                self._spill(msg.topic(), msg.key(), msg.value(), timestamp_ms if timestamp_type != TIMESTAMP_NOT_AVAILABLE else None)
+                return
+            self.stats.record_failed()
             print(f"Message delivery failed: {err}")
         else:
-            # Updated message format for clarity
-            print(f"Message[{msg.topic()}] delivered to topic '{topic_identifier}' [Partition {msg.partition()}]")
+            self.stats.record_delivered()
+            self.metrics.record_delivered(msg.topic(), msg.latency())
+            if self.debug_delivery:
+                # Updated message format for clarity
+                topic_identifier = self.topic_identifiers.get(msg.topic())
+                print(f"Message[{msg.topic()}] delivered to topic '{topic_identifier}' [Partition {msg.partition()}]")
+
+
+class ThroughputStats:
+    """
+    Running counters for produced, delivered and failed messages since the producer started.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.produced = 0
+        self.produced_bytes = 0
+        self.delivered = 0
+        self.failed = 0
+
+    def record_produced(self, size):
+        self.produced += 1
+        self.produced_bytes += size
+
+    def record_delivered(self):
+        self.delivered += 1
+
+    def record_failed(self):
+        self.failed += 1
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"Producer throughput: {self.produced} produced ({self.produced / elapsed:.0f} msgs/s, "
+                f"{self.produced_bytes / elapsed / 1e6:.2f} MB/s), {self.delivered} delivered "
+                f"({self.delivered / elapsed:.0f} msgs/s), {self.failed} failed over {elapsed:.1f}s")
+
+
+class NullProducer:
+    """
+    Broker-less sink that serializes every record like KafkaProducer and then drops it.
+
+    It exposes the same publish/poll/checkpoint/close interface, so the generators can be run and timed
+    without Kafka: what is left is the cost of generating and serializing the records.
+    """
+
+    def __init__(self, serializers=None):
+        self.serializers = dict(serializers or {})
+        self.stats = ThroughputStats()
+
+    def publish(self, topic, data, topic_identifier=None):
+        serializer = self.serializers.get(topic)
+        if serializer is None:
+            serializer = self.serializers[topic] = get_serializer(topic)
+        self.publish_raw(topic, serializer.key(data), serializer.serialize(data))
+
+    def publish_raw(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        self.stats.record_produced(len(value_bytes))
+        self.stats.record_delivered()
+
+    def poll(self, timeout=0):
+        pass
+
+    def end_tick(self):
+        pass
+
+    def queued(self):
+        return 0
+
+    def checkpoint(self, timeout=None):
+        return 0
+
+    def close(self, timeout=None):
+        print(self.stats.summary().replace("Producer throughput", "Null sink throughput"))
+        return 0
+
+
+_shared_producer = None
+
+
+def get_producer(**options):
+    """
+    Return the process-wide producer, creating it on first use.
+
+    A single long-lived producer per process keeps librdkafka's batches and connections warm;
+    building one per message or per tick forces a broker round trip for every record.
+
+    Args:
+        **options: KafkaProducer arguments, only used when the producer is created.
+    """
+    global _shared_producer
+    if _shared_producer is None:
+        _shared_producer = KafkaProducer(**options)
+    return _shared_producer
+
+
+def close_producer(timeout=30):
+    """
+    Flush and drop the process-wide producer, if one was created.
+    """
+    global _shared_producer
+    if _shared_producer is not None:
+        _shared_producer.close(timeout)
+        _shared_producer = None
+
+
+def ensure_compacted_topic(topic, num_partitions=1, replication_factor=1, timeout=10):
+    """
+    Create ``topic`` with ``cleanup.policy=compact`` unless it already exists.
+
+    A compacted topic keeps the latest record per key forever, so consumers can rebuild the full
+    vehicle profile table from it no matter when they start. Brokers auto-create topics with the
+    delete policy, so this must run before the first record is produced.
+    """
+    admin = AdminClient({'bootstrap.servers': KAFKA_BOOTSTRAP_SERVER})
+    futures = admin.create_topics([NewTopic(topic, num_partitions=num_partitions, replication_factor=replication_factor,
+                                            config={'cleanup.policy': 'compact'})], request_timeout=timeout)
+    try:
+        futures[topic].result(timeout)
+        print(f"Created compacted topic {topic}")
+    except KafkaException as e:
+        if e.args[0].code() != KafkaError.TOPIC_ALREADY_EXISTS:
+            print(f"Could not create compacted topic {topic}: {e}")
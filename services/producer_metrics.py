@@ -0,0 +1,332 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import json
+import threading
+import time
+
+# Upper bounds (ms) of the delivery latency buckets; librdkafka batches for linger.ms, so most deliveries
+# land between a few and a few hundred ms
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram of latencies in milliseconds, in the cumulative form Prometheus expects.
+    """
+
+    def __init__(self, bounds_ms=LATENCY_BUCKETS_MS):
+        self.bounds_ms = list(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, latency_ms):
+        self.counts[bisect.bisect_left(self.bounds_ms, latency_ms)] += 1
+        self.count += 1
+        self.sum_ms += latency_ms
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the ``q`` quantile (inf when it is the overflow bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds_ms + [float("inf")], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        seen = 0
+        for bound, count in zip(self.bounds_ms + [float("inf")], self.counts):
+            seen += count
+            yield bound, seen
+
+
+class ProducerMetrics:
+    """
+    Producer metrics from our own callbacks and from librdkafka's statistics.
+
+    Our side counts produced and delivered messages per topic, delivery errors per error name and the
+    produce-to-delivery latency. librdkafka's JSON statistics (``statistics.interval.ms``) add what only
+    the client knows: messages waiting in its queue, time spent in that queue, broker round trips and the
+    size of the batches it sends. Comparing the three latencies tells where time goes: a long queue time
+    with a short round trip is a producer that can't drain its queue, a long round trip is a slow broker,
+    and both short while throughput stays low points at the generator itself.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Scrapes come from the HTTP server thread
+        self.started = time.monotonic()
+        self.produced = {}  # topic -> [messages, bytes]
+        self.delivered = {}  # topic -> messages
+        self.errors = {}  # (topic, error name) -> messages
+        self.latency = {}  # topic -> LatencyHistogram
+        self.stats = {}  # Latest values taken from the librdkafka statistics
+        self.spilled = {}  # topic -> [messages, bytes] written to the disk spill
+        self.drained = {}  # topic -> messages moved from the spill back to librdkafka
+        self.spill_dropped = {}  # topic -> messages dropped because the spill was full
+        self.spill_backlog = (0, 0)  # Messages and bytes waiting in the spill
+        self.transactions = {True: [0, 0], False: [0, 0]}  # committed -> [transactions, records]
+        self.commit_latency = LatencyHistogram()  # Transaction open to commit
+        self.backpressure_waits = 0
+        self.backpressure_wait_sec = 0.0
+        self._last_drained = (time.monotonic(), 0)
+        self._last_rates = (time.monotonic(), {})
+
+    def record_produced(self, topic, size):
+        counters = self.produced.get(topic)
+        if counters is None:
+            counters = self.produced[topic] = [0, 0]
+        counters[0] += 1
+        counters[1] += size
+
+    def record_delivered(self, topic, latency_sec):
+        self.delivered[topic] = self.delivered.get(topic, 0) + 1
+        histogram = self.latency.get(topic)
+        if histogram is None:
+            histogram = self.latency[topic] = LatencyHistogram()
+        if latency_sec is not None:
+            histogram.observe(latency_sec * 1000)
+
+    def record_failed(self, topic, error_name):
+        key = (topic, error_name)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_spilled(self, topic, size):
+        counters = self.spilled.get(topic)
+        if counters is None:
+            counters = self.spilled[topic] = [0, 0]
+        counters[0] += 1
+        counters[1] += size
+
+    def record_drained(self, topic):
+        self.drained[topic] = self.drained.get(topic, 0) + 1
+
+    def record_spill_dropped(self, topic):
+        self.spill_dropped[topic] = self.spill_dropped.get(topic, 0) + 1
+
+    def set_spill_backlog(self, messages, size):
+        self.spill_backlog = (messages, size)
+
+    def record_backpressure(self, wait_sec):
+        self.backpressure_waits += 1
+        self.backpressure_wait_sec += wait_sec
+
+    def record_transaction(self, records, duration_sec, committed):
+        counters = self.transactions[committed]
+        counters[0] += 1
+        counters[1] += records
+        if committed:
+            self.commit_latency.observe(duration_sec * 1000)
+
+    def drain_rate(self):
+        """
+        Spilled messages per second moved back to librdkafka since the previous call.
+        """
+        now = time.monotonic()
+        drained = sum(dict(self.drained).values())
+        last_time, last_drained = self._last_drained
+        self._last_drained = (now, drained)
+        return (drained - last_drained) / max(now - last_time, 1e-9)
+
+    def on_stats(self, stats_json):
+        """
+        librdkafka ``stats_cb``: keep the queue, batch and broker figures of one statistics report.
+        """
+        stats = json.loads(stats_json)
+        brokers = [broker for broker in stats.get("brokers", {}).values() if broker.get("nodeid", -1) >= 0]
+        partitions = [partition for topic in stats.get("topics", {}).values()
+                      for partition in topic.get("partitions", {}).values() if partition.get("partition", -1) >= 0]
+        batch_sizes = [topic["batchsize"] for topic in stats.get("topics", {}).values() if topic.get("batchsize", {}).get("cnt")]
+        batch_counts = [topic["batchcnt"] for topic in stats.get("topics", {}).values() if topic.get("batchcnt", {}).get("cnt")]
+        with self.lock:
+            self.stats = {
+                "queue_messages": stats.get("msg_cnt", 0),
+                "queue_bytes": stats.get("msg_size", 0),
+                "queue_max_messages": stats.get("msg_max", 0),
+                # Messages waiting on brokers: not yet sent, or sent and awaiting the ack
+                "broker_outbuf_messages": sum(broker.get("outbuf_msg_cnt", 0) for broker in brokers),
+                "broker_waitresp_messages": sum(broker.get("waitresp_msg_cnt", 0) for broker in brokers),
+                "partition_queue_messages": sum(partition.get("msgq_cnt", 0) + partition.get("xmit_msgq_cnt", 0) for partition in partitions),
+                "tx_errors": sum(broker.get("txerrs", 0) for broker in brokers),
+                "tx_retries": sum(broker.get("txretries", 0) for broker in brokers),
+                "request_timeouts": sum(broker.get("req_timeouts", 0) for broker in brokers),
+                # Window averages in microseconds, averaged over brokers / topics
+                "queue_latency_us": _mean(broker.get("int_latency", {}).get("avg", 0) for broker in brokers),
+                "broker_rtt_us": _mean(broker.get("rtt", {}).get("avg", 0) for broker in brokers),
+                "batch_size_bytes": _mean(batch["avg"] for batch in batch_sizes),
+                "batch_messages": _mean(batch["avg"] for batch in batch_counts),
+            }
+
+    def rates(self):
+        """
+        Messages per second produced to each topic since the previous call.
+        """
+        now = time.monotonic()
+        with self.lock:
+            last_time, last_counts = self._last_rates
+            counts = {topic: counters[0] for topic, counters in dict(self.produced).items()}
+            self._last_rates = (now, counts)
+        elapsed = max(now - last_time, 1e-9)
+        return {topic: (count - last_counts.get(topic, 0)) / elapsed for topic, count in counts.items()}
+
+    def summary(self):
+        """
+        One line with the per-topic produce rates, the queue depth and the three latencies.
+        """
+        rates = " ".join(f"{topic}={rate:.0f}/s" for topic, rate in sorted(self.rates().items()))
+        combined = LatencyHistogram()
+        for histogram in dict(self.latency).values():
+            combined.counts = [a + b for a, b in zip(combined.counts, histogram.counts)]
+            combined.count += histogram.count
+        stats = self.stats
+        return (f"Producer metrics: {rates or 'idle'}; queue {stats.get('queue_messages', 0)} msgs, "
+                f"delivery p50<={combined.quantile(0.5):g} ms p99<={combined.quantile(0.99):g} ms, "
+                f"in-queue {stats.get('queue_latency_us', 0) / 1000:.1f} ms, broker rtt {stats.get('broker_rtt_us', 0) / 1000:.1f} ms, "
+                f"batches {stats.get('batch_messages', 0):.0f} msgs / {stats.get('batch_size_bytes', 0) / 1024:.1f} KiB, "
+                f"{sum(self.errors.values())} errors{self._transaction_summary()}{self._spill_summary()}")
+
+    def _transaction_summary(self):
+        (committed, committed_records), (aborted, _) = self.transactions[True], self.transactions[False]
+        if not committed and not aborted:
+            return ""
+        return (f"; {committed} transactions committed ({committed_records / max(committed, 1):.0f} msgs each, "
+                f"open-to-commit p50<={self.commit_latency.quantile(0.5):g} ms), {aborted} aborted")
+
+    def _spill_summary(self):
+        spilled = sum(counters[0] for counters in dict(self.spilled).values())
+        if not spilled and not self.backpressure_waits:
+            return ""
+        backlog_messages, backlog_bytes = self.spill_backlog
+        return (f"; backpressure {self.backpressure_waits} waits / {self.backpressure_wait_sec:.1f}s, "
+                f"spill {backlog_messages} msgs / {backlog_bytes / 1e6:.1f} MB pending, {spilled} spilled, "
+                f"drained {self.drain_rate():.0f}/s, {sum(self.spill_dropped.values())} dropped")
+
+    def render_prometheus(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        # The counters are updated without the lock on the producing thread; dict() copies are atomic
+        produced = {topic: list(counters) for topic, counters in dict(self.produced).items()}
+        delivered = dict(self.delivered)
+        errors = dict(self.errors)
+        spilled = {topic: list(counters) for topic, counters in dict(self.spilled).items()}
+        drained = dict(self.drained)
+        dropped = dict(self.spill_dropped)
+        histograms = {topic: (list(h.cumulative()), h.count, h.sum_ms) for topic, h in dict(self.latency).items()}
+        with self.lock:
+            stats = dict(self.stats)
+
+        metric("producer_messages_produced_total", "counter", "Messages handed to the producer.",
+               [({"topic": topic}, counters[0]) for topic, counters in produced.items()])
+        metric("producer_bytes_produced_total", "counter", "Serialized value bytes handed to the producer.",
+               [({"topic": topic}, counters[1]) for topic, counters in produced.items()])
+        metric("producer_messages_delivered_total", "counter", "Messages acknowledged by the broker.",
+               [({"topic": topic}, count) for topic, count in delivered.items()])
+        metric("producer_delivery_errors_total", "counter", "Messages that failed delivery, by error.",
+               [({"topic": topic, "error": error}, count) for (topic, error), count in errors.items()])
+        metric("producer_messages_spilled_total", "counter", "Messages written to the disk spill.",
+               [({"topic": topic}, counters[0]) for topic, counters in spilled.items()])
+        metric("producer_bytes_spilled_total", "counter", "Value bytes written to the disk spill.",
+               [({"topic": topic}, counters[1]) for topic, counters in spilled.items()])
+        metric("producer_messages_drained_total", "counter", "Spilled messages moved back to the producer queue.",
+               [({"topic": topic}, count) for topic, count in drained.items()])
+        metric("producer_spill_dropped_total", "counter", "Messages dropped because the disk spill was full.",
+               [({"topic": topic}, count) for topic, count in dropped.items()])
+        metric("producer_spill_backlog_messages", "gauge", "Messages waiting in the disk spill.", [({}, self.spill_backlog[0])])
+        metric("producer_spill_backlog_bytes", "gauge", "Bytes waiting in the disk spill.", [({}, self.spill_backlog[1])])
+        metric("producer_transactions_total", "counter", "Transactions ended, by outcome.",
+               [({"outcome": "committed" if committed else "aborted"}, counters[0]) for committed, counters in self.transactions.items()])
+        metric("producer_transaction_messages_total", "counter", "Messages in ended transactions, by outcome.",
+               [({"outcome": "committed" if committed else "aborted"}, counters[1]) for committed, counters in self.transactions.items()])
+        lines.append("# HELP producer_transaction_duration_seconds Time from the start of a transaction to its commit.")
+        lines.append("# TYPE producer_transaction_duration_seconds histogram")
+        for bound, seen in self.commit_latency.cumulative():
+            le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+            lines.append(f'producer_transaction_duration_seconds_bucket{{le="{le}"}} {seen}')
+        lines.append(f"producer_transaction_duration_seconds_count {self.commit_latency.count}")
+        lines.append(f"producer_transaction_duration_seconds_sum {self.commit_latency.sum_ms / 1000}")
+        metric("producer_backpressure_waits_total", "counter", "Times publishing waited for room in the queue.", [({}, self.backpressure_waits)])
+        metric("producer_backpressure_wait_seconds_total", "counter", "Time publishing spent waiting for room in the queue.",
+               [({}, self.backpressure_wait_sec)])
+
+        lines.append("# HELP producer_delivery_latency_seconds Time from produce() to the delivery report.")
+        lines.append("# TYPE producer_delivery_latency_seconds histogram")
+        for topic, (buckets, count, sum_ms) in histograms.items():
+            for bound, seen in buckets:
+                le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+                lines.append(f'producer_delivery_latency_seconds_bucket{{topic="{_escape(topic)}",le="{le}"}} {seen}')
+            lines.append(f'producer_delivery_latency_seconds_count{{topic="{_escape(topic)}"}} {count}')
+            lines.append(f'producer_delivery_latency_seconds_sum{{topic="{_escape(topic)}"}} {sum_ms / 1000}')
+
+        gauges = {
+            "queue_messages": "Messages in librdkafka's queue, not yet delivered.",
+            "queue_bytes": "Bytes in librdkafka's queue.",
+            "queue_max_messages": "Configured maximum of queued messages.",
+            "broker_outbuf_messages": "Messages waiting to be sent to a broker.",
+            "broker_waitresp_messages": "Messages sent and awaiting the broker's response.",
+            "partition_queue_messages": "Messages in partition queues.",
+            "tx_errors": "Broker transmission errors (librdkafka counter).",
+            "tx_retries": "Broker request retries (librdkafka counter).",
+            "request_timeouts": "Timed out broker requests (librdkafka counter).",
+            "queue_latency_us": "Average time messages spend in librdkafka's queue, in microseconds.",
+            "broker_rtt_us": "Average broker round trip time, in microseconds.",
+            "batch_size_bytes": "Average size of the batches sent, in bytes.",
+            "batch_messages": "Average number of messages per batch sent.",
+        }
+        for key, help_text in gauges.items():
+            if key in stats:
+                metric(f"producer_{key}", "gauge", help_text, [({}, stats[key])])
+
+        metric("producer_uptime_seconds", "gauge", "Seconds since the producer started.", [({}, time.monotonic() - self.started)])
+        return "\n".join(lines) + "\n"
+
+
+def _mean(values):
+    values = list(values)
+    return sum(values) / len(values) if values else 0
+
+
+def _escape(label):
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_metrics_server(metrics, port, host="0.0.0.0"):
+    """
+    Serve ``metrics`` in the Prometheus text format at http://<host>:<port>/metrics from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would drown the simulation output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Serving producer metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
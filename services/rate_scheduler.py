@@ -0,0 +1,238 @@
+import math
+import random
+import time
+
+from utilities.clock import SimulationClock
+
+
+def calculate_current_rate(start_rate, target_rate, transition_duration, elapsed_time):
+    """
+    Calculates the current rate on an exponential curve from start_rate to target_rate, for both acceleration and deceleration.
+
+    The curve is steepest at the start and flattens towards the target, with a decay constant set by the ratio
+    of the two rates; it is normalised so that it reaches target_rate exactly at transition_duration. A ramp
+    from or to a rate of 0 has no ratio and is linear instead.
+
+    Parameters:
+    - start_rate: The initial rate.
+    - target_rate: The target rate.
+    - transition_duration: The duration over which the transition takes place in seconds.
+    - elapsed_time: The elapsed time from the start of the transition in seconds.
+
+    Returns:
+    - The current rate, in the same unit as start_rate and target_rate.
+    """
+    if transition_duration <= 0 or start_rate == target_rate or elapsed_time >= transition_duration:
+        return target_rate
+    progress = max(elapsed_time, 0.0) / transition_duration
+
+    # Decay constant over the whole transition: always positive, so the gap to the target shrinks in both directions
+    decay = abs(math.log(start_rate / target_rate)) if start_rate > 0 and target_rate > 0 else 0.0
+    if decay > 1e-9:
+        # Fraction of the way to the target, scaled so that it is exactly 1 at the end of the transition
+        progress = -math.expm1(-decay * progress) / -math.expm1(-decay)
+    return start_rate + (target_rate - start_rate) * progress
+
+
+def generate_change_intervals(total_duration_sec, initial_stable_period_sec=10, change_window_size=10, max_changes_cap=5, rng=random):
+    """
+    Pick the windows in which the rate changes, each as a {"accelerate" | "decelerate": window_index} dict.
+
+    After the initial stable period the run is divided into ``change_window_size`` windows; between one and
+    ``max_changes_cap`` of them get a change.
+    """
+    # Calculate the maximum number of windows available for changes after the initial stable period
+    max_changes = (total_duration_sec - initial_stable_period_sec) // change_window_size
+    if max_changes <= 0:
+        return []
+
+    num_changes = rng.randint(1, max(1, min(max_changes, max_changes_cap)))
+    intervals = rng.sample(range(2, max_changes + 2), num_changes)
+    change_intervals = [{rng.choice(['accelerate', 'decelerate']): interval - 1} for interval in intervals]
+    return sorted(change_intervals, key=lambda x: list(x.values())[0])
+
+
+class RateProfile:
+    """
+    Target events/s over time, as a sequence of segments.
+
+    Segments are ``("hold", rate, duration)``, ``("ramp", start_rate, target_rate, duration)`` (exponential,
+    or linear from or to 0, see calculate_current_rate) and ``("burst", rate, duration)``. A burst is a hold that is expected to be
+    short; it is kept separate so reports can name it.
+    """
+
+    def __init__(self, segments):
+        self.segments = []
+        start = 0.0
+        for segment in segments:
+            kind = segment[0]
+            if kind not in ("hold", "ramp", "burst"):
+                raise ValueError(f"Unknown rate segment '{kind}'")
+            duration = float(segment[-1])
+            self.segments.append((start, start + duration, segment))
+            start += duration
+        self.duration = start
+
+    @classmethod
+    def constant(cls, rate, duration):
+        return cls([("hold", rate, duration)])
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Parse a comma-separated profile such as ``ramp:1000:50000:30,hold:50000:300,burst:100000:10``.
+        """
+        segments = []
+        for part in spec.split(","):
+            kind, *values = part.strip().split(":")
+            segments.append((kind, *(float(value) for value in values)))
+        return cls(segments)
+
+    @classmethod
+    def random_changes(cls, base_rate, total_duration_sec, min_rate, max_rate, initial_stable_period_sec=10,
+                       change_window_size=10, transition_duration=2, rng=random):
+        """
+        Ramp up to ``base_rate``, then change rate at random windows (see generate_change_intervals).
+
+        Accelerations go up to somewhere in (base_rate, max_rate], decelerations down to [min_rate, base_rate);
+        every change ramps back to ``base_rate`` within its window.
+        """
+        segments = [("ramp", max(min_rate, 1), base_rate, transition_duration),
+                    ("hold", base_rate, initial_stable_period_sec - transition_duration)]
+        elapsed = initial_stable_period_sec
+        for event in generate_change_intervals(total_duration_sec, initial_stable_period_sec, change_window_size, rng=rng):
+            for change_type, window in event.items():
+                window_start = initial_stable_period_sec + (window - 1) * change_window_size
+                change_start = window_start + rng.uniform(0, change_window_size - 2 * transition_duration)
+                target = rng.uniform(base_rate, max_rate) if change_type == 'accelerate' else rng.uniform(min_rate, base_rate)
+
+                segments.append(("hold", base_rate, change_start - elapsed))
+                segments.append(("ramp", base_rate, target, transition_duration))
+                segments.append(("ramp", target, base_rate, transition_duration))
+                elapsed = change_start + 2 * transition_duration
+        segments.append(("hold", base_rate, max(total_duration_sec - elapsed, 0)))
+        return cls(segments)
+
+    def scaled(self, factor):
+        """
+        The same shape with every rate multiplied by ``factor`` (e.g. one worker's share of the total).
+        """
+        segments = []
+        for _, _, segment in self.segments:
+            if segment[0] == "ramp":
+                segments.append(("ramp", segment[1] * factor, segment[2] * factor, segment[3]))
+            else:
+                segments.append((segment[0], segment[1] * factor, segment[2]))
+        return RateProfile(segments)
+
+    def rate_at(self, t):
+        """
+        Target events/s at ``t`` seconds into the profile (0 once it is over).
+        """
+        for start, end, segment in self.segments:
+            if start <= t < end:
+                if segment[0] == "ramp":
+                    _, start_rate, target_rate, duration = segment
+                    return calculate_current_rate(start_rate, target_rate, duration, t - start)
+                return segment[1]
+        return 0.0
+
+    def segment_at(self, t):
+        for start, end, segment in self.segments:
+            if start <= t < end:
+                return segment[0]
+        return None
+
+
+class RateScheduler:
+    """
+    Deadline-based scheduler holding a RateProfile.
+
+    Iterating yields ``(elapsed_sec, due)`` every ``interval`` seconds of clock time, where ``due`` is the number
+    of events to emit now. Rather than sleeping a per-event delay (which drifts by the time spent emitting),
+    the scheduler integrates the target rate up to the current time and hands out the difference to what
+    was already emitted, and it waits for absolute deadlines on the clock. Falling behind is therefore caught
+    up in the next batches instead of silently lowering the rate.
+
+    With a virtual SimulationClock the profile is followed in simulated time as fast as possible.
+
+    ``due`` is what the schedule asks for; the caller reports what it actually emitted with ``record_produced``
+    (e.g. fewer once vehicles have arrived), and the achieved rates in the reports are based on that.
+    """
+
+    def __init__(self, profile, clock=None, interval=0.01, report_interval_sec=10):
+        self.profile = profile
+        self.clock = clock or SimulationClock()
+        self.interval = interval
+        self.report_interval_sec = report_interval_sec
+        self.target_total = 0.0
+        self.emitted = 0
+        self.produced = 0
+        self.elapsed_sec = 0.0
+        self.wall_start = None
+
+    def record_produced(self, count):
+        """
+        Count ``count`` events actually emitted for the batches handed out so far.
+        """
+        self.produced += count
+
+    def __iter__(self):
+        start = self.clock.elapsed_sec
+        self.wall_start = time.monotonic()
+        previous_t = 0.0
+        previous_rate = self.profile.rate_at(0.0)
+        next_report = self.report_interval_sec
+        report_produced = 0
+        report_target = 0.0
+
+        while previous_t < self.profile.duration:
+            self.clock.sleep(min(self.interval, self.profile.duration - previous_t))
+            t = self.clock.elapsed_sec - start
+            rate = self.profile.rate_at(t)
+
+            # Trapezoidal integration of the target rate since the last wake-up
+            self.target_total += (previous_rate + rate) / 2 * (t - previous_t)
+            previous_t, previous_rate = t, rate
+            self.elapsed_sec = t
+
+            due = int(self.target_total) - self.emitted
+            self.emitted += due
+            yield t, due
+
+            if t >= next_report:
+                window = t - (next_report - self.report_interval_sec)
+                print(self.report((self.produced - report_produced) / window, (self.target_total - report_target) / window))
+                report_produced, report_target = self.produced, self.target_total
+                next_report += self.report_interval_sec
+
+        print(self.report())
+
+    def achieved_rate(self):
+        """
+        Produced events per simulated second so far, comparable to ``target_rate``.
+        """
+        return self.produced / max(self.elapsed_sec, 1e-9)
+
+    def target_rate(self):
+        """
+        Scheduled events per simulated second so far, the profile's average.
+        """
+        return self.target_total / max(self.elapsed_sec, 1e-9)
+
+    def report(self, window_rate=None, window_target=None):
+        """
+        Progress line: events produced so far and the achieved rate against the target, overall and, with
+        ``window_rate``, over the last report window. Both are per simulated second; the wall-clock
+        throughput is reported separately, since scaled and virtual clocks run faster than the wall.
+        """
+        elapsed_sec = self.elapsed_sec
+        wall_sec = time.monotonic() - self.wall_start if self.wall_start is not None else 0.0
+        line = (f"Rate scheduler: {self.produced} of {self.emitted} scheduled events in {elapsed_sec:.1f}s simulated, "
+                f"achieved {self.achieved_rate():.0f} ev/s vs. target {self.target_rate():.0f} ev/s (simulated time); "
+                f"{wall_sec:.1f}s wall, {self.produced / max(wall_sec, 1e-9):.0f} ev/s wall-clock throughput")
+        if window_rate is not None:
+            line += f"; last window {window_rate:.0f} ev/s vs. {window_target:.0f} ev/s target ({self.profile.segment_at(elapsed_sec)})"
+        if self.clock.lag() > 1:
+            line += f", {self.clock.lag():.1f}s behind schedule"
+        return line
@@ -0,0 +1,121 @@
+import os
+import time
+
+import simplejson as json
+
+from services.event_log import merged_records
+from config.settings import GPS_BATCH_TOPIC
+from services.serializers import BinarySerializer, GpsBatchSerializer, JsonSerializer, TOPIC_SCHEMAS
+
+
+class RatePacer:
+    """
+    Deadline-based pacing to ``rate`` records/s: record ``n`` is due ``n / rate`` seconds after the start.
+
+    The clock is only checked every ``check_every`` records so high rates don't pay a syscall per record.
+    """
+
+    def __init__(self, rate, check_every=1000):
+        self.rate = rate
+        self.check_every = check_every
+        self.count = 0
+        self.started = time.monotonic()
+
+    def tick(self):
+        self.count += 1
+        if not self.rate or self.count % self.check_every:
+            return
+        delay = self.started + self.count / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def replay_to_producer(log_dir, topics, producer, rate=0, start_timestamp_ms=None, tick_records=10000):
+    """
+    Re-publish the logged records of ``topics`` to Kafka, byte-for-byte, in timestamp order.
+
+    Records keep their logged timestamps as Kafka timestamps. The log doesn't mark tick boundaries, so every
+    ``tick_records`` records count as one tick for the producer: a transactional producer commits every
+    ``transaction_ticks`` of them instead of holding the whole replay in one transaction.
+
+    Args:
+        log_dir (str): Directory written by EventLogWriter.
+        topics (list): Topics to replay.
+        producer (KafkaProducer): Producer to publish with.
+        rate (float): Records per second; 0 replays as fast as possible.
+        start_timestamp_ms (int, optional): Skip records before this event time.
+        tick_records (int): Records per producer tick.
+
+    Returns:
+        int: Number of records replayed.
+    """
+    pacer = RatePacer(rate)
+    for topic, _, timestamp_ms, key, value in merged_records(log_dir, topics, start_timestamp_ms):
+        producer.publish_raw(topic, key, value, timestamp_ms)
+        pacer.tick()
+        if pacer.count % tick_records == 0:
+            producer.end_tick()
+    producer.end_tick()
+    producer.checkpoint()
+    return pacer.count
+
+
+def replay_to_files(log_dir, topics, output_dir, records_per_file=100000, rate=0, start_timestamp_ms=None):
+    """
+    Stream the logged records into per-topic JSON-lines files, the file-source stand-in the processing job reads.
+
+    Files are written under a temporary name and renamed once complete, so a streaming file source never
+    sees a partial file. Binary payloads are decoded and re-encoded as JSON; JSON payloads are copied as is.
+    Every topic gets its directory up front, so the job can watch topics that have no records (yet).
+
+    Returns:
+        int: Number of records replayed.
+    """
+    decoders = {topic: BinarySerializer(TOPIC_SCHEMAS[topic]) for topic in topics if topic in TOPIC_SCHEMAS}
+    if GPS_BATCH_TOPIC in topics:
+        decoders[GPS_BATCH_TOPIC] = GpsBatchSerializer()
+    json_serializer = JsonSerializer()
+    writers = {topic: _RollingFileWriter(os.path.join(output_dir, topic), records_per_file) for topic in topics}
+    pacer = RatePacer(rate)
+
+    try:
+        for topic, _, _, _, value in merged_records(log_dir, topics, start_timestamp_ms):
+            if value[:1] != b"{":
+                value = json_serializer.serialize(decoders[topic].deserialize(value))
+
+            writers[topic].write(value)
+            pacer.tick()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return pacer.count
+
+
+class _RollingFileWriter:
+    def __init__(self, directory, records_per_file):
+        self.directory = directory
+        self.records_per_file = records_per_file
+        self.part = len([name for name in os.listdir(directory) if name.endswith(".json")]) if os.path.isdir(directory) else 0
+        self.file = None
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, value):
+        if self.file is None:
+            self.path = os.path.join(self.directory, f"part-{self.part:05d}.json")
+            self.file = open(os.path.join(self.directory, f".part-{self.part:05d}.json.tmp"), "wb")
+        self.file.write(value)
+        self.file.write(b"\n")
+        self.count += 1
+        if self.count >= self.records_per_file:
+            self.close()
+
+    def close(self):
+        if self.file is None:
+            return
+        temporary_path = self.file.name
+        self.file.close()
+        os.replace(temporary_path, self.path)
+        self.file = None
+        self.count = 0
+        self.part += 1
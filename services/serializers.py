@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+import struct
+import uuid
+
+import simplejson as json
+
+from config.settings import VEHICLE_TOPIC, PROFILE_TOPIC, GPS_TOPIC, GPS_BATCH_TOPIC, TRAFFIC_TOPIC, WEATHER_TOPIC, EMERGENCY_TOPIC, TOPIC_WIRE_FORMATS
+from jobs.gps_codec import decode_gps_batch, encode_gps_batch
+from models.vehicle import VEHICLE_SCHEMA, VEHICLE_PROFILE_SCHEMA, GPS_SCHEMA, TRAFFIC_CAMERA_SCHEMA, WEATHER_SCHEMA, EMERGENCY_INCIDENT_SCHEMA
+
+TOPIC_SCHEMAS = {
+    VEHICLE_TOPIC: VEHICLE_SCHEMA,
+    PROFILE_TOPIC: VEHICLE_PROFILE_SCHEMA,
+    GPS_TOPIC: GPS_SCHEMA,
+    TRAFFIC_TOPIC: TRAFFIC_CAMERA_SCHEMA,
+    WEATHER_TOPIC: WEATHER_SCHEMA,
+    EMERGENCY_TOPIC: EMERGENCY_INCIDENT_SCHEMA,
+}
+
+# Timestamps on the records are naive ISO-8601 strings; on the wire they are microseconds from this epoch
+EPOCH = datetime(1970, 1, 1)
+
+# struct codes of the fixed-size wire types
+FIXED_TYPES = {
+    "uuid": "16s",
+    "enum": "B",
+    "timestamp": "q",
+    "location": "dd",
+    "i16": "h",
+    "i32": "i",
+    "i64": "q",
+    "f32": "f",
+    "f64": "d",
+}
+
+
+class JsonSerializer:
+    """
+    The original wire format: the record as a UTF-8 JSON object, UUIDs as strings.
+
+    Dicts and compact ``Record`` objects (through their ``for_json``) encode the same way.
+    """
+
+    name = "json"
+
+    def __init__(self, key_field="id"):
+        self.key_field = key_field
+
+    def key(self, data):
+        # Convert the key (a UUID or a string) to a string and encode it to bytes
+        return str(data[self.key_field]).encode('utf-8')
+
+    def serialize(self, data):
+        return json.dumps(data, default=self.json_serializer, for_json=True).encode('utf-8')
+
+    def deserialize(self, payload):
+        return json.loads(payload)
+
+    def json_serializer(self, data):
+        if isinstance(data, uuid.UUID):
+            return str(data)
+        raise TypeError(f"Object of Type {data.__class__.__name__} is not serializable")
+
+
+class BinarySerializer:
+    """
+    Compact, schema-driven encoding of one record type.
+
+    Layout: a two byte header (schema id, schema version), then every fixed-size field packed in
+    schema order with little-endian ``struct`` codes, where each string field contributes its byte
+    length as a uint16. The string payloads follow back to back in the same order. No key names are
+    sent, UUIDs take 16 bytes and enum fields a single byte.
+    """
+
+    name = "binary"
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.header = struct.pack("<BB", schema.schema_id, schema.version)
+
+        codes = []
+        for _, field_type, _ in schema.fields:
+            codes.append("H" if field_type == "str" else FIXED_TYPES[field_type])
+        self.struct = struct.Struct("<" + "".join(codes))
+
+        self.enum_indexes = {name: {choice: index for index, choice in enumerate(choices)}
+                             for name, field_type, choices in schema.fields if field_type == "enum"}
+
+    def key(self, data):
+        value = data[self.schema.key]
+        return value.bytes if isinstance(value, uuid.UUID) else value.encode('utf-8')
+
+    def serialize(self, data):
+        values = []
+        strings = []
+        for name, field_type, _ in self.schema.fields:
+            value = data[name]
+            if field_type == "str":
+                encoded = value.encode('utf-8')
+                strings.append(encoded)
+                values.append(len(encoded))
+            elif field_type == "uuid":
+                values.append(value.bytes)
+            elif field_type == "location":
+                values.append(value['latitude'])
+                values.append(value['longitude'])
+            elif field_type == "timestamp":
+                delta = datetime.fromisoformat(value) - EPOCH
+                values.append((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+            elif field_type == "enum":
+                values.append(self.enum_indexes[name][value])
+            else:
+                values.append(value)
+        return b"".join([self.header, self.struct.pack(*values), *strings])
+
+    def deserialize(self, payload):
+        schema_id, version = payload[0], payload[1]
+        if schema_id != self.schema.schema_id or version != self.schema.version:
+            raise ValueError(f"Payload has schema {schema_id} v{version}, expected {self.schema!r}")
+
+        values = iter(self.struct.unpack_from(payload, 2))
+        offset = 2 + self.struct.size
+        record = {}
+        for name, field_type, choices in self.schema.fields:
+            value = next(values)
+            if field_type == "str":
+                record[name] = bytes(payload[offset:offset + value]).decode('utf-8')
+                offset += value
+            elif field_type == "uuid":
+                record[name] = uuid.UUID(bytes=value)
+            elif field_type == "location":
+                record[name] = {'latitude': value, 'longitude': next(values)}
+            elif field_type == "timestamp":
+                record[name] = (EPOCH + timedelta(microseconds=value)).isoformat()
+            elif field_type == "enum":
+                record[name] = choices[value]
+            else:
+                record[name] = value
+        return record
+
+
+class GpsBatchSerializer:
+    """
+    Delta-encoded GPS micro-batches (jobs/gps_codec.py), keyed by vehicle_id so a vehicle's batches stay in order.
+
+    The record is ``{"id", "vehicle_id", "vehicle_type", "timestamp", "samples"}`` (``id`` optional) with samples as
+    ``(timestamp_sec, latitude, longitude, speed_kmh, direction_index)`` tuples; ``deserialize`` returns
+    the decoded form with one dict per sample.
+    """
+
+    name = "gps-batch"
+
+    def key(self, data):
+        return data['vehicle_id'].encode('utf-8')
+
+    def serialize(self, data):
+        return encode_gps_batch(data['vehicle_id'], data['vehicle_type'], data['samples'], data.get('id'))
+
+    def deserialize(self, payload):
+        return decode_gps_batch(payload)
+
+
+def get_serializer(topic, wire_format=None):
+    """
+    Build the serializer for a topic.
+
+    Args:
+        topic (str): Topic name.
+        wire_format (str, optional): "json" or "binary"; defaults to the topic's entry in TOPIC_WIRE_FORMATS.
+
+    Returns:
+        JsonSerializer | BinarySerializer | GpsBatchSerializer
+    """
+    if topic == GPS_BATCH_TOPIC:
+        # The batch topic only exists for its compact encoding
+        return GpsBatchSerializer()
+    wire_format = wire_format or TOPIC_WIRE_FORMATS.get(topic, "json")
+    if wire_format == "json":
+        return JsonSerializer(TOPIC_SCHEMAS[topic].key if topic in TOPIC_SCHEMAS else "id")
+    if wire_format == "binary":
+        if topic not in TOPIC_SCHEMAS:
+            raise ValueError(f"No binary schema is defined for topic '{topic}'")
+        return BinarySerializer(TOPIC_SCHEMAS[topic])
+    raise ValueError(f"Unknown wire format '{wire_format}' for topic '{topic}'")
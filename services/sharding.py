@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from config.settings import SPILL_DIR, ID_GENERATOR, ID_WORKER_ID
+from services.data_generator import simulate_fleet, simulate_fleet_at_rate
+from services.event_log import EventLogWriter
+from services.kafka_producer import NullProducer, get_producer
+from services.producer_metrics import start_metrics_server
+from utilities.ids import create_id_generator
+from utilities.clock import create_clock
+
+
+def shard_ranges(fleet_size, workers):
+    """
+    Split vehicle indices 0..fleet_size-1 into ``workers`` contiguous (first_index, size) shards.
+    """
+    bounds = np.linspace(0, fleet_size, workers + 1).astype(np.int64)
+    return [(int(start), int(end - start)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _report_stats(worker_index, producer, stats_queue, stop, interval_sec):
+    while not stop.wait(interval_sec):
+        stats_queue.put(_stats_message(worker_index, producer, done=False))
+
+
+def _stats_message(worker_index, producer, done):
+    stats = producer.stats
+    return (worker_index, stats.produced, stats.produced_bytes, stats.delivered, stats.failed, done)
+
+
+def _run_worker(worker_index, first_index, size, seed, options, stats_queue):
+    """
+    Entry point of one worker process: simulate its shard of the fleet with its own producer, on the run's seed.
+    """
+    clock = create_clock(options["clock"], options["speedup"])
+    if options["sink"] == "log":
+        producer = EventLogWriter(os.path.join(options["log_dir"], f"worker-{worker_index}"))
+    elif options["sink"] == "null":
+        producer = NullProducer()
+    else:
+        # Every worker needs its own spill and transactional.id: they would fence each other off otherwise
+        transactional_id = f"{options['transactional_id']}-worker-{worker_index}" if options["transactional_id"] else None
+        producer = get_producer(spill_dir=os.path.join(SPILL_DIR, f"worker-{worker_index}") if SPILL_DIR else None,
+                                transactional_id=transactional_id, transaction_ticks=options["transaction_ticks"])
+        if options["metrics_port"]:
+            start_metrics_server(producer.metrics, options["metrics_port"] + worker_index)
+
+    # Time-ordered record IDs stay unique across workers through their worker bits
+    id_generator = create_id_generator(ID_GENERATOR, ID_WORKER_ID + worker_index)
+
+    stop = threading.Event()
+    reporter = threading.Thread(target=_report_stats, args=(worker_index, producer, stats_queue, stop, options["report_interval_sec"]), daemon=True)
+    reporter.start()
+    try:
+        if options["profile"] is not None:
+            simulate_fleet_at_rate(size, options["profile"].scaled(size / options["fleet_size"]), seed=seed, clock=clock,
+                                   producer=producer, first_index=first_index, route=options["route"], cameras=options["cameras"],
+                                   id_generator=id_generator)
+        else:
+            simulate_fleet(size, seed=seed, clock=clock, duration_sec=options["duration_sec"], producer=producer,
+                           first_index=first_index, route=options["route"], cameras=options["cameras"], id_generator=id_generator)
+    except KeyboardInterrupt:
+        pass  # The coordinator handles Ctrl-C; just flush below
+    finally:
+        stop.set()
+        producer.close()
+        stats_queue.put(_stats_message(worker_index, producer, done=True))
+
+
+def run_sharded(fleet_size, workers, seed=None, clock="realtime", speedup=1.0, duration_sec=None, profile=None,
+                sink="kafka", log_dir=None, report_interval_sec=10, route=None, cameras=None, metrics_port=0,
+                transactional_id=None, transaction_ticks=1):
+    """
+    Run a fleet simulation sharded across ``workers`` processes and aggregate their throughput.
+
+    Each worker simulates a contiguous range of vehicle indices with its own producer (or its own event log
+    directory). Every worker gets the run seed: vehicles draw from their own streams of it, keyed by their
+    global index (utilities.random_streams), so a vehicle's data does not depend on ``workers``. With a rate
+    profile every worker follows its share of the total rate. Ctrl-C stops every worker, lets each one flush
+    its producer and prints the final totals.
+
+    Args:
+        fleet_size (int): Total number of vehicles.
+        workers (int): Number of worker processes.
+        seed (int, optional): Run seed; a fresh one is drawn (and printed) when unset.
+        clock (str): "realtime" or "virtual", see utilities.clock.create_clock.
+        speedup (float): Simulated seconds per wall second with a realtime clock.
+        duration_sec (float, optional): Stop after this many simulated seconds (fixed-tick mode).
+        profile (RateProfile, optional): Total target vehicle ticks per second; switches to rate mode.
+        sink (str): "kafka", "log" or "null".
+        log_dir (str, optional): Event log root with sink "log"; each worker writes to worker-<n>/ below it.
+        report_interval_sec (float): Seconds between aggregated reports.
+        route (Route, optional): Road route shared by every worker's fleet; defaults to a straight line.
+        cameras (CameraRegistry, optional): Camera registry shared by every worker.
+        metrics_port (int): With sink "kafka", worker n serves Prometheus metrics on metrics_port + n; 0 disables.
+        transactional_id (str, optional): With sink "kafka", worker n publishes ticks in transactions under
+            "<transactional_id>-worker-<n>".
+        transaction_ticks (int): Ticks committed together in one transaction.
+
+    Returns:
+        dict: Final totals (produced, produced_bytes, delivered, failed, elapsed_sec).
+    """
+    shards = shard_ranges(fleet_size, workers)
+    run_seed = np.random.SeedSequence(seed).entropy
+    options = {
+        "clock": clock,
+        "speedup": speedup,
+        "duration_sec": duration_sec,
+        "profile": profile,
+        "sink": sink,
+        "log_dir": log_dir,
+        "fleet_size": fleet_size,
+        "report_interval_sec": report_interval_sec,
+        "route": route,
+        "cameras": cameras,
+        "metrics_port": metrics_port,
+        "transactional_id": transactional_id,
+        "transaction_ticks": transaction_ticks,
+    }
+
+    # Spawn rather than fork: librdkafka's background threads don't survive a fork
+    context = multiprocessing.get_context("spawn")
+    stats_queue = context.Queue()
+    processes = [context.Process(target=_run_worker, args=(index, first_index, size, run_seed, options, stats_queue),
+                                 name=f"generator-{index}")
+                 for index, (first_index, size) in enumerate(shards)]
+
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+    print(f"Started {len(processes)} workers for {fleet_size} vehicles (run seed {run_seed})")
+
+    latest = {}
+    done = set()
+    try:
+        while len(done) < len(processes):
+            _collect(stats_queue, latest, done, report_interval_sec)
+            if not any(process.is_alive() for process in processes):
+                _collect(stats_queue, latest, done, 0.1)  # Final messages still in flight
+                break
+            print(_summary(latest, time.monotonic() - started, len(processes) - len(done)))
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        # The workers got the same SIGINT; give them time to flush their producers
+        deadline = time.monotonic() + 60
+        while len(done) < len(processes) and time.monotonic() < deadline and any(process.is_alive() for process in processes):
+            try:
+                _collect(stats_queue, latest, done, 1)
+            except KeyboardInterrupt:
+                break
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    elapsed = time.monotonic() - started
+    print(_summary(latest, elapsed, 0).replace("Aggregate", "Final aggregate"))
+    totals = _totals(latest)
+    totals["elapsed_sec"] = elapsed
+    return totals
+
+
+def _collect(stats_queue, latest, done, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            message = stats_queue.get(timeout=max(remaining, 0.01)) if remaining > 0 else stats_queue.get_nowait()
+        except queue.Empty:
+            return
+        worker_index, *counters, finished = message
+        latest[worker_index] = counters
+        if finished:
+            done.add(worker_index)
+
+
+def _totals(latest):
+    produced, produced_bytes, delivered, failed = (sum(values) for values in zip(*latest.values())) if latest else (0, 0, 0, 0)
+    return {"produced": produced, "produced_bytes": produced_bytes, "delivered": delivered, "failed": failed}
+
+
+def _summary(latest, elapsed, running):
+    totals = _totals(latest)
+    elapsed = max(elapsed, 1e-9)
+    return (f"Aggregate throughput: {totals['produced']} produced ({totals['produced'] / elapsed:.0f} msgs/s, "
+            f"{totals['produced_bytes'] / elapsed / 1e6:.2f} MB/s), {totals['delivered']} delivered, "
+            f"{totals['failed']} failed over {elapsed:.1f}s, {running} workers running")
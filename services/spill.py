@@ -0,0 +1,163 @@
+import os
+import time
+
+from config.settings import SPILL_SEGMENT_BYTES, SPILL_MAX_BYTES
+from services.event_log import EventLogWriter, EventLogReader, FRAME_HEADER, INDEX_SUFFIX, LOG_SUFFIX, list_segments, segment_name
+
+DRAINED_FILE = "drained.offset"
+
+
+class SpillQueue:
+    """
+    Local, append-only overflow of records the producer could not hand to librdkafka.
+
+    Records are written per topic in the event log's segment format (services/event_log.py) with the time
+    they were spilled, and read back oldest first by ``drain``. The offset of the next record to drain is
+    kept in a small file next to the segments, so a spill left behind by a run that could not reach the
+    broker is drained by the next one. Segments are deleted once fully drained; a topic's directory is
+    emptied as soon as it has nothing pending, so the next spill starts a fresh log.
+
+    Once ``max_bytes`` are pending, further records are dropped and counted instead of filling the disk.
+    """
+
+    def __init__(self, directory, segment_bytes=SPILL_SEGMENT_BYTES, max_bytes=SPILL_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.writer = EventLogWriter(directory, segment_bytes)
+        self.read_offsets = {}  # Topic name -> offset of the next record to drain
+        self.pending = {}  # Topic name -> [records, bytes] spilled but not drained yet
+        self.dropped = 0
+        self._recover()
+
+    def _recover(self):
+        for topic in sorted(os.listdir(self.directory)):
+            topic_directory = os.path.join(self.directory, topic)
+            if not os.path.isdir(topic_directory):
+                continue
+            read_offset = self._load_offset(topic)
+            records = size = 0
+            for _, _, key, value in EventLogReader(self.directory, topic).records(read_offset):
+                records += 1
+                size += FRAME_HEADER.size + len(key) + len(value)
+            if records:
+                self.read_offsets[topic] = read_offset
+                self.pending[topic] = [records, size]
+                print(f"Found {records} spilled {topic} records ({size / 1e6:.1f} MB) left to drain in {topic_directory}")
+            else:
+                self._reset(topic)
+
+    @property
+    def pending_messages(self):
+        return sum(counters[0] for counters in self.pending.values())
+
+    @property
+    def pending_bytes(self):
+        return sum(counters[1] for counters in self.pending.values())
+
+    def append(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        """
+        Spill one serialized record, keeping ``timestamp_ms`` (default: now) as its Kafka timestamp.
+
+        Returns:
+            bool: False if the spill is full and the record was dropped.
+        """
+        size = FRAME_HEADER.size + len(key_bytes) + len(value_bytes)
+        if self.pending_bytes + size > self.max_bytes:
+            self.dropped += 1
+            return False
+        self.writer.append(topic, key_bytes, value_bytes, timestamp_ms or int(time.time() * 1000))
+        counters = self.pending.get(topic)
+        if counters is None:
+            counters = self.pending[topic] = [0, 0]
+            self.read_offsets.setdefault(topic, self._load_offset(topic))
+        counters[0] += 1
+        counters[1] += size
+        return True
+
+    def drain(self, produce, max_messages):
+        """
+        Hand up to ``max_messages`` of the oldest spilled records to ``produce(topic, key, value, timestamp_ms)``.
+
+        ``produce`` may raise BufferError to stop the drain; the record it refused stays spilled.
+
+        Returns:
+            int: Records handed over.
+        """
+        drained = 0
+        for topic in sorted(self.pending):
+            if drained >= max_messages:
+                break
+            segment = self.writer.segments.get(topic)
+            if segment is not None:
+                segment.flush()  # The reader maps the files; buffered appends must reach them first
+
+            read_offset = self.read_offsets[topic]
+            counters = self.pending[topic]
+            records = EventLogReader(self.directory, topic).records(read_offset)
+            try:
+                for offset, timestamp_ms, key, value in records:
+                    try:
+                        produce(topic, bytes(key), bytes(value), timestamp_ms)
+                    except BufferError:
+                        max_messages = drained  # Stop draining every topic
+                        break
+                    read_offset = offset + 1
+                    counters[0] -= 1
+                    counters[1] -= FRAME_HEADER.size + len(key) + len(value)
+                    drained += 1
+                    if drained >= max_messages:
+                        break
+            finally:
+                records.close()
+
+            self.read_offsets[topic] = read_offset
+            if counters[0] <= 0:
+                self._reset(topic)
+            else:
+                self._save_offset(topic, read_offset)
+                self._delete_drained_segments(topic, read_offset)
+        return drained
+
+    def close(self):
+        for topic, segment in self.writer.segments.items():
+            segment.close()
+            if topic in self.pending:
+                self._save_offset(topic, self.read_offsets[topic])
+        self.writer.segments = {}
+
+    def _topic_path(self, topic, name):
+        return os.path.join(self.directory, topic, name)
+
+    def _load_offset(self, topic):
+        try:
+            with open(self._topic_path(topic, DRAINED_FILE)) as offset_file:
+                return int(offset_file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _save_offset(self, topic, offset):
+        # Write and rename, so a crash leaves either the old or the new offset
+        path = self._topic_path(topic, DRAINED_FILE)
+        with open(path + ".tmp", "w") as offset_file:
+            offset_file.write(str(offset))
+        os.replace(path + ".tmp", path)
+
+    def _delete_drained_segments(self, topic, read_offset):
+        base_offsets = list_segments(os.path.join(self.directory, topic))
+        active = self.writer.segments.get(topic)
+        for base_offset, next_base in zip(base_offsets, base_offsets[1:]):
+            # A segment is fully drained once the next one starts at or before the read offset
+            if next_base > read_offset or (active is not None and active.base_offset == base_offset):
+                break
+            for suffix in (LOG_SUFFIX, INDEX_SUFFIX):
+                os.remove(self._topic_path(topic, segment_name(base_offset) + suffix))
+
+    def _reset(self, topic):
+        segment = self.writer.segments.pop(topic, None)
+        if segment is not None:
+            segment.close()
+        topic_directory = os.path.join(self.directory, topic)
+        for name in os.listdir(topic_directory):
+            os.remove(os.path.join(topic_directory, name))
+        self.pending.pop(topic, None)
+        self.read_offsets.pop(topic, None)
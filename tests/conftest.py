@@ -0,0 +1,32 @@
+import pytest
+
+
+class RecordingSink:
+    """
+    Sink with the producer interface that keeps everything published to it.
+    """
+
+    def __init__(self):
+        self.records = []  # (topic, record) of publish
+        self.raw_records = []  # (topic, key_bytes, value_bytes, timestamp_ms) of publish_raw
+        self.ticks = 0
+
+    def publish(self, topic, data, topic_identifier=None):
+        self.records.append((topic, data))
+
+    def publish_raw(self, topic, key_bytes, value_bytes, timestamp_ms=None):
+        self.raw_records.append((topic, key_bytes, value_bytes, timestamp_ms))
+
+    def poll(self, timeout=0):
+        pass
+
+    def end_tick(self):
+        self.ticks += 1
+
+    def checkpoint(self, timeout=None):
+        return 0
+
+
+@pytest.fixture
+def recording_sink():
+    return RecordingSink()
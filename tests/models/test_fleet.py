@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import numpy as np
+
+from config.settings import SEATTLE_COORDINATES, UNIVERSITY_COORDINATES
+from models.fleet import Fleet
+from models.incidents import IncidentProcess
+from utilities.coordinates import calculate_distances
+from utilities.ids import Uuid7Ids
+from utilities.random_streams import FUEL, RandomStreams, counter_bits
+
+START = datetime(2024, 5, 1, 8)
+
+
+def test_fleet_drives_every_vehicle_to_the_destination():
+    fleet = Fleet(10, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", 1, START, 0)
+    for _ in range(5000):
+        if not fleet.active_count:
+            break
+        indices = fleet.step(60.0)
+        records = list(fleet.vehicle_records(indices))
+        assert [record["vehicle_id"] for record in records] == [fleet.vehicle_id(index) for index in indices.tolist()]
+    assert fleet.active_count == 0
+    distances = calculate_distances(fleet.latitude, fleet.longitude, UNIVERSITY_COORDINATES["latitude"], UNIVERSITY_COORDINATES["longitude"])
+    assert np.all(distances < 1)
+
+
+def test_step_only_advances_the_given_vehicles():
+    fleet = Fleet(10, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", 1, START, 0)
+    latitudes = fleet.latitude.copy()
+    indices = fleet.step(10.0, np.array([2, 5]))
+    assert indices.tolist() == [2, 5]
+    moved = np.flatnonzero(fleet.latitude != latitudes)
+    assert set(moved.tolist()) <= {2, 5}
+
+
+def run_shards(shards, seed=42, ticks=30):
+    """
+    Records of a fleet split into ``(first_index, size)`` shards, each simulated on its own, as sorted reprs per topic.
+    """
+    records = {"vehicle": [], "weather": [], "emergency": []}
+    for first_index, size in shards:
+        fleet = Fleet(size, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", seed, START, first_index,
+                      incidents=IncidentProcess(rate_per_hour=2000))
+        for _ in range(ticks):
+            indices = fleet.step(2.0)
+            records["vehicle"] += list(fleet.vehicle_records(indices))
+            records["weather"] += list(fleet.weather_records(indices))
+            records["emergency"] += list(fleet.emergency_incident_records(indices))
+    return {topic: sorted(map(repr, topic_records)) for topic, topic_records in records.items()}
+
+
+def test_vehicle_data_does_not_depend_on_sharding():
+    whole = run_shards([(0, 40)])
+    assert whole["emergency"]
+    assert run_shards([(0, 13), (13, 27)]) == whole
+    assert run_shards([(0, 10), (10, 10), (20, 10), (30, 10)]) == whole
+
+
+def test_seed_changes_the_data():
+    assert run_shards([(0, 10)], seed=1)["vehicle"] != run_shards([(0, 10)], seed=2)["vehicle"]
+
+
+def test_incident_ids_are_unique():
+    emergency = run_shards([(0, 40)])["emergency"]
+    assert len(set(emergency)) == len(emergency)
+
+
+def test_vehicle_keys_only_depend_on_global_index():
+    streams = RandomStreams(7)
+    keys = streams.vehicle_keys(np.arange(100))
+    np.testing.assert_array_equal(streams.vehicle_keys(np.arange(40, 60)), keys[40:60])
+    assert len(np.unique(keys)) == 100
+
+
+def test_counter_bits_are_order_independent():
+    keys = RandomStreams(7).vehicle_keys(np.arange(50))
+    counters = np.arange(50, dtype=np.uint64) * 3
+    bits = counter_bits(keys, counters, FUEL, 2)
+    order = np.random.default_rng(0).permutation(50)
+    np.testing.assert_array_equal(counter_bits(keys[order], counters[order], FUEL, 2), bits[order])
+    assert not np.array_equal(counter_bits(keys, counters, FUEL + 1, 2), bits)
+
+
+def test_incident_ids_come_from_the_id_generator_when_set():
+    fleet = Fleet(20, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", 1, START, 0,
+                  incidents=IncidentProcess(rate_per_hour=1e5, id_generator=Uuid7Ids(worker_id=1)))
+    records = list(fleet.emergency_incident_records(fleet.step(2.0)))
+    assert records
+    assert {record["incident_id"].version for record in records} == {7}
@@ -0,0 +1,76 @@
+from services.event_log import EventLogReader, EventLogWriter, list_segments, log_topics, merged_records
+from services.replay import replay_to_files, replay_to_producer
+
+
+def write_log(directory, topic, count, segment_bytes=1024, first_timestamp_ms=1714550400000):
+    writer = EventLogWriter(str(directory), segment_bytes=segment_bytes, index_interval_bytes=128)
+    for i in range(count):
+        writer.append(topic, f"key-{i % 7}".encode(), f"value-{i:05d}".encode() * 4, first_timestamp_ms + 10 * i)
+    writer.close()
+
+
+def test_records_read_back_in_order(tmp_path):
+    write_log(tmp_path, "gps_data", 500)
+    records = list(EventLogReader(str(tmp_path), "gps_data").records())
+    assert [offset for offset, _, _, _ in records] == list(range(500))
+    assert [bytes(value) for _, _, _, value in records] == [f"value-{i:05d}".encode() * 4 for i in range(500)]
+    assert bytes(records[8][2]) == b"key-1"
+    assert records[-1][1] == 1714550400000 + 10 * 499
+
+
+def test_segments_roll_over(tmp_path):
+    write_log(tmp_path, "gps_data", 500)
+    base_offsets = list_segments(str(tmp_path / "gps_data"))
+    assert len(base_offsets) > 1
+    assert base_offsets[0] == 0
+    # Every segment starts right after the last record of the previous one
+    counts = [sum(1 for _ in EventLogReader(str(tmp_path), "gps_data").records(start)) for start in base_offsets]
+    assert counts == [500 - start for start in base_offsets]
+
+
+def test_reopened_log_continues_offsets(tmp_path):
+    write_log(tmp_path, "gps_data", 100)
+    write_log(tmp_path, "gps_data", 100, first_timestamp_ms=1714550500000)
+    offsets = [offset for offset, _, _, _ in EventLogReader(str(tmp_path), "gps_data").records()]
+    assert offsets == list(range(200))
+
+
+def test_seek_by_offset_and_timestamp(tmp_path):
+    write_log(tmp_path, "gps_data", 500)
+    reader = EventLogReader(str(tmp_path), "gps_data")
+    assert next(reader.records(start_offset=321))[0] == 321
+    assert next(reader.records(start_timestamp_ms=1714550400000 + 10 * 250 - 5))[0] == 250
+
+
+def test_merged_records_by_timestamp(tmp_path):
+    write_log(tmp_path, "gps_data", 50, first_timestamp_ms=1714550400000)
+    write_log(tmp_path, "weather_data", 50, first_timestamp_ms=1714550400005)
+    records = list(merged_records(str(tmp_path), ["gps_data", "weather_data"]))
+    assert len(records) == 100
+    assert [timestamp_ms for _, _, timestamp_ms, _, _ in records] == sorted(timestamp_ms for _, _, timestamp_ms, _, _ in records)
+    assert [topic for topic, _, _, _, _ in records[:4]] == ["gps_data", "weather_data", "gps_data", "weather_data"]
+
+
+def test_replay_keeps_timestamps_and_ends_ticks(tmp_path, recording_sink):
+    write_log(tmp_path, "gps_data", 250)
+    assert replay_to_producer(str(tmp_path), ["gps_data"], recording_sink, tick_records=100) == 250
+    assert [timestamp_ms for _, _, _, timestamp_ms in recording_sink.raw_records] == [1714550400000 + 10 * i for i in range(250)]
+    assert recording_sink.ticks == 3
+
+
+def test_log_topics_lists_topics_with_records(tmp_path):
+    write_log(tmp_path, "weather_data", 5)
+    write_log(tmp_path, "gps_batches", 5)
+    (tmp_path / "empty_topic").mkdir()
+    (tmp_path / "notes.txt").write_text("not a topic")
+    assert log_topics(str(tmp_path)) == ["gps_batches", "weather_data"]
+    assert log_topics(str(tmp_path / "missing")) == []
+
+
+def test_replay_to_files_creates_every_topic_directory(tmp_path):
+    writer = EventLogWriter(str(tmp_path / "log"))
+    writer.append("gps_data", b"vehicle-1", b'{"id": "1"}', 1714550400000)
+    writer.close()
+    replay_to_files(str(tmp_path / "log"), ["gps_data", "emergency_data"], str(tmp_path / "files"))
+    assert sorted(path.name for path in (tmp_path / "files").iterdir()) == ["emergency_data", "gps_data"]
+    assert not list((tmp_path / "files" / "emergency_data").iterdir())
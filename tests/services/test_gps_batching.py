@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from config.settings import GPS_BATCH_TOPIC, SEATTLE_COORDINATES, UNIVERSITY_COORDINATES
+from jobs.gps_codec import decode_gps_batch_rows, encode_gps_batch
+from models.fleet import Fleet
+from services.gps_batching import GpsBatcher
+from services.serializers import GpsBatchSerializer
+from utilities.ids import Uuid7Ids
+
+
+def test_gps_batch_round_trip():
+    samples = [(1714550400.123456 + 2 * i, 47.6080128 - 0.0001 * i, -122.3351656 + 0.00025 * i, 40 + i, i % 8) for i in range(50)]
+    batch_id = uuid.uuid4()
+    decoded_id, vehicle_id, vehicle_type, decoded = decode_gps_batch_rows(encode_gps_batch("vehicle-7", "private", samples, batch_id))
+    assert (decoded_id, vehicle_id, vehicle_type) == (batch_id, "vehicle-7", "private")
+    assert len(decoded) == len(samples)
+    for (timestamp, lat, lon, speed, direction), (decoded_timestamp, decoded_lat, decoded_lon, decoded_speed, decoded_direction) in zip(samples, decoded):
+        # Time deltas are whole milliseconds, positions 1e-7 degrees; rounding errors don't add up
+        assert decoded_timestamp == pytest.approx(timestamp, abs=1e-3)
+        assert decoded_lat == pytest.approx(lat, abs=1e-7)
+        assert decoded_lon == pytest.approx(lon, abs=1e-7)
+        assert (decoded_speed, decoded_direction) == (speed, direction)
+
+
+def test_gps_batch_serializer_records():
+    record = {"vehicle_id": "vehicle-3", "vehicle_type": "private", "samples": [(1714550400.5, 47.6, -122.3, 50, 2), (1714550402.5, 47.601, -122.299, 52, 2)]}
+    serializer = GpsBatchSerializer()
+    decoded = serializer.deserialize(serializer.serialize(record))
+    assert serializer.key(record) == b"vehicle-3"
+    assert decoded["vehicle_id"] == "vehicle-3"
+    assert [sample["timestamp"] for sample in decoded["samples"]] == ["2024-05-01T08:00:00.500000", "2024-05-01T08:00:02.500000"]
+    assert [sample["direction"] for sample in decoded["samples"]] == ["East", "East"]
+
+
+def test_batcher_closes_batches_by_size_and_span(recording_sink):
+    batcher = GpsBatcher(recording_sink, max_samples=4, max_ms=10000)
+    for i in range(10):
+        batcher.add("vehicle-1", 1714550400 + 2 * i, 47.6, -122.3, 50, 2)
+    # Two full batches of 4, the last 2 samples still open
+    assert [len(record["samples"]) for _, record in recording_sink.records] == [4, 4]
+    batcher.add("vehicle-1", 1714550400 + 60, 47.6, -122.3, 50, 2)
+    # The 60 s gap closes the open batch before the new sample joins
+    assert [len(record["samples"]) for _, record in recording_sink.records] == [4, 4, 2]
+    batcher.flush()
+    assert [len(record["samples"]) for _, record in recording_sink.records] == [4, 4, 2, 1]
+    assert {topic for topic, _ in recording_sink.records} == {GPS_BATCH_TOPIC}
+
+
+def fleet_batch_ids(sink, seed, id_generator=None):
+    fleet = Fleet(5, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", seed, datetime(2024, 5, 1, 8), 0)
+    batcher = GpsBatcher(sink, max_samples=3, max_ms=60000, id_generator=id_generator)
+    for _ in range(7):
+        batcher.add_fleet(fleet, fleet.step(2.0))
+    batcher.flush()
+    serializer = GpsBatchSerializer()
+    return [serializer.deserialize(serializer.serialize(record))["id"] for _, record in sink.records]
+
+
+def test_fleet_batch_ids_follow_the_vehicle_streams(recording_sink):
+    first = fleet_batch_ids(recording_sink, seed=3)
+    recording_sink.records.clear()
+    assert fleet_batch_ids(recording_sink, seed=3) == first
+    assert len(set(first)) == len(first) == 15
+    recording_sink.records.clear()
+    assert set(fleet_batch_ids(recording_sink, seed=4)).isdisjoint(first)
+
+
+def test_batch_ids_come_from_the_id_generator_when_set(recording_sink):
+    ids = fleet_batch_ids(recording_sink, seed=3, id_generator=Uuid7Ids(worker_id=1))
+    assert {batch_id.version for batch_id in ids} == {7}
+    assert len(set(ids)) == len(ids)
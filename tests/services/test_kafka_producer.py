@@ -0,0 +1,104 @@
+from confluent_kafka import KafkaError, KafkaException
+import pytest
+
+from services.kafka_producer import KafkaProducer
+
+
+class FakeProducer:
+    """
+    Stand-in for confluent_kafka.Producer whose local queue is full for the first ``full_produces`` calls.
+    """
+
+    def __init__(self, full_produces=0, queued=0):
+        self.full_produces = full_produces
+        self.queued = queued
+        self.produced = []
+
+    def __len__(self):
+        return self.queued
+
+    def produce(self, topic, key, value, timestamp=0, on_delivery=None):
+        if self.full_produces:
+            self.full_produces -= 1
+            raise BufferError("Local: Queue full")
+        self.produced.append((topic, key, value, timestamp))
+
+    def poll(self, timeout=0):
+        return 0
+
+    def flush(self, timeout=None):
+        return 0
+
+    def init_transactions(self, timeout=None):
+        pass
+
+    def begin_transaction(self):
+        pass
+
+
+def create_producer(monkeypatch, fake, **options):
+    monkeypatch.setattr(KafkaProducer, "_create_producer", lambda self: fake)
+    options.setdefault("spill_dir", None)
+    options.setdefault("statistics_interval_ms", 0)
+    return KafkaProducer(**options)
+
+
+def test_produce_retries_until_the_queue_takes_the_record(monkeypatch):
+    fake = FakeProducer(full_produces=3)
+    producer = create_producer(monkeypatch, fake)
+    producer.publish_raw("gps_data", b"key", b"value", 1714550400000)
+    assert fake.produced == [("gps_data", b"key", b"value", 1714550400000)]
+
+
+def test_produce_spills_when_the_queue_stays_full(monkeypatch, tmp_path):
+    fake = FakeProducer(full_produces=10 ** 9, queued=10 ** 6)
+    producer = create_producer(monkeypatch, fake, spill_dir=str(tmp_path), backpressure_timeout_sec=0)
+    producer.publish_raw("gps_data", b"key", b"value", 1714550400000)
+    assert fake.produced == []
+    assert producer.spill.pending_messages == 1
+
+
+def test_transactional_produce_fails_when_the_queue_stays_full(monkeypatch):
+    fake = FakeProducer(full_produces=10 ** 9)
+    producer = create_producer(monkeypatch, fake, transactional_id="test", transaction_timeout_sec=0.2)
+    with pytest.raises(BufferError):
+        producer.publish_raw("gps_data", b"key", b"value")
+    assert producer._transaction_records == []
+
+
+class FakeTransactionalProducer(FakeProducer):
+    """
+    FakeProducer whose commits fail with ``commit_errors`` (KafkaErrors) before they succeed.
+    """
+
+    def __init__(self, commit_errors):
+        super().__init__()
+        self.commit_errors = list(commit_errors)
+        self.commits = 0
+        self.aborts = 0
+
+    def commit_transaction(self, timeout=None):
+        if self.commit_errors:
+            raise KafkaException(self.commit_errors.pop(0))
+        self.commits += 1
+
+    def abort_transaction(self, timeout=None):
+        self.aborts += 1
+
+
+def test_commit_retries_retriable_errors(monkeypatch):
+    fake = FakeTransactionalProducer([KafkaError(KafkaError._TIMED_OUT, retriable=True)] * 2)
+    producer = create_producer(monkeypatch, fake, transactional_id="test")
+    producer.publish_raw("gps_data", b"key", b"value")
+    producer.commit_transaction()
+    assert (fake.commits, fake.aborts, len(fake.produced)) == (1, 0, 1)
+
+
+def test_commit_aborts_and_produces_again_once_retries_run_out(monkeypatch):
+    # Backoffs of 0.1 and 0.2s fit in the 0.5s timeout, the next one doesn't: the third error aborts, and the
+    # records are committed in a new transaction
+    fake = FakeTransactionalProducer([KafkaError(KafkaError._TIMED_OUT, retriable=True)] * 3)
+    producer = create_producer(monkeypatch, fake, transactional_id="test", transaction_timeout_sec=0.5)
+    producer.publish_raw("gps_data", b"key", b"value")
+    producer.commit_transaction()
+    assert (fake.commits, fake.aborts, len(fake.produced)) == (1, 1, 2)
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from config.settings import (SEATTLE_COORDINATES, UNIVERSITY_COORDINATES, VEHICLE_TOPIC, PROFILE_TOPIC, GPS_TOPIC, TRAFFIC_TOPIC, WEATHER_TOPIC,
+                             EMERGENCY_TOPIC)
+from models.fleet import Fleet
+from models.incidents import IncidentProcess
+from services.serializers import BinarySerializer, JsonSerializer, TOPIC_SCHEMAS, get_serializer
+
+
+@pytest.fixture(scope="module")
+def fleet_records():
+    # A hazard high enough that the tick opens incidents, so every topic has records
+    fleet = Fleet(20, SEATTLE_COORDINATES.copy(), UNIVERSITY_COORDINATES.copy(), "vehicle", 1, datetime(2024, 5, 1, 8), 0,
+                  incidents=IncidentProcess(rate_per_hour=1e5))
+    indices = fleet.step(2.0)
+    return {
+        VEHICLE_TOPIC: list(fleet.vehicle_records(indices)),
+        PROFILE_TOPIC: list(fleet.profile_records()),
+        GPS_TOPIC: list(fleet.gps_records(indices)),
+        TRAFFIC_TOPIC: list(fleet.traffic_camera_records(indices, "camera-1")),
+        WEATHER_TOPIC: list(fleet.weather_records(indices)),
+        EMERGENCY_TOPIC: list(fleet.emergency_incident_records(indices)),
+    }
+
+
+@pytest.mark.parametrize("topic", list(TOPIC_SCHEMAS))
+def test_binary_round_trip(fleet_records, topic):
+    serializer = BinarySerializer(TOPIC_SCHEMAS[topic])
+    assert fleet_records[topic]
+    for record in fleet_records[topic]:
+        expected = {name: record[name] for name, _, _ in TOPIC_SCHEMAS[topic].fields}
+        payload = serializer.serialize(record)
+        decoded = serializer.deserialize(payload)
+        assert payload[:2] == serializer.header
+        assert decoded == expected
+        assert serializer.key(decoded) == serializer.key(record)
+
+
+@pytest.mark.parametrize("topic", list(TOPIC_SCHEMAS))
+def test_binary_is_smaller_than_json(fleet_records, topic):
+    binary, json_serializer = BinarySerializer(TOPIC_SCHEMAS[topic]), JsonSerializer(TOPIC_SCHEMAS[topic].key)
+    record = fleet_records[topic][0]
+    assert len(binary.serialize(record)) < len(json_serializer.serialize(record))
+
+
+def test_binary_rejects_other_schema(fleet_records):
+    payload = BinarySerializer(TOPIC_SCHEMAS[GPS_TOPIC]).serialize(fleet_records[GPS_TOPIC][0])
+    with pytest.raises(ValueError):
+        BinarySerializer(TOPIC_SCHEMAS[WEATHER_TOPIC]).deserialize(payload)
+
+
+
+def test_get_serializer_by_wire_format():
+    assert isinstance(get_serializer(WEATHER_TOPIC, "json"), JsonSerializer)
+    assert isinstance(get_serializer(WEATHER_TOPIC, "binary"), BinarySerializer)
+    with pytest.raises(ValueError):
+        get_serializer(WEATHER_TOPIC, "avro")
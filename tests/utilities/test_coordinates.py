@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utilities.coordinates import (calculate_bearing, calculate_bearings, calculate_distance, calculate_distances, haversine_distance,
+                                   haversine_distances, incremental_movement, incremental_movements, update_position, update_positions)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(3)
+    start_lat, end_lat = rng.uniform(45, 49, 200), rng.uniform(45, 49, 200)
+    start_lon, end_lon = rng.uniform(-124, -116, 200), rng.uniform(-124, -116, 200)
+    return start_lat, start_lon, end_lat, end_lon
+
+
+def test_bearings_match_scalar_version(points):
+    expected = [calculate_bearing(*point) for point in zip(*points)]
+    np.testing.assert_allclose(calculate_bearings(*points), expected, rtol=0, atol=1e-9)
+
+
+def test_distances_match_scalar_versions(points):
+    np.testing.assert_allclose(haversine_distances(*points), [haversine_distance(*point) for point in zip(*points)], rtol=1e-12)
+    np.testing.assert_allclose(calculate_distances(*points), [calculate_distance(*point) for point in zip(*points)], rtol=1e-12)
+
+
+def test_update_positions_match_scalar_version(points):
+    start_lat, start_lon, _, _ = points
+    distance_km = np.linspace(0, 50, start_lat.size)
+    bearing_deg = np.linspace(0, 360, start_lat.size)
+    latitudes, longitudes = update_positions(start_lat, start_lon, distance_km, bearing_deg)
+    expected = np.array([update_position(*args) for args in zip(start_lat, start_lon, distance_km, bearing_deg)])
+    np.testing.assert_allclose(latitudes, expected[:, 0], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(longitudes, expected[:, 1], rtol=0, atol=1e-12)
+
+
+def test_incremental_movements_broadcast_scalars(points):
+    start_lat, start_lon, end_lat, end_lon = points
+    latitudes, longitudes = incremental_movements(start_lat, start_lon, end_lat, end_lon, 90, 2)
+    expected = np.array([incremental_movement(*args, 90, 2) for args in zip(*points)])
+    np.testing.assert_allclose(latitudes, expected[:, 0], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(longitudes, expected[:, 1], rtol=0, atol=1e-12)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import time
+
+
+class SimulationClock:
+    """
+    Simulated time for the generators, decoupled from wall time.
+
+    The clock only moves when ``sleep`` is called, so event timestamps are monotonic and exactly as far
+    apart as the simulated ticks. How long ``sleep`` actually waits depends on ``speedup``:
+
+    - ``1.0``: real time, one simulated second per wall second
+    - ``N``: paced at N simulated seconds per wall second (soak tests)
+    - ``None``: virtual time, never waits (backfills run flat out)
+
+    Pacing is deadline based: each ``sleep`` waits until the wall time at which the simulated time should
+    be reached, so time spent generating and publishing is absorbed instead of accumulating as drift.
+    """
+
+    def __init__(self, speedup=1.0, start=None):
+        if speedup is not None and speedup <= 0:
+            raise ValueError("speedup must be positive, or None for virtual time")
+        self.speedup = speedup
+        self.start = start or datetime.now()
+        self.elapsed_sec = 0.0
+        self._wall_start = time.monotonic()
+
+    @property
+    def is_virtual(self):
+        return self.speedup is None
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed_sec)
+
+    def timestamp(self):
+        """
+        Current simulated time as epoch seconds.
+        """
+        return self.start.timestamp() + self.elapsed_sec
+
+    def sleep(self, seconds):
+        """
+        Advance simulated time by ``seconds`` and, unless virtual, wait until the matching wall deadline.
+        """
+        self.elapsed_sec += seconds
+        if self.speedup is None:
+            return
+
+        delay = self._wall_start + self.elapsed_sec / self.speedup - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def lag(self):
+        """
+        Seconds of wall time the paced clock is behind its schedule (0 when on time or virtual).
+        """
+        if self.speedup is None:
+            return 0.0
+        return max(0.0, time.monotonic() - (self._wall_start + self.elapsed_sec / self.speedup))
+
+
+def create_clock(mode, speedup=1.0, start=None):
+    """
+    Build a clock from the command line / settings style options.
+
+    Args:
+        mode (str): "realtime" (paced by ``speedup``) or "virtual" (flat out).
+        speedup (float): Simulated seconds per wall second in "realtime" mode.
+        start (datetime, optional): Simulated start time; defaults to now.
+
+    Returns:
+        SimulationClock
+    """
+    if mode == "virtual":
+        return SimulationClock(speedup=None, start=start)
+    if mode == "realtime":
+        return SimulationClock(speedup=speedup, start=start)
+    raise ValueError(f"Unknown clock mode '{mode}'")
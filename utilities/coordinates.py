@@ -1,6 +1,11 @@
 import random
 import math
 
+import numpy as np
+
+# Compass point names, clockwise from North in 45 degree steps
+COMPASS_POINTS = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+
 def calculate_increment(start, end):
     return end['latitude'] - start['latitude'], end['longitude'] - start['longitude']
 
@@ -120,32 +125,22 @@ def incremental_movement(start_lat, start_lon, target_lat, target_lon, speed_kmh
 
 
 
-# def generate_random_movement(start_lat, start_lon, end_lat, end_lon, min_distance_km, max_distance_km):
-#     # Approximate conversion values
-#     degrees_per_km_lat = 1 / 110.574
-#     degrees_per_km_lon = 1 / (111.320 * math.cos(math.radians(start_lat)))
-    
-#     # Random distance in km
-#     distance_km = random.uniform(min_distance_km, max_distance_km)
-    
-#     # Calculate the bearing from the start point to the end point
-#     lat1_rad = math.radians(start_lat)
-#     lat2_rad = math.radians(end_lat)
-#     lon_diff_rad = math.radians(end_lon - start_lon)
-#     x = math.sin(lon_diff_rad) * math.cos(lat2_rad)
-#     y = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(lon_diff_rad)
-#     initial_bearing_rad = math.atan2(x, y)
-    
-#     # Convert bearing to degrees
-#     initial_bearing_deg = math.degrees(initial_bearing_rad)
-#     bearing = (initial_bearing_deg + 360) % 360  # Normalize bearing
-    
-#     # Calculate the new latitude
-#     new_lat = start_lat + (distance_km * degrees_per_km_lat * math.cos(math.radians(bearing)))
-#     # Calculate the new longitude
-#     new_lon = start_lon + (distance_km * degrees_per_km_lon * math.sin(math.radians(bearing)))
-    
-#     return new_lat, new_lon
+def generate_random_movement(start_lat, start_lon, end_lat, end_lon, min_distance_km, max_distance_km, rng=random):
+    """
+    Move a random distance between ``min_distance_km`` and ``max_distance_km`` from the start point toward the
+    end point, stopping at the end point instead of overshooting it. ``rng`` is anything with a
+    ``uniform(low, high)``, e.g. a vehicle's numpy Generator; defaults to the ``random`` module.
+
+    Returns:
+        tuple: New latitude and longitude.
+    """
+    # Random distance in km, capped at what is left of the way
+    distance_km = min(rng.uniform(min_distance_km, max_distance_km), calculate_distance(start_lat, start_lon, end_lat, end_lon))
+
+    # Calculate the bearing from the start point to the end point
+    bearing = calculate_bearing(start_lat, start_lon, end_lat, end_lon)
+
+    return update_position(start_lat, start_lon, distance_km, bearing)
 
 # Calculate the distance between two coordinates
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -166,3 +161,72 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return distance
 
 
+# Array versions of the functions above. They accept scalars or NumPy arrays (broadcast against each
+# other) and evaluate the same formulas, in the same operation order, for a whole fleet in one call.
+
+def calculate_bearings(start_lat, start_lon, end_lat, end_lon):
+    """
+    Array version of calculate_bearing.
+    """
+    lat1_rad = np.radians(start_lat)
+    lat2_rad = np.radians(end_lat)
+    lon_diff_rad = np.radians(np.subtract(end_lon, start_lon))
+
+    x = np.sin(lon_diff_rad) * np.cos(lat2_rad)
+    y = np.cos(lat1_rad) * np.sin(lat2_rad) - np.sin(lat1_rad) * np.cos(lat2_rad) * np.cos(lon_diff_rad)
+
+    initial_bearing_deg = np.degrees(np.arctan2(x, y))
+    return (initial_bearing_deg + 360) % 360  # Normalize bearing
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """
+    Array version of haversine_distance.
+    """
+    R = 6371.0  # Radius of the Earth in km
+    dlat = np.radians(np.subtract(lat2, lat1))
+    dlon = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dlat / 2)**2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+def calculate_distances(lat1, lon1, lat2, lon2):
+    """
+    Array version of calculate_distance.
+    """
+    R = 6371.0  # Radius of the Earth in km
+    lat1_rad = np.radians(lat1)
+    lon1_rad = np.radians(lon1)
+    lat2_rad = np.radians(lat2)
+    lon2_rad = np.radians(lon2)
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+    a = np.sin(dlat / 2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+def update_positions(start_lat, start_lon, distance_km, bearing_deg):
+    """
+    Array version of update_position.
+
+    Returns:
+        tuple: Arrays of new latitudes and longitudes.
+    """
+    degrees_per_km_lat = 1 / 110.574
+    degrees_per_km_lon = 1 / (111.320 * np.cos(np.radians(start_lat)))
+
+    bearing_rad = np.radians(bearing_deg)
+    new_lat = start_lat + (distance_km * degrees_per_km_lat * np.cos(bearing_rad))
+    new_lon = start_lon + (distance_km * degrees_per_km_lon * np.sin(bearing_rad))
+
+    return new_lat, new_lon
+
+def incremental_movements(start_lat, start_lon, target_lat, target_lon, speed_kmh, time_elapsed_sec):
+    """
+    Array version of incremental_movement.
+
+    Returns:
+        tuple: Arrays of new latitudes and longitudes after the incremental movement.
+    """
+    bearing = calculate_bearings(start_lat, start_lon, target_lat, target_lon)
+    distance_covered_km = np.divide(speed_kmh, 3600) * time_elapsed_sec
+    return update_positions(start_lat, start_lon, distance_covered_km, bearing)
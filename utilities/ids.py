@@ -0,0 +1,143 @@
+from abc import ABC, abstractmethod
+import time
+import uuid
+
+import numpy as np
+
+from config.settings import ID_GENERATOR, ID_WORKER_ID
+
+SNOWFLAKE_EPOCH_MS = 1577836800000  # 2020-01-01T00:00:00Z; 41 bits of milliseconds last until 2089
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+
+def _to_bytes(high, low):
+    # Two big-endian uint64 words per ID, so the byte order (and str() order) follows the time order
+    words = np.empty((len(high), 2), dtype=">u8")
+    words[:, 0] = high
+    words[:, 1] = low
+    return words.view(np.uint8).reshape(-1, 16)
+
+
+class TimeOrderedIds(ABC):
+    """
+    Base of the time-ordered ID generators: milliseconds, a worker ID and a per-millisecond sequence.
+
+    IDs are handed out in blocks: ``count`` IDs of one call take consecutive sequence numbers, spilling into
+    the following milliseconds once a millisecond's ``2**12`` sequence numbers are used up. The generator's
+    millisecond never goes backwards, even if the wall clock does, so IDs of one worker are strictly
+    increasing; bursts above 4 million IDs per second run the ID clock slightly ahead of the wall clock until
+    the rate drops again. Different workers differ in the worker bits, so no coordination is needed as long
+    as every process has its own worker ID (the sharded launcher assigns ``ID_WORKER_ID`` + worker index).
+    """
+
+    def __init__(self, worker_id=ID_WORKER_ID, clock=time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"Worker IDs must be between 0 and {MAX_WORKER_ID}, got {worker_id}")
+        self.worker_id = worker_id
+        self.clock = clock
+        self.last_ms = 0
+        self.next_sequence = 0
+        self.generated = 0
+
+    def _allocate(self, count):
+        """
+        Milliseconds and sequence numbers of the next ``count`` IDs, as uint64 arrays.
+        """
+        now_ms = int(self.clock() * 1000)
+        if now_ms > self.last_ms:
+            self.last_ms, self.next_sequence = now_ms, 0
+        slots = self.next_sequence + np.arange(count, dtype=np.uint64)
+        milliseconds = np.uint64(self.last_ms) + (slots >> np.uint64(SEQUENCE_BITS))
+        sequences = slots & np.uint64(SEQUENCE_MASK)
+        if count:
+            end = self.next_sequence + count
+            self.last_ms += end >> SEQUENCE_BITS
+            self.next_sequence = end & SEQUENCE_MASK
+        self.generated += count
+        return milliseconds, sequences
+
+    @abstractmethod
+    def uuid_bytes(self, count):
+        """
+        ``count`` IDs as a (count, 16) uint8 array of UUID bytes, in increasing order.
+        """
+
+    def uuids(self, count):
+        return [uuid.UUID(bytes=raw.tobytes()) for raw in self.uuid_bytes(count)]
+
+
+class SnowflakeIds(TimeOrderedIds):
+    """
+    Snowflake IDs: 64-bit integers of 41 bits of milliseconds since SNOWFLAKE_EPOCH_MS, 10 worker bits and a
+    12-bit sequence.
+
+    The records' ``id`` fields are UUIDs on every wire format and in the data lake, so ``uuid_bytes`` carries
+    the 64-bit value in a version 8 (custom) UUID: its top 48 bits first, the version nibble, the next 12 bits,
+    then the RFC 4122 variant and the last 4 bits. The UUIDs sort like the integers, and
+    ``snowflake_from_uuid`` gets the integer back.
+    """
+
+    def __init__(self, worker_id=ID_WORKER_ID, clock=time.time, epoch_ms=SNOWFLAKE_EPOCH_MS):
+        super().__init__(worker_id, clock)
+        self.epoch_ms = epoch_ms
+
+    def next_ids(self, count):
+        """
+        The next ``count`` snowflake IDs as a uint64 array.
+        """
+        milliseconds, sequences = self._allocate(count)
+        return ((milliseconds - np.uint64(self.epoch_ms)) << np.uint64(WORKER_BITS + SEQUENCE_BITS)) \
+            | np.uint64(self.worker_id << SEQUENCE_BITS) | sequences
+
+    def uuid_bytes(self, count):
+        ids = self.next_ids(count)
+        high = ((ids >> np.uint64(16)) << np.uint64(16)) | np.uint64(0x8000) | ((ids >> np.uint64(4)) & np.uint64(0xFFF))
+        low = np.uint64(0x8000000000000000) | ((ids & np.uint64(0xF)) << np.uint64(58))
+        return _to_bytes(high, low)
+
+
+def snowflake_from_uuid(value):
+    """
+    The 64-bit snowflake ID carried by a SnowflakeIds UUID.
+    """
+    high, low = value.int >> 64, value.int & ((1 << 64) - 1)
+    return ((high >> 16) << 16) | ((high & 0xFFF) << 4) | ((low >> 58) & 0xF)
+
+
+class Uuid7Ids(TimeOrderedIds):
+    """
+    UUIDv7 (RFC 9562): 48 bits of Unix milliseconds, the version nibble, a 12-bit sub-millisecond sequence
+    in ``rand_a`` (the RFC's monotonic counter method), the variant, then 62 bits of which the first 10 are
+    the worker ID and the rest random.
+    """
+
+    def __init__(self, worker_id=ID_WORKER_ID, clock=time.time, rng=None):
+        super().__init__(worker_id, clock)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def uuid_bytes(self, count):
+        milliseconds, sequences = self._allocate(count)
+        high = (milliseconds << np.uint64(16)) | np.uint64(0x7000) | sequences
+        random_bits = self.rng.integers(0, 1 << 52, count, dtype=np.uint64)
+        low = np.uint64(0x8000000000000000) | np.uint64(self.worker_id << 52) | random_bits
+        return _to_bytes(high, low)
+
+
+def create_id_generator(kind=ID_GENERATOR, worker_id=ID_WORKER_ID, rng=None):
+    """
+    The record ID generator named by ``kind``: "snowflake", "uuid7" or "random".
+
+    Returns:
+        TimeOrderedIds | None: None for "random", i.e. version 4 UUIDs drawn by the caller (a Fleet draws
+        them from its vehicles' random streams, so they are reproducible with the run's seed).
+    """
+    if kind == "snowflake":
+        return SnowflakeIds(worker_id)
+    if kind == "uuid7":
+        return Uuid7Ids(worker_id, rng=rng)
+    if kind == "random":
+        return None
+    raise ValueError(f"Unknown ID generator: {kind!r}")
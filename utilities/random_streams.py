@@ -0,0 +1,101 @@
+import numpy as np
+
+# SplitMix64 constants; models/weather.py hashes its noise with the same mixer
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+# Branches of the run's seed tree; shards and vehicles hang off different ones, so their streams never overlap
+SHARD_BRANCH = 1
+VEHICLE_BRANCH = 2
+SCHEDULE_BRANCH = 3
+
+# Purposes of per-vehicle draws, one independent stream each: adding a draw for one purpose leaves the others unchanged
+VEHICLE_ID, FUEL, SPEED, CRUISE, INCIDENT, GPS_ID, CAMERA_ID, WEATHER_ID, CADENCE, INCIDENT_ID, GPS_BATCH_ID = range(11)
+
+
+def mix64(values):
+    """
+    SplitMix64 finalizer: a bijection of uint64 values that spreads every input bit over the output.
+    """
+    with np.errstate(over="ignore"):
+        h = np.asarray(values, dtype=np.uint64)
+        h = (h ^ (h >> np.uint64(30))) * _MIX_1
+        h = (h ^ (h >> np.uint64(27))) * _MIX_2
+        return h ^ (h >> np.uint64(31))
+
+
+def counter_bits(keys, counters, purpose, words=1):
+    """
+    Random 64-bit words that are a pure function of a stream key, a counter and a purpose.
+
+    This is a counter-based generator: there is no state to advance, so draw ``n`` of a stream is computed
+    directly and any subset of streams is drawn in one array operation, in any order, with the same result.
+
+    Returns:
+        numpy.ndarray: uint64 array of shape ``(len(keys), words)`` (or ``(words,)`` for scalar inputs).
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        counters = np.asarray(counters).astype(np.uint64)
+        h = mix64(keys ^ mix64(counters * GOLDEN_GAMMA + np.uint64(purpose)))
+        h = h[..., np.newaxis] + np.arange(1, words + 1, dtype=np.uint64) * GOLDEN_GAMMA
+    return mix64(h)
+
+
+def counter_uniform(keys, counters, purpose, words=1):
+    """
+    Uniform [0, 1) doubles drawn with ``counter_bits``; one column per word.
+    """
+    return (counter_bits(keys, counters, purpose, words) >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class RandomStreams:
+    """
+    Seeded hierarchy of random streams for one run: run → shard → vehicle.
+
+    The run is a ``numpy.random.SeedSequence``; an unseeded run draws fresh entropy, which ``entropy`` keeps
+    so the run can be repeated. Shards get spawnable generators for anything local to their partition.
+    Vehicles hang off the run, not off their shard: a vehicle's key only depends on the run seed and its
+    global index, and its draws are counter-based (``counter_bits``) on that key, a per-vehicle tick counter
+    and the purpose of the draw. A vehicle's timeline is therefore the same bit for bit whether the fleet ran
+    in one process or was split over any number of workers, and can be regenerated on its own for debugging
+    by simulating just that vehicle (``first_index`` = its index) with the run's seed.
+
+    Vehicle keys are mixed from the run key in one array operation rather than spawned one SeedSequence per
+    vehicle, which would cost tens of microseconds per vehicle at fleet start.
+    """
+
+    def __init__(self, seed=None):
+        self.sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.entropy = self.sequence.entropy
+        self.key = self.sequence.generate_state(1, np.uint64)[0]
+
+    def shard(self, index):
+        """
+        Generator of shard ``index``, for draws that belong to a partition rather than to a vehicle.
+        """
+        return np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=self.sequence.spawn_key + (SHARD_BRANCH, index)))
+
+    def vehicle_keys(self, indices):
+        """
+        Stream keys of the vehicles with the given global indices.
+        """
+        with np.errstate(over="ignore"):
+            branch = mix64(self.key + np.uint64(VEHICLE_BRANCH) * GOLDEN_GAMMA)
+            return mix64(branch ^ mix64(np.asarray(indices).astype(np.uint64) * GOLDEN_GAMMA))
+
+    def vehicle_generator(self, index):
+        """
+        A NumPy Generator for one vehicle, on a counter-based Philox keyed by the vehicle's stream key.
+        """
+        key = self.vehicle_keys(index)
+        return np.random.Generator(np.random.Philox(key=np.array([key, mix64(key)], dtype=np.uint64)))
+
+    def schedule_uniform(self, counters, purpose=0):
+        """
+        Run-wide draws shared by every shard, e.g. the length of tick ``counters``, so all workers tick alike.
+        """
+        with np.errstate(over="ignore"):
+            key = mix64(self.key + np.uint64(SCHEDULE_BRANCH) * GOLDEN_GAMMA)
+        return counter_uniform(key, counters, purpose)[..., 0]
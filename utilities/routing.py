@@ -0,0 +1,275 @@
+from collections import OrderedDict
+import heapq
+import json
+import math
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from utilities.coordinates import calculate_bearings, calculate_distance, haversine_distances
+
+# OSM highway types a car can drive on
+DRIVABLE_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link", "secondary", "secondary_link",
+    "tertiary", "tertiary_link", "unclassified", "residential", "living_street", "service",
+}
+
+
+class RoadGraph:
+    """
+    Directed road graph with nodes stored as coordinate arrays and edges as adjacency lists.
+
+    Edge lengths are Haversine distances in km, so the straight-line Haversine distance to the goal is an
+    admissible A* heuristic.
+    """
+
+    def __init__(self):
+        self._node_ids = {}
+        self._latitudes = []
+        self._longitudes = []
+        self.adjacency = []
+        self._arrays = None
+
+    @property
+    def node_count(self):
+        return len(self._latitudes)
+
+    def add_node(self, key, latitude, longitude):
+        node = self._node_ids.get(key)
+        if node is None:
+            node = self._node_ids[key] = len(self._latitudes)
+            self._latitudes.append(latitude)
+            self._longitudes.append(longitude)
+            self.adjacency.append([])
+            self._arrays = None
+        return node
+
+    def add_edge(self, source, target, oneway=False):
+        length_km = calculate_distance(self._latitudes[source], self._longitudes[source],
+                                       self._latitudes[target], self._longitudes[target])
+        self.adjacency[source].append((target, length_km))
+        if not oneway:
+            self.adjacency[target].append((source, length_km))
+
+    def add_polyline(self, coordinates, oneway=False):
+        """
+        Add a way given as [(latitude, longitude), ...]; points closer than ~10 cm share a node.
+        """
+        previous = None
+        for latitude, longitude in coordinates:
+            node = self.add_node((round(latitude, 6), round(longitude, 6)), latitude, longitude)
+            if previous is not None and previous != node:
+                self.add_edge(previous, node, oneway)
+            previous = node
+
+    @property
+    def latitudes(self):
+        return self._node_arrays()[0]
+
+    @property
+    def longitudes(self):
+        return self._node_arrays()[1]
+
+    def _node_arrays(self):
+        if self._arrays is None:
+            self._arrays = (np.asarray(self._latitudes, dtype=np.float64), np.asarray(self._longitudes, dtype=np.float64))
+        return self._arrays
+
+    def nearest_node(self, latitude, longitude):
+        """
+        Node closest to a point (equirectangular approximation, exact enough to snap to a road).
+        """
+        latitudes, longitudes = self._node_arrays()
+        dlat = latitudes - latitude
+        dlon = (longitudes - longitude) * math.cos(math.radians(latitude))
+        return int(np.argmin(dlat * dlat + dlon * dlon))
+
+    def shortest_path(self, source, target):
+        """
+        A* shortest path between two nodes.
+
+        Returns:
+            list: Node indices from source to target, or None when target is unreachable.
+        """
+        latitudes, longitudes = self._node_arrays()
+        # Heuristic for every node at once: straight-line distance to the target
+        heuristic = haversine_distances(latitudes, longitudes, latitudes[target], longitudes[target]).tolist()
+
+        best = {source: 0.0}
+        previous = {}
+        frontier = [(heuristic[source], 0.0, source)]
+        while frontier:
+            _, distance, node = heapq.heappop(frontier)
+            if node == target:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1]
+            if distance > best.get(node, math.inf):
+                continue  # Stale queue entry
+            for neighbour, length_km in self.adjacency[node]:
+                candidate = distance + length_km
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    previous[neighbour] = node
+                    heapq.heappush(frontier, (candidate + heuristic[neighbour], candidate, neighbour))
+        return None
+
+    def route(self, source, target):
+        path = self.shortest_path(source, target)
+        if path is None:
+            return None
+        latitudes, longitudes = self._node_arrays()
+        return Route(latitudes[path], longitudes[path])
+
+
+def load_geojson(path):
+    """
+    Build a RoadGraph from a GeoJSON FeatureCollection of LineString / MultiLineString roads.
+
+    A feature with ``"oneway": true`` (or "yes") in its properties is only traversable in drawing order.
+    """
+    with open(path) as geojson_file:
+        collection = json.load(geojson_file)
+
+    graph = RoadGraph()
+    for feature in collection.get("features", []):
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        oneway = properties.get("oneway") in (True, "yes", "true", "1")
+        if geometry.get("type") == "LineString":
+            lines = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiLineString":
+            lines = geometry["coordinates"]
+        else:
+            continue
+        for line in lines:
+            # GeoJSON positions are [longitude, latitude]
+            graph.add_polyline([(point[1], point[0]) for point in line], oneway)
+    return graph
+
+
+def load_osm(path):
+    """
+    Build a RoadGraph from an OSM XML extract, keeping only drivable highways.
+    """
+    nodes = {}
+    graph = RoadGraph()
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "node":
+            nodes[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+            element.clear()
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            if tags.get("highway") in DRIVABLE_HIGHWAYS:
+                points = [nodes[ref.get("ref")] for ref in element.iter("nd") if ref.get("ref") in nodes]
+                graph.add_polyline(points, tags.get("oneway") in ("yes", "true", "1"))
+            element.clear()
+    return graph
+
+
+def load_road_graph(path):
+    """
+    Load a road graph from a local ``.osm`` extract or a GeoJSON file.
+    """
+    if path.endswith(".osm"):
+        return load_osm(path)
+    return load_geojson(path)
+
+
+class Route:
+    """
+    Route geometry with cumulative distances, so positions along it are looked up instead of integrated.
+
+    ``cumulative_km[i]`` is the distance from the first point to point ``i``. The position at distance ``d``
+    is a binary search for the segment containing ``d`` plus a linear interpolation inside it.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        segment_km = haversine_distances(self.latitudes[:-1], self.longitudes[:-1], self.latitudes[1:], self.longitudes[1:])
+        self.cumulative_km = np.concatenate(([0.0], np.cumsum(segment_km)))
+        self.segment_bearings = calculate_bearings(self.latitudes[:-1], self.longitudes[:-1], self.latitudes[1:], self.longitudes[1:])
+
+    @property
+    def length_km(self):
+        return float(self.cumulative_km[-1])
+
+    def _segments(self, distance_km):
+        distance_km = np.clip(distance_km, 0.0, self.length_km)
+        segment = np.clip(np.searchsorted(self.cumulative_km, distance_km, side="right") - 1, 0, max(len(self.cumulative_km) - 2, 0))
+        return distance_km, segment
+
+    def position_at(self, distance_km):
+        """
+        Latitude and longitude at ``distance_km`` along the route (scalars or arrays, clamped to the route).
+        """
+        if len(self.cumulative_km) == 1:
+            return np.broadcast_to(self.latitudes[0], np.shape(distance_km)), np.broadcast_to(self.longitudes[0], np.shape(distance_km))
+        distance_km, segment = self._segments(distance_km)
+        start = self.cumulative_km[segment]
+        length = self.cumulative_km[segment + 1] - start
+        fraction = np.divide(distance_km - start, length, out=np.zeros_like(start), where=length > 0)
+        latitude = self.latitudes[segment] + fraction * (self.latitudes[segment + 1] - self.latitudes[segment])
+        longitude = self.longitudes[segment] + fraction * (self.longitudes[segment + 1] - self.longitudes[segment])
+        return latitude, longitude
+
+    def location_at(self, distance_km):
+        """
+        Position at one distance as a {"latitude", "longitude"} dict, as used in the records.
+        """
+        latitude, longitude = self.position_at(distance_km)
+        return {'latitude': float(latitude), 'longitude': float(longitude)}
+
+    def bearing_at(self, distance_km):
+        """
+        Heading in degrees of the route segment at ``distance_km``.
+        """
+        if len(self.segment_bearings) == 0:
+            return np.zeros(np.shape(distance_km))
+        _, segment = self._segments(distance_km)
+        return self.segment_bearings[segment]
+
+
+class RouteCache:
+    """
+    LRU cache of routes keyed by the grid cells of their origin and destination.
+
+    Vehicles starting and ending in the same pair of ``cell_deg`` cells share one route, so a fleet spread over
+    a handful of corridors only runs A* a handful of times.
+    """
+
+    def __init__(self, graph, cell_deg=0.01, max_routes=1024):
+        self.graph = graph
+        self.cell_deg = cell_deg
+        self.max_routes = max_routes
+        self.routes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cell(self, latitude, longitude):
+        return int(math.floor(latitude / self.cell_deg)), int(math.floor(longitude / self.cell_deg))
+
+    def route(self, origin, destination):
+        """
+        Route between two {"latitude", "longitude"} points, computed on first use of their cell pair.
+
+        Returns:
+            Route: The cached route, or None when the destination cannot be reached on the graph.
+        """
+        key = (self.cell(origin['latitude'], origin['longitude']), self.cell(destination['latitude'], destination['longitude']))
+        if key in self.routes:
+            self.hits += 1
+            self.routes.move_to_end(key)
+            return self.routes[key]
+
+        self.misses += 1
+        source = self.graph.nearest_node(origin['latitude'], origin['longitude'])
+        target = self.graph.nearest_node(destination['latitude'], destination['longitude'])
+        route = self.graph.route(source, target)
+        self.routes[key] = route
+        if len(self.routes) > self.max_routes:
+            self.routes.popitem(last=False)
+        return route